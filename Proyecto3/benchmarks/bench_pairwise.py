@@ -0,0 +1,97 @@
+"""
+Micro-benchmark: dataset comparativo vectorizado (`pairwise_features`) vs. el
+bucle `groupby` + `iloc` del notebook.
+
+Usa `data/pokemon_showdown_teams_clean.csv` con las features de equipo del
+notebook (stats agregados + one-hot de los 50 Pokémon más usados). Con
+`--scale N` se replica el dataset N veces con replay IDs distintos para
+simular scrapes grandes.
+
+Uso (desde Proyecto3):
+    python benchmarks/bench_pairwise.py --scale 20
+"""
+
+from __future__ import annotations
+
+import argparse
+import timeit
+from typing import List, Tuple
+
+import pandas as pd
+
+from fixtures import PROJECT_DIR
+from pairwise_features import build_pairwise
+
+TEAMS_CSV = PROJECT_DIR / "data" / "pokemon_showdown_teams_clean.csv"
+
+
+def build_pairwise_loop(df: pd.DataFrame, base_cols: List[str], poke_cols: List[str]) -> pd.DataFrame:
+    """Copia literal del bucle del notebook, como referencia."""
+    pair_rows = []
+    for rid, group in df.groupby('replay_id'):
+        if len(group) != 2:
+            continue
+        g = group.reset_index(drop=True)
+        for idx in range(2):
+            self_row = g.iloc[idx]
+            opp_row = g.iloc[1 - idx]
+            row = {'replay_id': rid, 'player_slot': self_row['player_slot'], 'won_battle': self_row['won_battle']}
+            for col in base_cols:
+                row[f'{col}_self'] = self_row[col]
+                row[f'{col}_opp'] = opp_row[col]
+                row[f'{col}_diff'] = self_row[col] - opp_row[col]
+            for col in poke_cols:
+                row[f'{col}_self'] = self_row[col]
+                row[f'{col}_opp'] = opp_row[col]
+                row[f'{col}_diff'] = self_row[col] - opp_row[col]
+            pair_rows.append(row)
+    return pd.DataFrame(pair_rows)
+
+
+def load_frame(scale: int) -> Tuple[pd.DataFrame, List[str], List[str]]:
+    df = pd.read_csv(TEAMS_CSV)
+    stat_cols = [c for c in df.columns if c.startswith('sum_') or c.startswith('mean_')]
+    df['rating_diff'] = df['rating_diff'].fillna(0)
+    base_cols = stat_cols + ['turns', 'rating_diff']
+    teams = df['team_pokemon'].str.split(',')
+    top50 = teams.explode().value_counts().head(50).index.tolist()
+    poke_cols = []
+    for name in top50:
+        col = f"pk_{name.lower().replace(' ', '_').replace('-', '_')}"
+        df[col] = teams.map(lambda team, name=name: int(name in team))
+        poke_cols.append(col)
+    if scale > 1:
+        copies = []
+        for k in range(scale):
+            copy = df.copy()
+            copy['replay_id'] = copy['replay_id'] + f"-x{k}"
+            copies.append(copy)
+        df = pd.concat(copies, ignore_index=True)
+    return df, base_cols, poke_cols
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--scale", type=int, default=10, help="Veces que se replica el dataset")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    df, base_cols, poke_cols = load_frame(args.scale)
+    print(f"Dataset: {len(df)} filas, {len(base_cols) + len(poke_cols)} features por equipo")
+
+    expected = build_pairwise_loop(df, base_cols, poke_cols)
+    pd.testing.assert_frame_equal(build_pairwise(df, base_cols, poke_cols), expected, check_exact=True)
+
+    candidates = {
+        "bucle groupby/iloc": lambda: build_pairwise_loop(df, base_cols, poke_cols),
+        "vectorizado": lambda: build_pairwise(df, base_cols, poke_cols),
+    }
+    baseline = None
+    for name, fn in candidates.items():
+        best = min(timeit.repeat(fn, number=1, repeat=args.repeat))
+        baseline = baseline or best
+        print(f"{name:20s} {best * 1e3:9.1f} ms  ({len(df) / best:10.0f} filas/s, x{baseline / best:.1f})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Micro-benchmark: parser de una pasada (`replay_parser`) vs. el parser
+anterior basado en `startswith`.
+
+Uso (desde Proyecto3):
+    python benchmarks/bench_parse_replay.py --n 2000
+    python benchmarks/bench_parse_replay.py --archive data/replays
+"""
+
+from __future__ import annotations
+
+import argparse
+import timeit
+from pathlib import Path
+from typing import Dict, Optional
+
+from fixtures import load_corpus
+from replay_parser import parse_replay
+
+
+def parse_replay_legacy(replay_json: Dict) -> Optional[Dict]:
+    """Copia literal del parser original, como referencia."""
+    log = replay_json.get("log", "")
+    if not log:
+        return None
+    teams = {"p1": [], "p2": []}
+    players: Dict[str, Dict[str, Optional[float]]] = {}
+    winner_slot: Optional[str] = None
+    winner_name: Optional[str] = None
+    turns = 0
+    for raw_line in log.splitlines():
+        if raw_line.startswith("|player|"):
+            _, _, slot, name, _, rating, *_ = (raw_line + "||||").split("|")
+            rating_value: Optional[float] = None
+            if rating:
+                try:
+                    rating_value = float(rating)
+                except ValueError:
+                    rating_value = None
+            players[slot] = {"name": name, "rating": rating_value}
+        elif raw_line.startswith("|poke|"):
+            parts = raw_line.split("|")
+            if len(parts) < 4:
+                continue
+            slot = parts[2]
+            species_token = parts[3]
+            species = species_token.split(",")[0].strip()
+            if slot in teams and species:
+                if species not in teams[slot]:
+                    teams[slot].append(species)
+        elif raw_line.startswith("|win|"):
+            winner_name = raw_line.split("|")[2]
+        elif raw_line.startswith("|turn|"):
+            try:
+                turns = int(raw_line.split("|")[2])
+            except ValueError:
+                continue
+    if winner_name:
+        for slot, info in players.items():
+            if info["name"] == winner_name:
+                winner_slot = slot
+                break
+    if not teams["p1"] or not teams["p2"] or winner_slot is None:
+        return None
+    return {
+        "teams": teams,
+        "players": players,
+        "winner_slot": winner_slot,
+        "turns": turns,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--n", type=int, default=2000, help="Replays del corpus")
+    parser.add_argument("--archive", type=Path, help="Usar logs reales de un archivo de replays")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.n, args.archive)
+    lines = sum(r["log"].count("\n") + 1 for r in corpus)
+    print(f"Corpus: {len(corpus)} replays, {lines} líneas")
+
+    for replay in corpus:
+        assert parse_replay(replay) == parse_replay_legacy(replay), replay.get("id")
+
+    candidates = {
+        "legacy (startswith)": lambda: [parse_replay_legacy(r) for r in corpus],
+        "una pasada": lambda: [parse_replay(r) for r in corpus],
+        "una pasada + eventos": lambda: [parse_replay(r, events=True) for r in corpus],
+    }
+    baseline = None
+    for name, fn in candidates.items():
+        best = min(timeit.repeat(fn, number=1, repeat=args.repeat))
+        baseline = baseline or best
+        print(f"{name:22s} {best * 1e3:8.1f} ms  ({len(corpus) / best:9.0f} replays/s, x{baseline / best:.2f})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Corpus de replays para benchmarks.
+
+Si existe un archivo de replays (`scrape_showdown_replays.py --archive`) se
+usan los logs reales. Si no, se generan logs sintéticos con el mismo protocolo
+de Showdown (cabecera, team preview, chat, switches, movimientos, daño,
+debilitamientos) a partir de los equipos reales de
+`data/pokemon_showdown_teams_clean.csv`, de forma determinista por semilla.
+"""
+
+from __future__ import annotations
+
+import random
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+PROJECT_DIR = Path(__file__).resolve().parents[1]
+if str(PROJECT_DIR) not in sys.path:
+    sys.path.insert(0, str(PROJECT_DIR))
+
+TEAMS_CSV = PROJECT_DIR / "data" / "pokemon_showdown_teams_clean.csv"
+
+MOVES = [
+    "Earthquake", "Knock Off", "Stealth Rock", "U-turn", "Rapid Spin", "Make It Rain",
+    "Kowtow Cleave", "Sucker Punch", "Draco Meteor", "Shadow Ball", "Recover", "Protect",
+    "Swords Dance", "Close Combat", "Volt Switch", "Ice Beam", "Surf", "Toxic",
+]
+CHAT = ["gl hf", "gg", "nice", "wow", "lol", "hax", "ty", "rip"]
+
+
+def load_teams(path: Path = TEAMS_CSV) -> List[List[str]]:
+    df = pd.read_csv(path, usecols=["team_pokemon"])
+    return [team.split(",") for team in df["team_pokemon"]]
+
+
+def synthetic_log(team1: List[str], team2: List[str], rng: random.Random, battle_no: int) -> str:
+    names = {"p1": f"player{battle_no}a", "p2": f"player{battle_no}b"}
+    lines = [
+        f"|j|☆{names['p1']}",
+        f"|j|☆{names['p2']}",
+        "|t:|1732410000",
+        "|gametype|singles",
+        f"|player|p1|{names['p1']}|{rng.randint(1, 300)}|{rng.randint(1000, 1800)}",
+        f"|player|p2|{names['p2']}|{rng.randint(1, 300)}|{rng.randint(1000, 1800)}",
+        "|teamsize|p1|6",
+        "|teamsize|p2|6",
+        "|gen|9",
+        "|tier|[Gen 9] OU",
+        "|rated|",
+        "|rule|Species Clause: Limit one of each Pokémon",
+        "|rule|Sleep Clause Mod: Limit one foe put to sleep",
+        "|clearpoke",
+    ]
+    teams = {"p1": team1, "p2": team2}
+    for side, team in teams.items():
+        for species in team:
+            lines.append(f"|poke|{side}|{species}, L{rng.choice([100, 100, 50])}|")
+    lines += ["|teampreview", "|", "|t:|1732410030", "|start"]
+    active = {side: team[0] for side, team in teams.items()}
+    alive = {side: list(team) for side, team in teams.items()}
+    for side, species in active.items():
+        lines.append(f"|switch|{side}a: {species}|{species}, L100|100/100")
+    hp = {(side, s): 100 for side, team in teams.items() for s in team}
+    turn = 0
+    while all(alive.values()) and turn < 60:
+        turn += 1
+        lines.append("|")
+        lines.append(f"|t:|{1732410030 + turn * 20}")
+        lines.append(f"|turn|{turn}")
+        if rng.random() < 0.15:
+            lines.append(f"|c|☆{names[rng.choice(['p1', 'p2'])]}|{rng.choice(CHAT)}")
+        for side, foe in (("p1", "p2"), ("p2", "p1")):
+            attacker, target = active[side], active[foe]
+            if rng.random() < 0.2 and len(alive[side]) > 1:
+                active[side] = rng.choice([s for s in alive[side] if s != attacker])
+                lines.append(f"|switch|{side}a: {active[side]}|{active[side]}, L100|{hp[(side, active[side])]}/100")
+                continue
+            lines.append(f"|move|{side}a: {attacker}|{rng.choice(MOVES)}|{foe}a: {target}")
+            hp[(foe, target)] = max(0, hp[(foe, target)] - rng.randint(10, 70))
+            if hp[(foe, target)] == 0:
+                lines.append(f"|-damage|{foe}a: {target}|0 fnt")
+                lines.append(f"|faint|{foe}a: {target}")
+                alive[foe].remove(target)
+                if not alive[foe]:
+                    break
+                active[foe] = alive[foe][0]
+                lines.append(f"|switch|{foe}a: {active[foe]}|{active[foe]}, L100|{hp[(foe, active[foe])]}/100")
+            else:
+                lines.append(f"|-damage|{foe}a: {target}|{hp[(foe, target)]}/100")
+                if rng.random() < 0.1:
+                    lines.append(f"|-heal|{foe}a: {target}|{min(100, hp[(foe, target)] + 6)}/100|[from] item: Leftovers")
+    winner = "p1" if len(alive["p1"]) >= len(alive["p2"]) else "p2"
+    lines.append(f"|win|{names[winner]}")
+    return "\n".join(lines)
+
+
+def synthetic_replays(n: int, seed: int = 42) -> List[Dict]:
+    rng = random.Random(seed)
+    teams = load_teams()
+    replays = []
+    for i in range(n):
+        team1, team2 = rng.sample(teams, 2)
+        replay_id = f"gen9ou-{2400000000 + i}"
+        replays.append({"id": replay_id, "formatid": "gen9ou", "log": synthetic_log(team1, team2, rng, i)})
+    return replays
+
+
+def load_corpus(n: int, archive_dir: Optional[Path] = None, seed: int = 42) -> List[Dict]:
+    """`n` replays: del archivo si se indica y existe, si no sintéticos."""
+    if archive_dir is not None and Path(archive_dir).exists():
+        from replay_archive import ReplayArchive
+
+        archive = ReplayArchive(archive_dir)
+        replays = []
+        for _, replay_json in archive.iter_replays():
+            replays.append(replay_json)
+            if len(replays) >= n:
+                break
+        if replays:
+            return replays
+    return synthetic_replays(n, seed)
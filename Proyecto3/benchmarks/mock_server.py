@@ -0,0 +1,153 @@
+"""
+Servidor HTTP local que imita el replay server de Showdown y PokéAPI.
+
+Sirve, desde memoria:
+- `/search.json?format=...&page=N`: páginas de 50 IDs del corpus, del más
+  reciente al más antiguo (como el feed real).
+- `/<replay_id>.json`: el JSON del replay.
+- `/api/v2/pokemon/<slug>` y `/api/v2/pokemon-species/<slug>`: stats y
+  variedades construidas a partir del CSV de PokéAPI.
+
+Con `latency` se añade una espera fija por respuesta para simular la red.
+
+Uso:
+    with MockServer(corpus, base_csv) as server:
+        downloader = ReplayDownloader(session, replay_url=server.replay_url)
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from http.server import ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+from urllib.parse import parse_qs, urlsplit
+
+import pandas as pd
+
+import fixtures  # noqa: F401 - agrega Proyecto3 a sys.path
+from http_client import JsonRequestHandler
+
+PAGE_SIZE = 50
+API_STAT_NAMES = {
+    "hp": "hp",
+    "attack": "attack",
+    "defense": "defense",
+    "sp_attack": "special-attack",
+    "sp_defense": "special-defense",
+    "speed": "speed",
+}
+
+
+def pokemon_payloads(base_csv: Path) -> Dict[str, Dict]:
+    """Respuestas de `/pokemon/<slug>` con el formato de PokéAPI."""
+    payloads: Dict[str, Dict] = {}
+    for row in pd.read_csv(base_csv).itertuples(index=False):
+        types = [{"slot": 1, "type": {"name": row.type1}}]
+        if isinstance(row.type2, str) and row.type2:
+            types.append({"slot": 2, "type": {"name": row.type2}})
+        payloads[row.name] = {
+            "name": row.name,
+            "types": types,
+            "stats": [
+                {"base_stat": int(getattr(row, col)), "stat": {"name": api_name}}
+                for col, api_name in API_STAT_NAMES.items()
+            ],
+        }
+    return payloads
+
+
+def species_payloads(slugs: Sequence[str]) -> Dict[str, Dict]:
+    """`/pokemon-species/<slug>`: la forma base más las formas `<slug>-*`."""
+    species: Dict[str, List[Dict]] = {}
+    for slug in slugs:
+        base = slug.split("-")[0]
+        species.setdefault(base, []).append({"is_default": slug == base, "pokemon": {"name": slug}})
+    return {base: {"name": base, "varieties": varieties} for base, varieties in species.items()}
+
+
+class MockServer:
+    """Hilo con un `ThreadingHTTPServer` en un puerto libre de 127.0.0.1."""
+
+    def __init__(self, replays: Sequence[Dict], base_csv: Optional[Path] = None, latency: float = 0.0) -> None:
+        self.replays = {r["id"]: r for r in replays}
+        # El feed de búsqueda va de más reciente a más antiguo.
+        self.order = sorted(self.replays, reverse=True)
+        self.pokemon = pokemon_payloads(base_csv) if base_csv is not None else {}
+        self.species = species_payloads(list(self.pokemon))
+        self.latency = latency
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def search_url(self) -> str:
+        return self.url + "/search.json"
+
+    @property
+    def replay_url(self) -> str:
+        return self.url + "/{replay_id}.json"
+
+    @property
+    def pokeapi_url(self) -> str:
+        return self.url + "/api/v2/pokemon/{slug}"
+
+    @property
+    def species_url(self) -> str:
+        return self.url + "/api/v2/pokemon-species/{slug}"
+
+    def _route(self, path: str, query: Dict[str, List[str]]) -> Optional[object]:
+        if path == "/search.json":
+            page = int(query.get("page", ["1"])[0])
+            ids = self.order[(page - 1) * PAGE_SIZE: page * PAGE_SIZE]
+            return [{"id": replay_id, "uploadtime": 0} for replay_id in ids]
+        if path.startswith("/api/v2/pokemon-species/"):
+            return self.species.get(path.rsplit("/", 1)[-1])
+        if path.startswith("/api/v2/pokemon/"):
+            return self.pokemon.get(path.rsplit("/", 1)[-1])
+        if path.endswith(".json"):
+            return self.replays.get(path.strip("/")[: -len(".json")])
+        return None
+
+    def _handler(self):
+        server = self
+
+        class Handler(JsonRequestHandler):
+            def do_GET(self) -> None:
+                with server._lock:
+                    server.requests += 1
+                if server.latency:
+                    time.sleep(server.latency)
+                parts = urlsplit(self.path)
+                body = server._route(parts.path, parse_qs(parts.query))
+                if body is None:
+                    self._reply(404, {"error": "not found"})
+                else:
+                    self._reply(200, body)
+
+        return Handler
+
+    def start(self) -> "MockServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="mock-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self) -> "MockServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
@@ -0,0 +1,345 @@
+"""
+Suite de benchmarks de los caminos calientes del proyecto.
+
+Cubre scraping (slugs, parser, stats por equipo, filas del CSV y descarga),
+generación sintética, features comparativas y entrenamiento/predicción. La
+red se reemplaza por `MockServer` (replay server + PokéAPI locales) y los
+datos salen de `fixtures.py` y de los CSV de `data/`, así que los resultados
+son reproducibles sin conexión.
+
+Cada benchmark se mide `--repeat` veces (tras una ejecución de calentamiento)
+y se reporta el mejor tiempo, la mediana y el throughput. Los resultados se
+escriben en JSON (`--output`) y se comparan con una línea base guardada
+(`--baseline`): si el mejor tiempo empeora más de `--tolerance`, el proceso
+termina con código 1. Las líneas base son de cada máquina y no se versionan
+(`benchmarks/results/` está en `.gitignore`).
+
+Uso (desde Proyecto3):
+    python benchmarks/run_benchmarks.py --save-baseline
+    python benchmarks/run_benchmarks.py                  # compara con la línea base
+    python benchmarks/run_benchmarks.py --only parse_replay,build_rows --repeat 10
+    python benchmarks/run_benchmarks.py --list
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import functools
+import io
+import json
+import logging
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import timeit
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+from fixtures import PROJECT_DIR, load_corpus
+from mock_server import MockServer
+
+import scrape_showdown_replays as scraper
+from feature_store import build_features
+from generar_dataset_poke_teams import generate_dataset
+from http_client import RateLimiter, make_session
+from replay_parser import parse_replay
+from scrape_showdown_replays import (
+    PokemonStatsResolver,
+    ReplayDownloader,
+    build_rows,
+    iter_replay_ids,
+    showdown_name_to_slug,
+)
+from stat_store import StatStore
+
+BASE_CSV = PROJECT_DIR / "data" / "pokemon_base_pokeapi.csv"
+TEAMS_CSV = PROJECT_DIR / "data" / "pokemon_showdown_teams_clean.csv"
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+DEFAULT_BASELINE = RESULTS_DIR / "baseline.json"
+
+# nombre -> función que prepara el caso y devuelve (función a medir, ítems por ejecución)
+Case = Tuple[Callable[[], object], int]
+BENCHMARKS: Dict[str, Callable[["Context"], Case]] = {}
+
+
+def benchmark(name: str):
+    def register(fn: Callable[["Context"], Case]) -> Callable[["Context"], Case]:
+        BENCHMARKS[name] = fn
+        return fn
+
+    return register
+
+
+class Context:
+    """Datos compartidos entre benchmarks, preparados bajo demanda."""
+
+    def __init__(self, args: argparse.Namespace, workdir: Path) -> None:
+        self.args = args
+        self.workdir = workdir
+
+    @functools.cached_property
+    def corpus(self) -> List[Dict]:
+        return load_corpus(self.args.replays, self.args.archive)
+
+    @functools.cached_property
+    def parsed(self) -> List[Tuple[Dict, Dict]]:
+        pairs = [(replay, parse_replay(replay)) for replay in self.corpus]
+        return [(replay, parsed) for replay, parsed in pairs if parsed is not None]
+
+    @functools.cached_property
+    def teams(self) -> List[List[str]]:
+        return [parsed["teams"][slot] for _, parsed in self.parsed for slot in ("p1", "p2")]
+
+    @functools.cached_property
+    def resolver(self) -> PokemonStatsResolver:
+        return PokemonStatsResolver.from_snapshot((StatStore.open(BASE_CSV), {}))
+
+    @functools.cached_property
+    def server(self) -> MockServer:
+        return MockServer(self.corpus, BASE_CSV).start()
+
+    @functools.cached_property
+    def scraped(self) -> pd.DataFrame:
+        """CSV del scraper replicado `--scale` veces con replay IDs distintos."""
+        df = pd.read_csv(TEAMS_CSV)
+        copies = []
+        for k in range(self.args.scale):
+            copy = df.copy()
+            copy["replay_id"] = copy["replay_id"] + f"-x{k}"
+            copies.append(copy)
+        return pd.concat(copies, ignore_index=True)
+
+    @functools.cached_property
+    def training(self) -> Tuple[pd.DataFrame, np.ndarray]:
+        features = build_features(self.scraped)
+        return features.pairwise[features.feature_cols], features.pairwise["won_battle"].to_numpy()
+
+    def session(self, pool_size: int = 10):
+        """Sesión del proyecto sin límite de tasa: contra el mock solo mide el cliente."""
+        return make_session(pool_size, limiter=RateLimiter({}, default_rate=1e9))
+
+    def close(self) -> None:
+        if "server" in self.__dict__:
+            self.server.stop()
+
+
+@benchmark("slug")
+def bench_slug(ctx: Context) -> Case:
+    names = [name for team in ctx.teams for name in team]
+    return (lambda: [showdown_name_to_slug(name) for name in names]), len(names)
+
+
+@benchmark("parse_replay")
+def bench_parse_replay(ctx: Context) -> Case:
+    corpus = ctx.corpus
+    return (lambda: [parse_replay(replay) for replay in corpus]), len(corpus)
+
+
+@benchmark("team_stats")
+def bench_team_stats(ctx: Context) -> Case:
+    teams, resolver = ctx.teams, ctx.resolver
+    return (lambda: [resolver.team_stats(team) for team in teams]), len(teams)
+
+
+@benchmark("team_stats_cold")
+def bench_team_stats_cold(ctx: Context) -> Case:
+    """Resolver sin las especies del corpus: todas se piden al PokéAPI simulado."""
+    teams = ctx.teams
+    wanted = {showdown_name_to_slug(name) for team in teams for name in team}
+    base = pd.read_csv(BASE_CSV)
+    partial_csv = ctx.workdir / "base_partial.csv"
+    base[~base["name"].isin(wanted)].to_csv(partial_csv, index=False)
+    server = ctx.server
+
+    def run() -> None:
+        with mock.patch.multiple(scraper, POKEAPI_URL=server.pokeapi_url, SPECIES_URL=server.species_url):
+            resolver = PokemonStatsResolver(partial_csv, session=ctx.session())
+            for team in teams:
+                resolver.team_stats(team)
+
+    return run, len(teams)
+
+
+@benchmark("build_rows")
+def bench_build_rows(ctx: Context) -> Case:
+    parsed, resolver = ctx.parsed, ctx.resolver
+    return (lambda: [build_rows(r["id"], r, p, resolver) for r, p in parsed]), len(parsed)
+
+
+@benchmark("download")
+def bench_download(ctx: Context) -> Case:
+    """Paginado del feed + descarga concurrente contra el servidor simulado."""
+    server, n = ctx.server, len(ctx.corpus)
+    pages = n // 50 + 1
+
+    def run() -> int:
+        # Una conexión más para el paginado, que corre en paralelo a las descargas.
+        session = ctx.session(ctx.args.concurrency + 1)
+        ids = iter_replay_ids("gen9ou", n, pages, session=session, search_url=server.search_url)
+        downloader = ReplayDownloader(session, concurrency=ctx.args.concurrency, replay_url=server.replay_url)
+        return sum(1 for _, replay in downloader.iter_replays(ids) if replay is not None)
+
+    return run, n
+
+
+@benchmark("generator")
+def bench_generator(ctx: Context) -> Case:
+    n, output = ctx.args.synthetic, ctx.workdir / "synthetic.csv"
+
+    def run() -> float:
+        # El generador imprime un resumen del dataset; no interesa aquí.
+        with contextlib.redirect_stdout(io.StringIO()):
+            return generate_dataset(BASE_CSV, output, n, 50_000, 42)
+
+    return run, n
+
+
+@benchmark("pairwise")
+def bench_pairwise(ctx: Context) -> Case:
+    df = ctx.scraped
+    return (lambda: build_features(df)), len(df)
+
+
+@benchmark("fit")
+def bench_fit(ctx: Context) -> Case:
+    from lightgbm import LGBMClassifier
+
+    X, y = ctx.training
+    model = LGBMClassifier(n_estimators=200, random_state=42, verbose=-1)
+    return (lambda: model.fit(X, y)), len(X)
+
+
+@benchmark("predict")
+def bench_predict(ctx: Context) -> Case:
+    from lightgbm import LGBMClassifier
+
+    X, y = ctx.training
+    model = LGBMClassifier(n_estimators=200, random_state=42, verbose=-1).fit(X, y)
+    return (lambda: model.predict_proba(X)), len(X)
+
+
+def measure(fn: Callable[[], object], items: int, repeat: int) -> Dict[str, float]:
+    fn()  # calentamiento: cachés, imports perezosos, páginas del disco
+    times = timeit.repeat(fn, number=1, repeat=repeat)
+    best = min(times)
+    return {
+        "best_s": best,
+        "median_s": statistics.median(times),
+        "items": items,
+        "items_per_s": items / best if best > 0 else float("inf"),
+    }
+
+
+def environment() -> Dict[str, str]:
+    import sklearn
+
+    info = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "sklearn": sklearn.__version__,
+    }
+    try:
+        import lightgbm
+
+        info["lightgbm"] = lightgbm.__version__
+    except ImportError:
+        pass
+    return info
+
+
+def compare(current: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """Imprime la comparación y devuelve los benchmarks que empeoraron."""
+    regressions = []
+    print(f"\n{'benchmark':18s} {'base (ms)':>11s} {'actual (ms)':>12s} {'ratio':>7s}")
+    for name, result in current["results"].items():
+        before = baseline.get("results", {}).get(name)
+        if before is None:
+            print(f"{name:18s} {'-':>11s} {result['best_s'] * 1e3:12.2f}     (nuevo)")
+            continue
+        ratio = result["best_s"] / before["best_s"]
+        flag = ""
+        if ratio > 1 + tolerance:
+            regressions.append(name)
+            flag = "  REGRESIÓN"
+        print(f"{name:18s} {before['best_s'] * 1e3:11.2f} {result['best_s'] * 1e3:12.2f} {ratio:7.2f}{flag}")
+    if baseline.get("params") != current["params"]:
+        print("Aviso: la línea base se midió con otros parámetros; la comparación puede no ser válida.")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Suite de benchmarks (scraping, features, entrenamiento)")
+    parser.add_argument("--only", help="Benchmarks separados por coma (por defecto, todos)")
+    parser.add_argument("--list", action="store_true", help="Lista los benchmarks y termina")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--replays", type=int, default=1000, help="Replays del corpus de fixtures")
+    parser.add_argument("--archive", type=Path, help="Usar logs reales de un archivo de replays")
+    parser.add_argument("--scale", type=int, default=10, help="Réplicas del CSV del scraper (features/modelo)")
+    parser.add_argument("--synthetic", type=int, default=100_000, help="Equipos del generador sintético")
+    parser.add_argument("--concurrency", type=int, default=8, help="Hilos de descarga contra el mock")
+    parser.add_argument("--output", type=Path, default=RESULTS_DIR / "latest.json")
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="Guarda estos resultados como línea base")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Empeoramiento relativo tolerado")
+    args = parser.parse_args()
+    # Los avisos del scraper (especies sin stats, reintentos) ensucian la salida.
+    logging.basicConfig(level=logging.ERROR)
+
+    if args.list:
+        print("\n".join(BENCHMARKS))
+        return
+    names = args.only.split(",") if args.only else list(BENCHMARKS)
+    unknown = [name for name in names if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"benchmarks desconocidos: {', '.join(unknown)}")
+
+    current = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "environment": environment(),
+        "params": {k: getattr(args, k) for k in ("repeat", "replays", "scale", "synthetic", "concurrency")},
+        "results": {},
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        ctx = Context(args, Path(tmp))
+        try:
+            for name in names:
+                fn, items = BENCHMARKS[name](ctx)
+                result = measure(fn, items, args.repeat)
+                current["results"][name] = result
+                print(
+                    f"{name:18s} {result['best_s'] * 1e3:10.2f} ms  (mediana {result['median_s'] * 1e3:.2f} ms, "
+                    f"{result['items_per_s']:,.0f} ítems/s)"
+                )
+        finally:
+            ctx.close()
+
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    args.output.write_text(json.dumps(current, indent=2), encoding="utf-8")
+    print(f"\nResultados en {args.output}")
+
+    if args.save_baseline:
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.baseline.write_text(json.dumps(current, indent=2), encoding="utf-8")
+        print(f"Línea base guardada en {args.baseline}")
+        return
+    if not args.baseline.exists():
+        print(f"Sin línea base en {args.baseline} (usar --save-baseline)")
+        return
+    regressions = compare(current, json.loads(args.baseline.read_text(encoding="utf-8")), args.tolerance)
+    if regressions:
+        print(f"\n{len(regressions)} benchmark(s) más lentos que la línea base: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,73 +1,322 @@
-import requests
-import pandas as pd
-from time import sleep
+"""
+Descarga las stats base de PokéAPI a `data/pokemon_base_pokeapi.csv`.
+
+Las ~1000 fichas `/pokemon/{id}` se piden en paralelo (`--workers`) sobre una
+sesión con pool de conexiones; el ritmo lo controla el limitador compartido de
+http_client (token bucket por host + reintentos ante 429/5xx).
+
+Cada ficha descargada se agrega al checkpoint JSONL (`--checkpoint`) ya
+recortada a lo que se usa, junto con su ETag / Last-Modified. Si la ejecución
+se corta, la siguiente retoma desde donde quedó. Con `--refresh` se vuelven a
+pedir todas, pero de forma condicional (`If-None-Match` /
+`If-Modified-Since`): las que no cambiaron responden 304 sin cuerpo.
+
+Con `--with-species` se descargan además las especies y sus variedades
+(formas regionales, megas, etc.): las variedades que no están en el listado
+principal se agregan como filas al CSV, y especies y fichas se vuelcan a la
+caché de PokéAPI del scraper (`--cache`) para que no tenga que consultarlas
+bajo demanda.
+
+Uso:
+    python descargar_pokeapi.py --workers 8 --with-species
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+import pandas as pd
+import requests
+
+from http_client import make_session
+from pokeapi_cache import PokeApiCache
 
 #trabajar todo en entorno .venv
 
 BASE_URL = "https://pokeapi.co/api/v2"
 OUTPUT_PATH = Path("data/pokemon_base_pokeapi.csv")
+CHECKPOINT_PATH = Path("data/pokeapi_checkpoint.jsonl")
+CACHE_PATH = Path("data/pokeapi_cache.sqlite")
 
-def get_all_pokemon(limit=1000): 
-    url = f"{BASE_URL}/pokemon?limit={limit}&offset=0"
-    resp = requests.get(url)
+COLUMNS = [
+    "name", "type1", "type2", "hp", "attack", "defense",
+    "sp_attack", "sp_defense", "speed", "height", "weight",
+]
+
+Parser = Callable[[Dict], Dict]
+
+
+def get_all_pokemon(session: requests.Session, limit: int = 1000, base_url: str = BASE_URL) -> List[str]:
+    url = f"{base_url}/pokemon?limit={limit}&offset=0"
+    resp = session.get(url, timeout=20)
     resp.raise_for_status()
     data = resp.json()
     return [p["url"] for p in data["results"]]
 
-def descargar_pokemon_detalle(limit=1000):
-    urls = get_all_pokemon(limit=limit)
-    registros = []
 
-    for i, url in enumerate(urls, start=1):
-        resp = requests.get(url)
-        resp.raise_for_status()
-        poke = resp.json()
+def parse_pokemon(poke: Dict) -> Dict:
+    """Fila del CSV más la URL de su especie, a partir de `/pokemon/{id}`."""
+    # tipos (puede tener 1 o 2)
+    types = [t["type"]["name"] for t in poke["types"]]
+    # stats base (hp, attack, defense, sp_atk, sp_def, speed)
+    stats_map = {s["stat"]["name"]: s["base_stat"] for s in poke["stats"]}
+    record = {
+        "name": poke["name"],
+        "type1": types[0],
+        "type2": types[1] if len(types) > 1 else None,
+        "hp": stats_map.get("hp"),
+        "attack": stats_map.get("attack"),
+        "defense": stats_map.get("defense"),
+        "sp_attack": stats_map.get("special-attack"),
+        "sp_defense": stats_map.get("special-defense"),
+        "speed": stats_map.get("speed"),
+        # altura y peso
+        "height": poke["height"],
+        "weight": poke["weight"],
+    }
+    return {"record": record, "species": poke["species"]["url"]}
 
-        # nombre
-        name = poke["name"]
 
-        # tipos (puede tener 1 o 2)
-        types = [t["type"]["name"] for t in poke["types"]]
-        type1 = types[0]
-        type2 = types[1] if len(types) > 1 else None
+def parse_species(species: Dict) -> Dict:
+    # Solo se usan las variedades; mismo formato que guarda el scraper.
+    return {"name": species["name"], "varieties": species.get("varieties", [])}
 
-        # stats base (hp, attack, defense, sp_atk, sp_def, speed)
-        stats_map = {s["stat"]["name"]: s["base_stat"] for s in poke["stats"]}
-        hp = stats_map.get("hp")
-        attack = stats_map.get("attack")
-        defense = stats_map.get("defense")
-        sp_atk = stats_map.get("special-attack")
-        sp_def = stats_map.get("special-defense")
-        speed = stats_map.get("speed")
 
-        # altura y peso
-        height = poke["height"]
-        weight = poke["weight"]
+class Checkpoint:
+    """Log JSONL de descargas: una línea `{url, etag, last_modified, data}` por URL.
 
-        registros.append({
-            "name": name,
-            "type1": type1,
-            "type2": type2,
-            "hp": hp,
-            "attack": attack,
-            "defense": defense,
-            "sp_attack": sp_atk,
-            "sp_defense": sp_def,
-            "speed": speed,
-            "height": height,
-            "weight": weight,
-        })
+    Se agrega una línea por ficha apenas llega, así que una interrupción solo
+    pierde las peticiones en vuelo. Ante URLs repetidas (revalidaciones) gana
+    la última línea; al abrir se compacta si hay duplicados.
+    """
 
-        if i % 50 == 0:
-            print(f"Llevamos {i} Pokémon descargados...")
-            # PokéAPI pide ser amable con el servidor
-            sleep(0.2)
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._entries: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+        lines = 0
+        if self.path.exists():
+            with self.path.open(encoding="utf-8") as fh:
+                for line in fh:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        # Última línea a medio escribir por una caída.
+                        continue
+                    self._entries[entry["url"]] = entry
+                    lines += 1
+        if lines > len(self._entries):
+            self._compact()
+        self._fh = self.path.open("a", encoding="utf-8")
 
-    df = pd.DataFrame(registros)
-    OUTPUT_PATH.parent.mkdir(parents=True, exist_ok=True)
-    df.to_csv(OUTPUT_PATH, index=False)
-    print(f"Guardado {OUTPUT_PATH} con {len(df)} filas y {len(df.columns)} columnas")
+    def _compact(self) -> None:
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        with tmp.open("w", encoding="utf-8") as fh:
+            for entry in self._entries.values():
+                fh.write(json.dumps(entry, separators=(",", ":")) + "\n")
+        os.replace(tmp, self.path)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, url: str) -> Optional[Dict]:
+        return self._entries.get(url)
+
+    def record(self, entry: Dict) -> None:
+        with self._lock:
+            self._fh.write(json.dumps(entry, separators=(",", ":")) + "\n")
+            self._fh.flush()
+            self._entries[entry["url"]] = entry
+
+    def close(self) -> None:
+        self._fh.close()
+
+
+def fetch_entry(
+    session: requests.Session, url: str, parse: Parser, previous: Optional[Dict] = None
+) -> Optional[Dict]:
+    """Descarga `url`; None si el servidor confirma que `previous` sigue vigente.
+
+    Un 404 se guarda como entrada con `data = None` para no volver a pedirlo.
+    """
+    headers = {}
+    if previous is not None:
+        if previous.get("etag"):
+            headers["If-None-Match"] = previous["etag"]
+        if previous.get("last_modified"):
+            headers["If-Modified-Since"] = previous["last_modified"]
+    resp = session.get(url, headers=headers, timeout=20)
+    if resp.status_code == 304:
+        return None
+    entry = {
+        "url": url,
+        "etag": resp.headers.get("ETag"),
+        "last_modified": resp.headers.get("Last-Modified"),
+        "data": None,
+    }
+    if resp.status_code == 404:
+        return entry
+    resp.raise_for_status()
+    entry["data"] = parse(resp.json())
+    return entry
+
+
+def fetch_all(
+    session: requests.Session,
+    urls: List[str],
+    parse: Parser,
+    checkpoint: Checkpoint,
+    workers: int = 8,
+    refresh: bool = False,
+    label: str = "Pokémon",
+) -> Tuple[Dict[str, Optional[Dict]], int]:
+    """Descarga en paralelo lo que falte en el checkpoint.
+
+    Devuelve `(url -> data, fallidas)`; las URLs fallidas no aparecen en el
+    diccionario y se reintentan en la próxima ejecución.
+    """
+    pending = [url for url in urls if refresh or checkpoint.get(url) is None]
+    if len(pending) < len(urls):
+        logging.info("%s: %d en checkpoint, %d por descargar", label, len(urls) - len(pending), len(pending))
+    failed = 0
+    unchanged = 0
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(fetch_entry, session, url, parse, checkpoint.get(url) if refresh else None): url
+            for url in pending
+        }
+        for i, future in enumerate(as_completed(futures), start=1):
+            url = futures[future]
+            try:
+                entry = future.result()
+            except (requests.RequestException, KeyError, IndexError, ValueError) as exc:
+                failed += 1
+                logging.warning("Falló %s (%s)", url, exc)
+                continue
+            if entry is None:
+                unchanged += 1
+            else:
+                checkpoint.record(entry)
+            if i % 50 == 0:
+                logging.info("%s: %d/%d descargas...", label, i, len(pending))
+    if refresh:
+        logging.info("%s: %d sin cambios (304)", label, unchanged)
+    results = {}
+    for url in urls:
+        entry = checkpoint.get(url)
+        if entry is not None:
+            results[url] = entry["data"]
+    return results, failed
+
+
+def cache_stats(record: Dict) -> Dict:
+    # Mismo formato que `PokemonStats` del scraper (sin altura ni peso).
+    return {col: record[col] for col in COLUMNS if col not in ("height", "weight")}
+
+
+def descargar_pokemon_detalle(
+    session: requests.Session,
+    checkpoint: Checkpoint,
+    limit: int = 1000,
+    workers: int = 8,
+    refresh: bool = False,
+    with_species: bool = False,
+    cache: Optional[PokeApiCache] = None,
+    base_url: str = BASE_URL,
+) -> Tuple[pd.DataFrame, int]:
+    """DataFrame con una fila por Pokémon (y variedad) y cantidad de fallos."""
+    urls = get_all_pokemon(session, limit=limit, base_url=base_url)
+    pokemon, failed = fetch_all(session, urls, parse_pokemon, checkpoint, workers, refresh)
+    order = list(urls)
+
+    if with_species:
+        species_urls = list(dict.fromkeys(data["species"] for data in pokemon.values() if data))
+        species, species_failed = fetch_all(
+            session, species_urls, parse_species, checkpoint, workers, refresh, label="especies"
+        )
+        failed += species_failed
+        known = set(urls)
+        variety_urls = list(dict.fromkeys(
+            variety["pokemon"]["url"]
+            for data in species.values() if data
+            for variety in data["varieties"]
+            if variety["pokemon"]["url"] not in known
+        ))
+        varieties, variety_failed = fetch_all(
+            session, variety_urls, parse_pokemon, checkpoint, workers, refresh, label="variedades"
+        )
+        failed += variety_failed
+        pokemon.update(varieties)
+        order += variety_urls
+        if cache is not None:
+            for data in species.values():
+                if data:
+                    cache.put("species", data["name"], {"varieties": data["varieties"]})
+            for data in pokemon.values():
+                if data:
+                    cache.put("pokemon", data["record"]["name"], cache_stats(data["record"]))
+
+    registros = [pokemon[url]["record"] for url in order if pokemon.get(url)]
+    return pd.DataFrame(registros, columns=COLUMNS), failed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Descarga stats base de PokéAPI")
+    parser.add_argument("--limit", type=int, default=1000, help="Cantidad de Pokémon del listado")
+    parser.add_argument("--workers", type=int, default=8, help="Descargas simultáneas")
+    parser.add_argument("--output", type=Path, default=OUTPUT_PATH, help="CSV de salida")
+    parser.add_argument("--checkpoint", type=Path, default=CHECKPOINT_PATH, help="Checkpoint JSONL para retomar")
+    parser.add_argument(
+        "--refresh",
+        action="store_true",
+        help="Revalida todo lo del checkpoint con peticiones condicionales (ETag)",
+    )
+    parser.add_argument(
+        "--with-species",
+        action="store_true",
+        help="Descarga también especies y variedades y llena la caché del scraper",
+    )
+    parser.add_argument("--cache", type=Path, default=CACHE_PATH, help="Caché SQLite de PokéAPI del scraper")
+    parser.add_argument("--base-url", default=BASE_URL, help=argparse.SUPPRESS)
+    parser.add_argument("--log-level", default="INFO", help="Nivel de logging")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=getattr(logging, args.log_level.upper(), logging.INFO), format="%(levelname)s %(message)s")
+
+    session = make_session(pool_size=args.workers)
+    checkpoint = Checkpoint(args.checkpoint)
+    cache = PokeApiCache(args.cache) if args.with_species else None
+    try:
+        df, failed = descargar_pokemon_detalle(
+            session,
+            checkpoint,
+            limit=args.limit,
+            workers=args.workers,
+            refresh=args.refresh,
+            with_species=args.with_species,
+            cache=cache,
+            base_url=args.base_url,
+        )
+    finally:
+        checkpoint.close()
+        if cache is not None:
+            cache.close()
+    if failed:
+        logging.error("%d descargas fallaron; volver a ejecutar para retomar (%s)", failed, args.checkpoint)
+        sys.exit(1)
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    df.to_csv(args.output, index=False)
+    logging.info("Guardado %s con %d filas y %d columnas", args.output, len(df), len(df.columns))
+
 
 if __name__ == "__main__":
-    descargar_pokemon_detalle(limit=1000)  
+    main()
@@ -0,0 +1,234 @@
+"""
+Caché de features entre el scraping y el entrenamiento.
+
+`FeatureStore.load_or_build` devuelve las features por equipo
+(`add_team_features`) y el dataset comparativo (`build_pairwise`) de un CSV
+del scraper. La primera vez los calcula y los guarda en formato Arrow IPC
+(Feather v2 sin comprimir); las siguientes los abre con memory-map, sin
+volver a parsear el CSV.
+
+La clave de caché es un sha256 de:
+- el contenido del CSV de entrada,
+- `FEATURE_VERSION` (subirla al cambiar la definición de alguna feature),
+- los parámetros (`top_n` o la lista fija de Pokémon).
+
+Para no releer el CSV en cada arranque, el hash de cada archivo se recuerda
+en `hashes.json` junto con su tamaño y mtime; solo se recalcula si cambian.
+
+Estructura del directorio (por defecto `data/features/`):
+    hashes.json
+    <clave>/teams.arrow      features por equipo
+    <clave>/pairwise.arrow   dataset comparativo
+    <clave>/meta.json        columnas, lista pk_*, medianas de imputación, versión
+
+Requiere `pyarrow`; sin él se calculan las features en memoria sin caché.
+
+Uso (desde Proyecto3):
+    python feature_store.py data/pokemon_showdown_teams_clean.csv
+"""
+
+from __future__ import annotations
+
+import argparse
+import dataclasses
+import hashlib
+import json
+import logging
+import os
+import shutil
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Union
+
+import pandas as pd
+
+from pairwise_features import add_team_features, build_pairwise, team_fill_values, top_pokemon
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+except ImportError:  # pragma: no cover - dependencia opcional
+    pa = None
+    feather = None
+
+FEATURE_VERSION = "2"
+DEFAULT_ROOT = Path("data/features")
+TABLES = ("teams", "pairwise")
+
+
+@dataclasses.dataclass
+class FeatureSet:
+    teams: pd.DataFrame
+    pairwise: pd.DataFrame
+    base_cols: List[str]
+    poke_cols: List[str]
+    # Lo necesario para recalcular las mismas features fuera del entrenamiento.
+    pokemon: List[str] = dataclasses.field(default_factory=list)
+    fill_values: Dict[str, float] = dataclasses.field(default_factory=dict)
+    key: Optional[str] = None
+
+    @property
+    def feature_cols(self) -> List[str]:
+        return [c for c in self.pairwise.columns if c not in {"replay_id", "player_slot", "won_battle"}]
+
+
+def file_sha256(path: Path, block_size: int = 1 << 20) -> str:
+    digest = hashlib.sha256()
+    with Path(path).open("rb") as fh:
+        for block in iter(lambda: fh.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def build_features(
+    df: pd.DataFrame, top_n: int = 50, pokemon: Optional[Sequence[str]] = None
+) -> FeatureSet:
+    pokemon = list(pokemon) if pokemon is not None else top_pokemon(df, top_n)
+    fill_values = team_fill_values(df)
+    teams, base_cols, poke_cols = add_team_features(df, pokemon=pokemon, fill_values=fill_values)
+    pairwise = build_pairwise(teams, base_cols, poke_cols)
+    return FeatureSet(teams, pairwise, base_cols, poke_cols, pokemon, fill_values)
+
+
+class FeatureStore:
+    """Directorio de conjuntos de features indexados por clave de contenido."""
+
+    def __init__(self, root: Union[str, Path] = DEFAULT_ROOT, keep: int = 3) -> None:
+        self.root = Path(root)
+        self.keep = keep
+        self._hashes_path = self.root / "hashes.json"
+
+    # -- claves --------------------------------------------------------------
+
+    def _source_hash(self, path: Path) -> str:
+        """sha256 de `path`, reutilizando el último si tamaño y mtime no cambiaron."""
+        stat = path.stat()
+        hashes: Dict[str, Dict] = {}
+        if self._hashes_path.exists():
+            hashes = json.loads(self._hashes_path.read_text(encoding="utf-8"))
+        entry = hashes.get(str(path.resolve()))
+        if entry and entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns:
+            return entry["sha256"]
+        digest = file_sha256(path)
+        hashes[str(path.resolve())] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": digest}
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp = self._hashes_path.with_name(self._hashes_path.name + ".tmp")
+        tmp.write_text(json.dumps(hashes, indent=2), encoding="utf-8")
+        os.replace(tmp, self._hashes_path)
+        return digest
+
+    def key(self, source: Path, top_n: int = 50, pokemon: Optional[Sequence[str]] = None) -> str:
+        params = {"top_n": top_n, "pokemon": list(pokemon) if pokemon is not None else None}
+        digest = hashlib.sha256()
+        digest.update(self._source_hash(Path(source)).encode())
+        digest.update(FEATURE_VERSION.encode())
+        digest.update(json.dumps(params, sort_keys=True).encode())
+        return digest.hexdigest()[:16]
+
+    # -- lectura / escritura ---------------------------------------------------
+
+    def load(self, key: str) -> Optional[FeatureSet]:
+        """Abre un conjunto guardado; None si no existe."""
+        directory = self.root / key
+        if pa is None or not (directory / "meta.json").exists():
+            return None
+        meta = json.loads((directory / "meta.json").read_text(encoding="utf-8"))
+        frames = {name: self.load_table(key, name).to_pandas(split_blocks=True) for name in TABLES}
+        # Marca de uso para que `prune` conserve los más recientes.
+        os.utime(directory)
+        return FeatureSet(
+            frames["teams"],
+            frames["pairwise"],
+            meta["base_cols"],
+            meta["poke_cols"],
+            meta["pokemon"],
+            meta["fill_values"],
+            key,
+        )
+
+    def load_table(self, key: str, name: str) -> "pa.Table":
+        """Tabla Arrow respaldada por memory-map (sin copia)."""
+        if pa is None:
+            raise ImportError("El feature store requiere instalar pyarrow")
+        source = pa.memory_map(str(self.root / key / f"{name}.arrow"), "r")
+        return pa.ipc.open_file(source).read_all()
+
+    def save(self, key: str, features: FeatureSet, source: Optional[Path] = None) -> None:
+        if pa is None:
+            raise ImportError("El feature store requiere instalar pyarrow")
+        directory = self.root / key
+        partial = self.root / f"{key}.partial"
+        if partial.exists():
+            shutil.rmtree(partial)
+        partial.mkdir(parents=True)
+        frames = {"teams": features.teams, "pairwise": features.pairwise}
+        for name, frame in frames.items():
+            # Sin compresión: es lo que permite abrirlos con memory-map.
+            feather.write_feather(frame.reset_index(drop=True), str(partial / f"{name}.arrow"), compression="uncompressed")
+        meta = {
+            "version": FEATURE_VERSION,
+            "source": str(source) if source is not None else None,
+            "created": time.time(),
+            "base_cols": features.base_cols,
+            "poke_cols": features.poke_cols,
+            "pokemon": features.pokemon,
+            "fill_values": features.fill_values,
+        }
+        (partial / "meta.json").write_text(json.dumps(meta, indent=2), encoding="utf-8")
+        if directory.exists():
+            shutil.rmtree(directory)
+        os.replace(partial, directory)
+        features.key = key
+
+    def prune(self) -> None:
+        """Deja solo los `keep` conjuntos usados más recientemente."""
+        if not self.root.exists():
+            return
+        entries = [p for p in self.root.iterdir() if p.is_dir() and not p.name.endswith(".partial")]
+        entries.sort(key=lambda p: p.stat().st_mtime, reverse=True)
+        for old in entries[self.keep:]:
+            shutil.rmtree(old, ignore_errors=True)
+
+    # -- API principal ---------------------------------------------------------
+
+    def load_or_build(
+        self,
+        source: Union[str, Path],
+        top_n: int = 50,
+        pokemon: Optional[Sequence[str]] = None,
+        rebuild: bool = False,
+    ) -> FeatureSet:
+        source = Path(source)
+        if pa is None:
+            logging.warning("pyarrow no está instalado: se calculan las features sin caché")
+            return build_features(pd.read_csv(source), top_n, pokemon)
+        key = self.key(source, top_n, pokemon)
+        if not rebuild:
+            cached = self.load(key)
+            if cached is not None:
+                logging.info("Features %s cargadas desde %s", key, self.root)
+                return cached
+        logging.info("Calculando features para %s (clave %s)", source, key)
+        features = build_features(pd.read_csv(source), top_n, pokemon)
+        self.save(key, features, source)
+        self.prune()
+        return features
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Precalcula y cachea las features de entrenamiento")
+    parser.add_argument("source", type=Path, nargs="?", default=Path("data/pokemon_showdown_teams_clean.csv"))
+    parser.add_argument("--root", type=Path, default=DEFAULT_ROOT, help="Directorio del feature store")
+    parser.add_argument("--top-n", type=int, default=50, help="Pokémon más frecuentes con dummy pk_*")
+    parser.add_argument("--rebuild", action="store_true", help="Recalcula aunque haya caché")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(message)s")
+
+    start = time.perf_counter()
+    features = FeatureStore(args.root).load_or_build(args.source, top_n=args.top_n, rebuild=args.rebuild)
+    elapsed = time.perf_counter() - start
+    print(f"teams {features.teams.shape} | pairwise {features.pairwise.shape} | {elapsed * 1e3:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
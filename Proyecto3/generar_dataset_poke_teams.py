@@ -1,7 +1,31 @@
-import pandas as pd
-import numpy as np
-import random
+"""
+Dataset sintético de equipos (legado): 6 Pokémon al azar por fila, sus stats
+agregados, un `team_power_score` no lineal con ruido y la etiqueta binaria
+`strong_team` según la mediana del score.
+
+Los equipos se generan por bloques de `--chunk-size` filas con NumPy: una
+matriz de índices `(chunk, 6)` sin repetidos por fila, un gather sobre la
+matriz de stats y los términos del score sobre arrays completos. Cada bloque
+se escribe a disco apenas se genera, así que la memoria no crece con `--n`.
+
+La mediana se necesita antes de escribir la etiqueta, por eso hay dos
+pasadas: la primera solo calcula los scores (8 bytes por fila) y la segunda
+regenera cada bloque con la misma semilla y lo vuelca al CSV. El resultado es
+reproducible para un mismo `--seed` y `--chunk-size`.
+
+Uso:
+    python generar_dataset_poke_teams.py --n 10000000 --chunk-size 500000
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
 from pathlib import Path
+from typing import Iterator, List, Tuple
+
+import numpy as np
+import pandas as pd
 
 #trabajar todo en entorno .venv
 
@@ -9,109 +33,134 @@ DATA_DIR = Path("data")
 BASE_DATA = DATA_DIR / "pokemon_base_pokeapi.csv"
 OUTPUT_DATA = DATA_DIR / "pokemon_teams_100k.csv"
 
-# Semillas para reproducibilidad
-random.seed(42)
-np.random.seed(42)
-
-# 1. Leer el dataset base de Pokémon (generado con PokéAPI)
-df = pd.read_csv(BASE_DATA)
-
-# Elegimos las columnas numéricas que usaremos como features
-stat_cols = ["hp", "attack", "defense", "sp_attack", "sp_defense", "speed"]
-
-# Aseguramos que sean numéricas
-df[stat_cols] = df[stat_cols].apply(pd.to_numeric, errors="coerce")
-df = df.dropna(subset=stat_cols).reset_index(drop=True)
-
-n_pokemon = len(df)
-print(f"Pokémon disponibles: {n_pokemon}")
-
-if n_pokemon < 6:
-    raise ValueError("Se necesitan al menos 6 Pokémon en el dataset base.")
-
-# 2. Generar equipos sintéticos
-N_EJEMPLOS = 100_000   # tamaño del dataset final
-
-rows = []
-for _ in range(N_EJEMPLOS):
-    # Elegimos 6 Pokémon distintos al azar (equipo clásico 6v6)
-    indices = random.sample(range(n_pokemon), 6)
-    team = df.iloc[indices]
-
-    # Nombres de los Pokémon
-    names = list(team["name"].values)
-
-    # Stats agregados del equipo (suma y promedio)
-    sum_stats = team[stat_cols].sum()
-    mean_stats = team[stat_cols].mean()
-
-    sum_hp = sum_stats["hp"]
-    sum_attack = sum_stats["attack"]
-    sum_defense = sum_stats["defense"]
-    sum_sp_attack = sum_stats["sp_attack"]
-    sum_sp_defense = sum_stats["sp_defense"]
-    sum_speed = sum_stats["speed"]
-
-    # 3. Crear un "score" sintético de fuerza del equipo (no lineal)
-    #
-    # Justificación (para tu informe):
-    # - Inspirado en ratings compuestos de juegos como FIFA y en fórmulas
-    #   de daño de Pokémon: el ataque y la velocidad tienen impacto
-    #   ligeramente superlineal; la defensa y el bulk tienen rendimientos
-    #   decrecientes; la velocidad combinada con ataque especial modela
-    #   "glass cannons" rápidos, etc.
-    #
-    # - attack_term: ataque total con ligera potencia > 1
-    # - speed_term: interacción entre velocidad y ataque especial
-    # - bulk_term: defensa + defensa especial + parte de HP, comprimido con log
-    # - Se añade ruido gaussiano para simular variabilidad de combates.
-
-    attack_term = sum_attack ** 1.1
-    speed_term = np.sqrt(sum_speed * sum_sp_attack + 1.0)
-    bulk_term = np.log1p(sum_defense + sum_sp_defense + 0.5 * sum_hp)
-
-    team_power = (
-        0.40 * attack_term +
-        0.35 * speed_term +
-        0.25 * bulk_term
-    )
-
-    # Añadimos ruido aleatorio para simular variabilidad (crits, matchups, etc.)
-    team_power_noisy = team_power + np.random.normal(0, 20)
-
-    rows.append({
-        "p1_name": names[0],
-        "p2_name": names[1],
-        "p3_name": names[2],
-        "p4_name": names[3],
-        "p5_name": names[4],
-        "p6_name": names[5],
-        "sum_hp": sum_hp,
-        "sum_attack": sum_attack,
-        "sum_defense": sum_defense,
-        "sum_sp_attack": sum_sp_attack,
-        "sum_sp_defense": sum_sp_defense,
-        "sum_speed": sum_speed,
-        "mean_hp": mean_stats["hp"],
-        "mean_attack": mean_stats["attack"],
-        "mean_defense": mean_stats["defense"],
-        "mean_sp_attack": mean_stats["sp_attack"],
-        "mean_sp_defense": mean_stats["sp_defense"],
-        "mean_speed": mean_stats["speed"],
-        "team_power_score": team_power_noisy
-    })
-
-big_df = pd.DataFrame(rows)
-
-# 4. Crear etiqueta binaria según la mediana del team_power_score
-threshold = big_df["team_power_score"].median()
-big_df["strong_team"] = (big_df["team_power_score"] >= threshold).astype(int)
-
-print(big_df.head())
-print(big_df.shape)
-
-# 5. Guardar a CSV
-DATA_DIR.mkdir(parents=True, exist_ok=True)
-big_df.to_csv(OUTPUT_DATA, index=False)
-print(f"Guardado {OUTPUT_DATA}")
-print(f"Umbral (mediana) de team_power_score: {threshold:.2f}")
+# Elegimos las columnas numéricas que usaremos como features
+STAT_COLS = ["hp", "attack", "defense", "sp_attack", "sp_defense", "speed"]
+TEAM_SIZE = 6
+NAME_COLS = [f"p{i + 1}_name" for i in range(TEAM_SIZE)]
+NOISE_STD = 20.0
+
+
+def load_base(path: Path) -> Tuple[np.ndarray, np.ndarray]:
+    """Nombres y matriz `(n_pokemon, 6)` de stats del dataset base."""
+    df = pd.read_csv(path)
+    # Aseguramos que sean numéricas
+    df[STAT_COLS] = df[STAT_COLS].apply(pd.to_numeric, errors="coerce")
+    df = df.dropna(subset=STAT_COLS).reset_index(drop=True)
+    if len(df) < TEAM_SIZE:
+        raise ValueError("Se necesitan al menos 6 Pokémon en el dataset base.")
+    return df["name"].to_numpy(), df[STAT_COLS].to_numpy()
+
+
+def draw_teams(rng: np.random.Generator, n_rows: int, n_pokemon: int) -> np.ndarray:
+    """Matriz `(n_rows, 6)` de índices distintos dentro de cada fila.
+
+    Se sortea con reemplazo y se vuelven a sortear solo las filas con algún
+    índice repetido (con ~1000 Pokémon son ~1.5% en la primera ronda).
+    """
+    teams = rng.integers(0, n_pokemon, size=(n_rows, TEAM_SIZE))
+    redo = np.arange(n_rows)
+    while redo.size:
+        ordered = np.sort(teams[redo], axis=1)
+        repeated = (ordered[:, 1:] == ordered[:, :-1]).any(axis=1)
+        redo = redo[repeated]
+        if redo.size:
+            teams[redo] = rng.integers(0, n_pokemon, size=(redo.size, TEAM_SIZE))
+    return teams
+
+
+def team_power(sums: np.ndarray) -> np.ndarray:
+    """`team_power_score` sin ruido a partir de las sumas `(n, 6)`.
+
+    Justificación (para tu informe):
+    - Inspirado en ratings compuestos de juegos como FIFA y en fórmulas
+      de daño de Pokémon: el ataque y la velocidad tienen impacto
+      ligeramente superlineal; la defensa y el bulk tienen rendimientos
+      decrecientes; la velocidad combinada con ataque especial modela
+      "glass cannons" rápidos, etc.
+
+    - attack_term: ataque total con ligera potencia > 1
+    - speed_term: interacción entre velocidad y ataque especial
+    - bulk_term: defensa + defensa especial + parte de HP, comprimido con log
+    """
+    sum_hp, sum_attack, sum_defense, sum_sp_attack, sum_sp_defense, sum_speed = sums.astype(np.float64).T
+    attack_term = sum_attack ** 1.1
+    speed_term = np.sqrt(sum_speed * sum_sp_attack + 1.0)
+    bulk_term = np.log1p(sum_defense + sum_sp_defense + 0.5 * sum_hp)
+    return 0.40 * attack_term + 0.35 * speed_term + 0.25 * bulk_term
+
+
+def chunk_sizes(n: int, chunk_size: int) -> List[int]:
+    sizes = [chunk_size] * (n // chunk_size)
+    if n % chunk_size:
+        sizes.append(n % chunk_size)
+    return sizes
+
+
+def generate_chunks(
+    stats: np.ndarray, n: int, chunk_size: int, seed: int
+) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+    """`(índices, score con ruido)` por bloque; cada bloque tiene su propio RNG."""
+    sizes = chunk_sizes(n, chunk_size)
+    for size, child in zip(sizes, np.random.SeedSequence(seed).spawn(len(sizes))):
+        rng = np.random.default_rng(child)
+        teams = draw_teams(rng, size, len(stats))
+        sums = stats[teams].sum(axis=1)
+        # Añadimos ruido aleatorio para simular variabilidad (crits, matchups, etc.)
+        scores = team_power(sums) + rng.normal(0, NOISE_STD, size)
+        yield teams, scores
+
+
+def build_frame(names: np.ndarray, stats: np.ndarray, teams: np.ndarray, scores: np.ndarray, threshold: float) -> pd.DataFrame:
+    gathered = stats[teams]
+    sums = gathered.sum(axis=1)
+    means = gathered.mean(axis=1)
+    columns = {col: names[teams[:, i]] for i, col in enumerate(NAME_COLS)}
+    columns.update({f"sum_{col}": sums[:, j] for j, col in enumerate(STAT_COLS)})
+    columns.update({f"mean_{col}": means[:, j] for j, col in enumerate(STAT_COLS)})
+    columns["team_power_score"] = scores
+    # Etiqueta binaria según la mediana del team_power_score
+    columns["strong_team"] = (scores >= threshold).astype(int)
+    return pd.DataFrame(columns)
+
+
+def generate_dataset(base: Path, output: Path, n: int, chunk_size: int, seed: int) -> float:
+    """Genera `n` equipos en `output` y devuelve el umbral (mediana) usado."""
+    names, stats = load_base(base)
+    print(f"Pokémon disponibles: {len(names)}")
+
+    # Pasada 1: solo scores, para la mediana global.
+    scores = np.concatenate([s for _, s in generate_chunks(stats, n, chunk_size, seed)])
+    threshold = float(np.median(scores))
+    del scores
+
+    # Pasada 2: se regeneran los bloques (mismas semillas) y se escriben.
+    output.parent.mkdir(parents=True, exist_ok=True)
+    partial = output.with_name(output.name + ".partial")
+    with partial.open("w", newline="", encoding="utf-8") as fh:
+        for i, (teams, chunk_scores) in enumerate(generate_chunks(stats, n, chunk_size, seed)):
+            frame = build_frame(names, stats, teams, chunk_scores, threshold)
+            if i == 0:
+                print(frame.head())
+            frame.to_csv(fh, header=(i == 0), index=False)
+    os.replace(partial, output)
+    return threshold
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Genera el dataset sintético de equipos")
+    parser.add_argument("--n", type=int, default=100_000, help="Cantidad de equipos a generar")
+    parser.add_argument("--chunk-size", type=int, default=100_000, help="Equipos por bloque")
+    parser.add_argument("--seed", type=int, default=42, help="Semilla para reproducibilidad")
+    parser.add_argument("--base", type=Path, default=BASE_DATA, help="CSV base de PokéAPI")
+    parser.add_argument("--output", type=Path, default=OUTPUT_DATA, help="CSV de salida")
+    args = parser.parse_args()
+    if args.n <= 0 or args.chunk_size <= 0:
+        parser.error("--n y --chunk-size deben ser positivos")
+
+    threshold = generate_dataset(args.base, args.output, args.n, args.chunk_size, args.seed)
+    print(f"Guardado {args.output} ({args.n} filas)")
+    print(f"Umbral (mediana) de team_power_score: {threshold:.2f}")
+
+
+if __name__ == "__main__":
+    main()
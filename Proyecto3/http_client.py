@@ -0,0 +1,229 @@
+"""
+Utilidades HTTP compartidas por los scripts de descarga (Showdown y PokéAPI).
+
+Centraliza la creación de sesiones `requests` con pool de conexiones para que
+todos los clientes reutilicen sockets keep-alive en lugar de abrir una
+conexión nueva por cada `requests.get`.
+
+El ritmo de peticiones lo controla un limitador token bucket por host
+compartido por todas las sesiones del proceso. Ante 429/5xx se reintenta con
+backoff exponencial (respetando `Retry-After`) y se reduce temporalmente la
+tasa de ese host; cada respuesta correcta la vuelve a subir poco a poco.
+
+Con las métricas activas (`instrumentation.enable()`) cada petición registra
+su latencia por endpoint, los bytes recibidos, los reintentos y el tiempo
+dormido por el limitador.
+
+Del lado servidor, `JsonRequestHandler` es la base de los servicios HTTP
+locales (`scoring_service.py`, el servidor simulado de `benchmarks/`).
+"""
+
+from __future__ import annotations
+
+import email.utils
+import json
+import logging
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler
+from typing import Dict, Mapping, Optional
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import instrumentation
+
+USER_AGENT = "Proyecto-Final-ML/1.0 (+https://github.com/Chimichami/Proyecto-Final-ML)"
+
+# Peticiones por segundo permitidas por host (ráfaga = el doble).
+DEFAULT_RATES: Dict[str, float] = {
+    "replay.pokemonshowdown.com": 10.0,
+    "pokeapi.co": 10.0,
+}
+DEFAULT_RATE = 10.0
+
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+
+class TokenBucket:
+    """Token bucket thread-safe con tasa adaptativa (AIMD)."""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None, min_rate: float = 0.2) -> None:
+        if rate <= 0:
+            raise ValueError("rate debe ser > 0")
+        self.max_rate = rate
+        self.rate = rate
+        self.min_rate = min(min_rate, rate)
+        self.capacity = capacity if capacity is not None else max(1.0, 2 * rate)
+        self._tokens = self.capacity
+        self._last = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+        self._last = now
+
+    def acquire(self) -> float:
+        """Reserva un token y duerme lo necesario. Devuelve el tiempo esperado."""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self._tokens -= 1
+            wait = max(self._paused_until - now, -self._tokens / self.rate, 0.0)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def throttle(self, delay: float) -> None:
+        """El servidor pidió frenar: pausa el host `delay` s y reduce la tasa a la mitad."""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self._paused_until = max(self._paused_until, now + delay)
+            self._tokens = min(self._tokens, 0.0)
+            self.rate = max(self.min_rate, self.rate / 2)
+
+    def success(self) -> None:
+        if self.rate < self.max_rate:
+            with self._lock:
+                self.rate = min(self.max_rate, self.rate + 0.05 * self.max_rate)
+
+
+class RateLimiter:
+    """Conjunto de token buckets, uno por host."""
+
+    def __init__(self, rates: Optional[Mapping[str, float]] = None, default_rate: float = DEFAULT_RATE) -> None:
+        self.rates = dict(DEFAULT_RATES if rates is None else rates)
+        self.default_rate = default_rate
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def bucket(self, host: str) -> TokenBucket:
+        bucket = self._buckets.get(host)
+        if bucket is None:
+            with self._lock:
+                bucket = self._buckets.get(host)
+                if bucket is None:
+                    bucket = TokenBucket(self.rates.get(host, self.default_rate))
+                    self._buckets[host] = bucket
+        return bucket
+
+
+_shared_limiter = RateLimiter()
+
+
+def shared_limiter() -> RateLimiter:
+    """Limitador común a todas las sesiones creadas sin uno explícito."""
+    return _shared_limiter
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Interpreta `Retry-After` en segundos o como fecha HTTP."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, when.timestamp() - time.time())
+
+
+class ThrottledSession(requests.Session):
+    """`requests.Session` que pasa cada petición por el limitador y reintenta."""
+
+    def __init__(
+        self,
+        limiter: RateLimiter,
+        max_retries: int = 5,
+        backoff: float = 0.5,
+        max_backoff: float = 60.0,
+    ) -> None:
+        super().__init__()
+        self.limiter = limiter
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+
+    def _backoff_delay(self, attempt: int) -> float:
+        delay = min(self.max_backoff, self.backoff * 2**attempt)
+        return delay * (0.5 + random.random() / 2)
+
+    def request(self, method, url, *args, **kwargs):  # type: ignore[override]
+        bucket = self.limiter.bucket(urlsplit(url).hostname or "")
+        metrics = instrumentation.active()
+        endpoint = instrumentation.endpoint_label(url) if metrics.enabled else None
+        attempt = 0
+        while True:
+            waited = bucket.acquire()
+            if waited:
+                metrics.incr("http.throttle_wait_s", waited)
+            try:
+                with metrics.timer("http.request", endpoint):
+                    resp = super().request(method, url, *args, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as exc:
+                metrics.incr("http.network_errors")
+                if attempt >= self.max_retries:
+                    raise
+                delay = self._backoff_delay(attempt)
+                logging.debug("Error de red en %s (%s); reintento en %.1fs", url, exc, delay)
+                metrics.incr("http.retries")
+                time.sleep(delay)
+                attempt += 1
+                continue
+            if metrics.enabled:
+                metrics.incr("http.requests")
+                metrics.incr(f"http.status_{resp.status_code}")
+                if not kwargs.get("stream"):
+                    metrics.incr("http.bytes", len(resp.content))
+            if resp.status_code not in RETRY_STATUSES or attempt >= self.max_retries:
+                if resp.status_code < 400:
+                    bucket.success()
+                return resp
+            retry_after = parse_retry_after(resp.headers.get("Retry-After"))
+            delay = min(self.max_backoff, retry_after) if retry_after is not None else self._backoff_delay(attempt)
+            logging.debug("HTTP %s en %s; reintento en %.1fs", resp.status_code, url, delay)
+            bucket.throttle(delay)
+            metrics.incr("http.retries")
+            resp.close()
+            attempt += 1
+
+
+def make_session(
+    pool_size: int = 10,
+    limiter: Optional[RateLimiter] = None,
+    max_retries: int = 5,
+) -> ThrottledSession:
+    """Crea una sesión con un pool de `pool_size` conexiones por host."""
+    session = ThrottledSession(limiter or shared_limiter(), max_retries=max_retries)
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers["User-Agent"] = USER_AGENT
+    return session
+
+
+class JsonRequestHandler(BaseHTTPRequestHandler):
+    """Handler keep-alive que responde JSON."""
+
+    protocol_version = "HTTP/1.1"
+    # Cabeceras y cuerpo van en dos escrituras: sin esto, Nagle + ACK
+    # retrasado suman ~40 ms por respuesta con keep-alive.
+    disable_nagle_algorithm = True
+
+    def log_message(self, fmt, *args) -> None:
+        logging.debug("%s - " + fmt, self.address_string(), *args)
+
+    def _reply(self, status: int, body: object) -> None:
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
@@ -0,0 +1,307 @@
+"""
+Métricas ligeras para el scraper: contadores, tiempos por etapa e
+histogramas de latencia por endpoint HTTP.
+
+Por defecto está activo un registro nulo: `incr`, `observe` y `timer` son
+no-ops (un `nullcontext` compartido en el caso de `timer`), así que el costo
+con las métricas apagadas es una llamada a función. `enable()` instala un
+`Recorder` real, que acumula en memoria y al final se vuelca como:
+
+- tabla de texto (`format_summary`),
+- JSON (`to_json`),
+- formato de texto de Prometheus (`to_prometheus`).
+
+Los tiempos se guardan en histogramas de buckets fijos (los percentiles son
+aproximados, interpolando dentro del bucket).
+
+`profiling("cprofile" | "pyinstrument", salida)` envuelve una ejecución con
+un profiler; pyinstrument es opcional.
+
+Uso:
+    import instrumentation as instr
+    instr.enable()
+    with instr.timer("stage.parse"):
+        ...
+    instr.incr("replays.skipped")
+    print(instr.active().format_summary())
+"""
+
+from __future__ import annotations
+
+import bisect
+import contextlib
+import cProfile
+import io
+import json
+import logging
+import math
+import pstats
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+try:
+    import pyinstrument
+except ImportError:  # pragma: no cover - dependencia opcional
+    pyinstrument = None
+
+# Límites superiores de los buckets, en segundos (0.1 ms .. 60 s).
+BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0,
+)
+PROM_PREFIX = "showdown_"
+PROFILERS = ("cprofile", "pyinstrument")
+
+TimerKey = Tuple[str, Optional[str]]
+
+
+class Histogram:
+    """Conteo por bucket + suma y máximo (no thread-safe; lo protege `Recorder`)."""
+
+    __slots__ = ("counts", "count", "total", "max")
+
+    def __init__(self) -> None:
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds: float) -> None:
+        self.counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def quantile(self, q: float) -> float:
+        if not self.count:
+            return math.nan
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if n and seen + n >= rank:
+                lower = BUCKETS[i - 1] if i > 0 else 0.0
+                upper = BUCKETS[i] if i < len(BUCKETS) else self.max
+                return min(lower + (upper - lower) * (rank - seen) / n, self.max)
+            seen += n
+        return self.max
+
+    def summary(self) -> Dict[str, float]:
+        return {
+            "count": self.count,
+            "total_s": self.total,
+            "mean_ms": self.total / self.count * 1e3 if self.count else math.nan,
+            "p50_ms": self.quantile(0.5) * 1e3,
+            "p99_ms": self.quantile(0.99) * 1e3,
+            "max_ms": self.max * 1e3,
+        }
+
+
+class Metrics:
+    """Registro nulo: no guarda nada."""
+
+    enabled = False
+
+    def incr(self, name: str, value: float = 1) -> None:
+        pass
+
+    def observe(self, name: str, seconds: float, label: Optional[str] = None) -> None:
+        pass
+
+    def timer(self, name: str, label: Optional[str] = None):
+        return _NULL_TIMER
+
+
+_NULL_TIMER = contextlib.nullcontext()
+
+
+class _Timer:
+    __slots__ = ("recorder", "name", "label", "start")
+
+    def __init__(self, recorder: "Recorder", name: str, label: Optional[str]) -> None:
+        self.recorder = recorder
+        self.name = name
+        self.label = label
+
+    def __enter__(self) -> "_Timer":
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.recorder.observe(self.name, time.perf_counter() - self.start, self.label)
+
+
+class Recorder(Metrics):
+    """Contadores e histogramas en memoria, thread-safe."""
+
+    enabled = True
+
+    def __init__(self) -> None:
+        self.counters: Dict[str, float] = {}
+        self.timers: Dict[TimerKey, Histogram] = {}
+        self.started = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def incr(self, name: str, value: float = 1) -> None:
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def observe(self, name: str, seconds: float, label: Optional[str] = None) -> None:
+        with self._lock:
+            hist = self.timers.get((name, label))
+            if hist is None:
+                hist = self.timers[(name, label)] = Histogram()
+            hist.add(seconds)
+
+    def timer(self, name: str, label: Optional[str] = None) -> _Timer:
+        return _Timer(self, name, label)
+
+    # -- salidas ---------------------------------------------------------------
+
+    def summary(self) -> Dict:
+        with self._lock:
+            timers = {
+                name if label is None else f"{name}[{label}]": hist.summary()
+                for (name, label), hist in sorted(self.timers.items(), key=lambda item: (item[0][0], item[0][1] or ""))
+            }
+            return {
+                "elapsed_s": time.perf_counter() - self.started,
+                "counters": dict(sorted(self.counters.items())),
+                "timers": timers,
+            }
+
+    def format_summary(self) -> str:
+        data = self.summary()
+        lines = [f"Resumen de la ejecución ({data['elapsed_s']:.1f} s)"]
+        if data["timers"]:
+            width = max(len(name) for name in data["timers"])
+            lines.append(f"  {'etapa':{width}s} {'n':>7s} {'total s':>9s} {'media ms':>9s} {'p50 ms':>8s} {'p99 ms':>8s}")
+            for name, t in data["timers"].items():
+                lines.append(
+                    f"  {name:{width}s} {t['count']:7d} {t['total_s']:9.2f} {t['mean_ms']:9.2f} "
+                    f"{t['p50_ms']:8.2f} {t['p99_ms']:8.2f}"
+                )
+        for name, value in data["counters"].items():
+            lines.append(f"  {name}: {value:g}")
+        return "\n".join(lines)
+
+    def to_json(self, path: Path) -> None:
+        Path(path).write_text(json.dumps(self.summary(), indent=2), encoding="utf-8")
+
+    def to_prometheus(self) -> str:
+        with self._lock:
+            counters = sorted(self.counters.items())
+            timers = sorted(self.timers.items(), key=lambda item: (item[0][0], item[0][1] or ""))
+        lines: List[str] = []
+        for name, value in counters:
+            metric = _prom_name(name) + "_total"
+            lines += [f"# TYPE {metric} counter", f"{metric} {value:g}"]
+        declared = set()
+        for (name, label), hist in timers:
+            metric = _prom_name(name) + "_seconds"
+            if metric not in declared:
+                lines.append(f"# TYPE {metric} histogram")
+                declared.add(metric)
+            labels = f'endpoint="{label}"' if label is not None else ""
+            cumulative = 0
+            for bound, n in zip(list(BUCKETS) + ["+Inf"], hist.counts):
+                cumulative += n
+                le = f'le="{bound}"'
+                lines.append(f"{metric}_bucket{{{labels + ',' if labels else ''}{le}}} {cumulative}")
+            suffix = f"{{{labels}}}" if labels else ""
+            lines.append(f"{metric}_sum{suffix} {hist.total:.6f}")
+            lines.append(f"{metric}_count{suffix} {hist.count}")
+        return "\n".join(lines) + "\n"
+
+
+def _prom_name(name: str) -> str:
+    return PROM_PREFIX + re.sub(r"[^a-zA-Z0-9_]", "_", name)
+
+
+_active: Metrics = Metrics()
+
+
+def active() -> Metrics:
+    return _active
+
+
+def enable() -> Recorder:
+    """Instala (y devuelve) un `Recorder` nuevo como registro activo."""
+    global _active
+    _active = Recorder()
+    return _active
+
+
+def disable() -> None:
+    global _active
+    _active = Metrics()
+
+
+def incr(name: str, value: float = 1) -> None:
+    _active.incr(name, value)
+
+
+def observe(name: str, seconds: float, label: Optional[str] = None) -> None:
+    _active.observe(name, seconds, label)
+
+
+def timer(name: str, label: Optional[str] = None):
+    return _active.timer(name, label)
+
+
+def endpoint_label(url: str) -> str:
+    """`host/ruta` con el identificador final reemplazado por `{id}`.
+
+    Se considera identificador el último segmento si tiene dígitos o si la
+    ruta es profunda (`/api/v2/pokemon/<slug>`); así `/search.json` y los
+    listados de PokéAPI conservan su nombre.
+    """
+    parts = urlsplit(url)
+    segments = [s for s in parts.path.split("/") if s]
+    if segments and (len(segments) >= 4 or any(c.isdigit() for c in segments[-1])):
+        suffix = ".json" if segments[-1].endswith(".json") and segments[-1] != "search.json" else ""
+        segments[-1] = "{id}" + suffix
+    return (parts.hostname or "") + "/" + "/".join(segments)
+
+
+@contextlib.contextmanager
+def profiling(kind: Optional[str], output: Optional[Path] = None) -> Iterator[None]:
+    """Perfila el bloque con cProfile o pyinstrument; sin `kind` no hace nada.
+
+    cProfile guarda las estadísticas en `output` (por defecto `profile.prof`,
+    legible con `snakeviz` o `pstats`) y registra las 25 funciones con más
+    tiempo acumulado. pyinstrument escribe un HTML (`profile.html`).
+    """
+    if kind is None:
+        yield
+        return
+    if kind not in PROFILERS:
+        raise ValueError(f"profiler desconocido: {kind} (opciones: {', '.join(PROFILERS)})")
+    if kind == "pyinstrument":
+        if pyinstrument is None:
+            raise ImportError("--profile pyinstrument requiere instalar pyinstrument")
+        profiler = pyinstrument.Profiler()
+        profiler.start()
+        try:
+            yield
+        finally:
+            profiler.stop()
+            output = Path(output or "profile.html")
+            output.write_text(profiler.output_html(), encoding="utf-8")
+            logging.info("Perfil de pyinstrument guardado en %s", output)
+        return
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        output = Path(output or "profile.prof")
+        profiler.dump_stats(str(output))
+        text = io.StringIO()
+        pstats.Stats(profiler, stream=text).sort_stats("cumulative").print_stats(25)
+        logging.info("Perfil de cProfile guardado en %s\n%s", output, text.getvalue())
@@ -0,0 +1,194 @@
+"""
+Versiones del modelo en `models/`.
+
+Cada entrenamiento (`train_search.py` o `retrain_incremental.py`) guarda sus
+artefactos en `models/versions/<versión>/` y queda registrado en
+`models/registry.json` con su estado, la versión de la que parte, sus
+métricas y la marca de datos con la que se entrenó. La versión vigente se
+copia además a `models/booster.txt` + `models/spec.json`, que es lo que
+cargan `scoring_service.py` y el notebook:
+
+    models/
+        booster.txt, spec.json          versión vigente
+        registry.json                   historial de versiones
+        versions/v0001/booster.txt
+        versions/v0001/spec.json
+        ...
+
+La marca de datos (`csv_watermark`) es el offset en bytes del CSV de
+entrenamiento hasta la última partida completa, más un sha256 de todos los
+bytes previos al offset. Como el scraper en modo `--incremental` solo agrega
+filas al final, lo nuevo es lo que está después del offset; si la huella ya
+no coincide, el archivo se reescribió y hace falta un entrenamiento completo.
+Verificarla cuesta leer el prefijo entero una vez (un sha256 secuencial).
+
+Si el scraper está escribiendo, el archivo puede terminar con una línea a
+medias o con la fila p1 de una partida sin la p2: el offset se retrasa al
+comienzo de esa partida, así sus dos filas entran juntas la próxima vez.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+
+import lightgbm as lgb
+
+MODELS_DIR = Path("models")
+REGISTRY_FILE = "registry.json"
+ARTIFACTS = ("booster.txt", "spec.json")
+STATUSES = ("accepted", "rejected")
+# Tramo final que se inspecciona para ubicar la última partida completa.
+TAIL_BYTES = 1 << 16
+HASH_BLOCK = 1 << 20
+
+
+class StaleWatermarkError(RuntimeError):
+    """El CSV ya no empieza como cuando se entrenó el modelo."""
+
+
+def _fingerprint(path: Path, offset: int) -> str:
+    """sha256 de los primeros `offset` bytes de `path`."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        remaining = offset
+        while remaining > 0:
+            block = f.read(min(HASH_BLOCK, remaining))
+            if not block:
+                break
+            digest.update(block)
+            remaining -= len(block)
+    return digest.hexdigest()
+
+
+def _complete_offset(path: Path) -> int:
+    """Fin de la última partida con sus dos filas (nunca antes del encabezado)."""
+    size = path.stat().st_size
+    with open(path, "rb") as f:
+        header_end = len(f.readline())
+        start = max(header_end, size - TAIL_BYTES)
+        f.seek(start)
+        block = f.read()
+    end = block.rfind(b"\n") + 1
+    if end == 0:
+        if start > header_end:
+            raise ValueError(f"{path}: línea de más de {TAIL_BYTES} bytes")
+        return header_end
+    lines = block[:end].split(b"\n")[:-1]
+    if start > header_end:
+        # La primera línea del tramo puede estar cortada: no se usa.
+        lines = lines[1:]
+    # Las filas de una partida son consecutivas; si la última partida tiene
+    # una sola fila, la otra todavía no se escribió.
+    offset = group_start = start + end
+    last_id = None
+    count = 0
+    for line in reversed(lines):
+        replay_id = line.split(b",", 1)[0]
+        if last_id is not None and replay_id != last_id:
+            break
+        last_id = replay_id
+        group_start -= len(line) + 1
+        count += 1
+    return group_start if count == 1 else offset
+
+
+def csv_watermark(path: Union[str, Path]) -> Dict:
+    """Offset de la última partida completa de `path` y la huella de lo anterior."""
+    path = Path(path)
+    offset = _complete_offset(path)
+    return {"path": str(path), "offset": offset, "fingerprint": _fingerprint(path, offset)}
+
+
+def check_watermark(mark: Dict, path: Optional[Union[str, Path]] = None) -> None:
+    """Lanza `StaleWatermarkError` si lo anterior a `mark['offset']` cambió."""
+    path = Path(path or mark["path"])
+    offset = mark["offset"]
+    if path.stat().st_size < offset or _fingerprint(path, offset) != mark["fingerprint"]:
+        raise StaleWatermarkError(
+            f"{path} cambió antes del byte {offset}; hace falta un entrenamiento completo (train_search.py)"
+        )
+
+
+class ModelRegistry:
+    """Historial de versiones del modelo y la versión vigente."""
+
+    def __init__(self, root: Union[str, Path] = MODELS_DIR) -> None:
+        self.root = Path(root)
+        self.versions_dir = self.root / "versions"
+        self._path = self.root / REGISTRY_FILE
+
+    def _read(self) -> Dict:
+        if not self._path.exists():
+            return {"current": None, "versions": []}
+        return json.loads(self._path.read_text(encoding="utf-8"))
+
+    def _write(self, data: Dict) -> None:
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp = self._path.with_name(self._path.name + ".tmp")
+        tmp.write_text(json.dumps(data, indent=2, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, self._path)
+
+    def entries(self) -> List[Dict]:
+        return self._read()["versions"]
+
+    def entry(self, version: str) -> Dict:
+        for entry in self.entries():
+            if entry["version"] == version:
+                return entry
+        raise KeyError(f"versión desconocida: {version}")
+
+    @property
+    def current(self) -> Optional[str]:
+        return self._read()["current"]
+
+    def load(self, version: Optional[str] = None) -> Tuple[lgb.Booster, Dict]:
+        """Booster y spec de `version` (por defecto, la vigente)."""
+        version = version or self.current
+        if version is None:
+            raise FileNotFoundError(f"{self.root} no tiene versiones registradas")
+        directory = self.versions_dir / version
+        spec = json.loads((directory / "spec.json").read_text(encoding="utf-8"))
+        return lgb.Booster(model_file=str(directory / "booster.txt")), spec
+
+    def save(self, booster: lgb.Booster, spec: Dict, status: str = "accepted", parent: Optional[str] = None) -> str:
+        """Guarda una versión nueva (sin publicarla) y devuelve su nombre."""
+        if status not in STATUSES:
+            raise ValueError(f"estado inválido: {status}")
+        data = self._read()
+        version = f"v{len(data['versions']) + 1:04d}"
+        directory = self.versions_dir / version
+        directory.mkdir(parents=True, exist_ok=True)
+        spec = {**spec, "version": version, "parent": parent}
+        booster.save_model(str(directory / "booster.txt"))
+        (directory / "spec.json").write_text(json.dumps(spec, indent=2, ensure_ascii=False), encoding="utf-8")
+        data["versions"].append(
+            {
+                "version": version,
+                "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "status": status,
+                "parent": parent,
+                "num_iterations": spec.get("num_iterations"),
+                "metrics": spec.get("metrics", {}),
+                "data": spec.get("data"),
+            }
+        )
+        self._write(data)
+        return version
+
+    def promote(self, version: str) -> None:
+        """Publica `version` en `models/booster.txt` + `spec.json`."""
+        data = self._read()
+        if not any(entry["version"] == version for entry in data["versions"]):
+            raise KeyError(f"versión desconocida: {version}")
+        for name in ARTIFACTS:
+            tmp = self.root / f"{name}.tmp"
+            shutil.copyfile(self.versions_dir / version / name, tmp)
+            os.replace(tmp, self.root / name)
+        data["current"] = version
+        self._write(data)
@@ -0,0 +1,140 @@
+"""
+Dataset comparativo equipo vs rival a partir de las filas por equipo.
+
+Cada partida aporta dos filas (una por jugador) en el CSV del scraper. Para
+cada una se construyen las features propias (`*_self`), las del rival
+(`*_opp`) y su diferencia (`*_diff`). En lugar de recorrer
+`df.groupby('replay_id')` fila a fila, las filas se ordenan de forma estable
+por `replay_id` (el mismo orden que usa `groupby`), así que cada pareja queda
+en posiciones consecutivas `(2k, 2k+1)`: el rival de la posición `i` es la
+`i ^ 1`. Cada bloque se calcula columna por columna sobre arrays completos.
+
+El resultado es idéntico al bucle original del notebook: mismas filas, mismo
+orden de filas y columnas y mismos dtypes.
+
+`add_team_features` es la ingeniería de features por equipo del notebook
+(métricas ofensivas/defensivas, imputaciones y one-hot `pk_*` de los Pokémon
+más frecuentes).
+"""
+
+from __future__ import annotations
+
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+ID_COL = "replay_id"
+META_COLS = ("player_slot", "won_battle")
+SUFFIXES = ("_self", "_opp", "_diff")
+TEAM_COL = "team_pokemon"
+
+EXTRA_BASE_COLS = [
+    "turns", "rating_diff", "has_rating_info", "team_size", "player_rating", "opponent_rating",
+    "agg_offense", "agg_defense", "bulk_index", "offense_defense_diff", "speed_pressure", "stat_spread",
+]
+# Solo se conocen al terminar la partida: no entran al modelo que se sirve.
+POST_BATTLE_COLS = ("turns",)
+
+
+def poke_column(name: str) -> str:
+    return f"pk_{name.lower().replace(' ', '_').replace('-', '_')}"
+
+
+def top_pokemon(df: pd.DataFrame, n: int = 50, team_col: str = TEAM_COL) -> List[str]:
+    """Los `n` Pokémon más usados, en el orden de `value_counts`."""
+    return df[team_col].str.split(",").explode().value_counts().head(n).index.tolist()
+
+
+FILL_MEDIAN_COLS = ("team_size", "player_rating", "opponent_rating")
+
+
+def team_fill_values(df: pd.DataFrame) -> Dict[str, float]:
+    """Medianas con las que `add_team_features` imputa los faltantes."""
+    return {col: float(df[col].median()) for col in FILL_MEDIAN_COLS}
+
+
+def add_team_features(
+    df: pd.DataFrame,
+    top_n: int = 50,
+    pokemon: Optional[Sequence[str]] = None,
+    team_col: str = TEAM_COL,
+    fill_values: Optional[Dict[str, float]] = None,
+) -> Tuple[pd.DataFrame, List[str], List[str]]:
+    """Copia de `df` con las features de equipo del notebook.
+
+    Devuelve `(df, base_cols, poke_cols)`. Los dummies `pk_*` se calculan para
+    `pokemon` si se indica (lista fija, p. ej. la usada al entrenar) o para
+    los `top_n` más frecuentes de `df`. Del mismo modo, `fill_values` fija
+    las medianas de imputación (por defecto, las de `df`).
+    """
+    df = df.copy()
+    stat_cols = [c for c in df.columns if c.startswith("sum_") or c.startswith("mean_")]
+    fill = fill_values if fill_values is not None else team_fill_values(df)
+
+    df["rating_diff"] = df["rating_diff"].fillna(0)
+    df["team_size"] = df["team_size"].fillna(fill["team_size"])
+    df["has_rating_info"] = df[["player_rating", "opponent_rating"]].notna().all(axis=1).astype(int)
+    df["player_rating"] = df["player_rating"].fillna(fill["player_rating"])
+    df["opponent_rating"] = df["opponent_rating"].fillna(fill["opponent_rating"])
+
+    df["agg_offense"] = df["sum_attack"] + df["sum_sp_attack"]
+    df["agg_defense"] = df["sum_defense"] + df["sum_sp_defense"]
+    df["bulk_index"] = df["sum_hp"] + df["sum_defense"] + df["sum_sp_defense"]
+    df["offense_defense_diff"] = df["agg_offense"] - df["agg_defense"]
+    df["speed_pressure"] = df["mean_speed"] * df["mean_attack"]
+    df["stat_spread"] = df[stat_cols].std(axis=1)
+
+    base_cols = stat_cols + EXTRA_BASE_COLS
+
+    classes = list(pokemon) if pokemon is not None else top_pokemon(df, top_n, team_col)
+    teams = df[team_col].str.split(",")
+    members = teams.explode()
+    rows = np.repeat(np.arange(len(df)), teams.str.len().fillna(1).astype(int).to_numpy())
+    codes = pd.Categorical(members.to_numpy(), categories=classes).codes
+    known = codes >= 0
+    matrix = np.zeros((len(df), len(classes)), dtype=np.int64)
+    matrix[rows[known], codes[known]] = 1
+    poke_cols = [poke_column(name) for name in classes]
+    poke_df = pd.DataFrame(matrix, columns=poke_cols, index=df.index)
+    return pd.concat([df, poke_df], axis=1), base_cols, poke_cols
+
+
+def paired_rows(df: pd.DataFrame, id_col: str = ID_COL) -> pd.DataFrame:
+    """Filas de partidas con exactamente dos equipos, ordenadas por `id_col`.
+
+    Dentro de cada partida se conserva el orden original, igual que en
+    `groupby`; las partidas con uno o más de dos equipos se descartan.
+    """
+    valid = df[df[id_col].notna()]
+    sizes = valid.groupby(id_col, sort=False)[id_col].transform("size")
+    return valid[sizes.to_numpy() == 2].sort_values(id_col, kind="stable")
+
+
+def build_pairwise(
+    df: pd.DataFrame,
+    base_cols: Sequence[str],
+    poke_cols: Sequence[str] = (),
+    id_col: str = ID_COL,
+    meta_cols: Sequence[str] = META_COLS,
+) -> pd.DataFrame:
+    """Dos filas por partida con `<col>_self`, `<col>_opp` y `<col>_diff`.
+
+    Las columnas salen en el orden `id_col`, `meta_cols` y después, para cada
+    columna de `base_cols` + `poke_cols`, su terna self/opp/diff.
+    """
+    pairs = paired_rows(df, id_col)
+    if pairs.empty:
+        return pd.DataFrame()
+    # Índice del rival de cada fila: 0<->1, 2<->3, ...
+    opponent = np.arange(len(pairs)) ^ 1
+    columns: Dict[str, np.ndarray] = {id_col: pairs[id_col].to_numpy()}
+    for col in meta_cols:
+        columns[col] = pairs[col].to_numpy()
+    for col in list(base_cols) + list(poke_cols):
+        values = pairs[col].to_numpy()
+        opp_values = values[opponent]
+        columns[f"{col}_self"] = values
+        columns[f"{col}_opp"] = opp_values
+        columns[f"{col}_diff"] = values - opp_values
+    return pd.DataFrame(columns)
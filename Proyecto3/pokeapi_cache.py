@@ -0,0 +1,120 @@
+"""
+Caché persistente (SQLite) para respuestas de PokéAPI.
+
+Guarda tanto las stats de `/pokemon/{slug}` como las variedades de
+`/pokemon-species/{slug}`, incluidos los resultados negativos (404), para que
+las ejecuciones en caliente del scraper no hagan ninguna llamada de red.
+
+SQLite en modo WAL permite que varios procesos del scraper compartan el mismo
+archivo: las lecturas no se bloquean entre sí y las escrituras esperan hasta
+`busy_timeout` en lugar de fallar.
+"""
+
+from __future__ import annotations
+
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional, Union
+
+# Centinela para distinguir "no está en caché" de un negativo cacheado (None).
+MISSING: Any = object()
+
+DAY = 24 * 60 * 60
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    kind    TEXT NOT NULL,
+    key     TEXT NOT NULL,
+    value   TEXT,
+    created REAL NOT NULL,
+    PRIMARY KEY (kind, key)
+)
+"""
+
+
+class PokeApiCache:
+    """Caché clave-valor con TTL y desalojo por tamaño.
+
+    `get` devuelve `MISSING` si no hay entrada válida, `None` si la entrada es
+    un negativo (p. ej. un 404) y el diccionario guardado en otro caso.
+    """
+
+    def __init__(
+        self,
+        path: Union[str, Path],
+        ttl: float = 30 * DAY,
+        negative_ttl: float = 7 * DAY,
+        max_entries: int = 50_000,
+    ) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._puts = 0
+        self._conn = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(_SCHEMA)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS entries_created ON entries (created)")
+        self._conn.commit()
+
+    def get(self, kind: str, key: str) -> Any:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created FROM entries WHERE kind = ? AND key = ?",
+                (kind, key),
+            ).fetchone()
+        if row is None:
+            return MISSING
+        value, created = row
+        ttl = self.ttl if value is not None else self.negative_ttl
+        if time.time() - created > ttl:
+            return MISSING
+        return json.loads(value) if value is not None else None
+
+    def put(self, kind: str, key: str, value: Optional[Dict]) -> None:
+        payload = json.dumps(value, separators=(",", ":")) if value is not None else None
+        with self._lock:
+            with self._conn:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO entries (kind, key, value, created) VALUES (?, ?, ?, ?)",
+                    (kind, key, payload, time.time()),
+                )
+            self._puts += 1
+            if self._puts % 100 == 0:
+                self._evict_locked()
+
+    def evict(self) -> None:
+        with self._lock:
+            self._evict_locked()
+
+    def _evict_locked(self) -> None:
+        now = time.time()
+        with self._conn:
+            self._conn.execute(
+                "DELETE FROM entries WHERE (value IS NOT NULL AND created < ?) "
+                "OR (value IS NULL AND created < ?)",
+                (now - self.ttl, now - self.negative_ttl),
+            )
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()
+            excess = count - self.max_entries
+            if excess > 0:
+                self._conn.execute(
+                    "DELETE FROM entries WHERE rowid IN "
+                    "(SELECT rowid FROM entries ORDER BY created LIMIT ?)",
+                    (excess,),
+                )
+
+    def __len__(self) -> int:
+        with self._lock:
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()
+        return count
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
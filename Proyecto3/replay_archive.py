@@ -0,0 +1,195 @@
+"""
+Archivo local de replays crudos (JSON comprimido) con índice memory-mapped.
+
+Guardar el JSON original de cada replay permite reconstruir el dataset sin
+volver a descargar nada cuando cambian `parse_replay` o `build_rows`
+(`scrape_showdown_replays.py --from-archive`).
+
+Estructura del directorio:
+    replays.dat  registros comprimidos, uno tras otro (solo se agrega)
+    replays.idx  entradas de tamaño fijo (id, offset, length, codec)
+
+Cada registro se escribe primero en `replays.dat` y después su entrada en el
+índice, de modo que una caída nunca deja una entrada apuntando a datos
+incompletos. El índice se abre con `np.memmap`; cargarlo para 100k replays
+cuesta milisegundos.
+"""
+
+from __future__ import annotations
+
+import json
+import mmap
+import os
+import zlib
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - dependencia opcional
+    zstandard = None
+
+CODEC_ZLIB = 0
+CODEC_ZSTD = 1
+
+ID_BYTES = 64
+INDEX_DTYPE = np.dtype(
+    [("id", f"S{ID_BYTES}"), ("offset", "<u8"), ("length", "<u4"), ("codec", "u1")]
+)
+
+
+def default_codec() -> int:
+    return CODEC_ZSTD if zstandard is not None else CODEC_ZLIB
+
+
+def compress(payload: bytes, codec: int) -> bytes:
+    if codec == CODEC_ZSTD:
+        if zstandard is None:
+            raise ImportError("El codec zstd requiere instalar zstandard")
+        return zstandard.ZstdCompressor(level=6).compress(payload)
+    return zlib.compress(payload, 6)
+
+
+def decompress(payload: bytes, codec: int) -> bytes:
+    if codec == CODEC_ZSTD:
+        if zstandard is None:
+            raise ImportError("El codec zstd requiere instalar zstandard")
+        return zstandard.ZstdDecompressor().decompress(payload)
+    return zlib.decompress(payload)
+
+
+def decode_record(payload: bytes, codec: int) -> Dict:
+    return json.loads(decompress(payload, codec))
+
+
+class ReplayArchive:
+    """Almacén append-only de replays indexado por replay ID."""
+
+    def __init__(self, root: Union[str, Path], codec: Optional[int] = None) -> None:
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.data_path = self.root / "replays.dat"
+        self.index_path = self.root / "replays.idx"
+        self.data_path.touch(exist_ok=True)
+        self.index_path.touch(exist_ok=True)
+        self.codec = default_codec() if codec is None else codec
+        self._positions: Dict[str, int] = {}
+        self._index = np.empty(0, dtype=INDEX_DTYPE)
+        self._data: Optional[mmap.mmap] = None
+        self._data_size = 0
+        self.refresh()
+
+    # -- lectura -------------------------------------------------------------
+
+    def refresh(self) -> None:
+        """Vuelve a leer el índice (p. ej. si otro proceso agregó replays)."""
+        self._remap_index()
+        ids = self._index["id"]
+        self._positions = {rid.decode(): pos for pos, rid in enumerate(ids.tolist())}
+        self._remap_data()
+
+    def _remap_index(self) -> None:
+        n_entries = self.index_path.stat().st_size // INDEX_DTYPE.itemsize
+        if n_entries:
+            self._index = np.memmap(self.index_path, dtype=INDEX_DTYPE, mode="r", shape=(n_entries,))
+        else:
+            self._index = np.empty(0, dtype=INDEX_DTYPE)
+
+    def _remap_data(self) -> None:
+        size = self.data_path.stat().st_size
+        if size == self._data_size and self._data is not None:
+            return
+        if self._data is not None:
+            self._data.close()
+            self._data = None
+        self._data_size = size
+        if size:
+            with self.data_path.open("rb") as fh:
+                self._data = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def __contains__(self, replay_id: str) -> bool:
+        return replay_id in self._positions
+
+    def __len__(self) -> int:
+        return len(self._positions)
+
+    def ids(self) -> List[str]:
+        return list(self._positions)
+
+    def _raw_at(self, pos: int) -> Tuple[bytes, int]:
+        if pos >= len(self._index):
+            self._remap_index()
+        entry = self._index[pos]
+        start = int(entry["offset"])
+        end = start + int(entry["length"])
+        if self._data is None or end > self._data_size:
+            self._remap_data()
+        return self._data[start:end], int(entry["codec"])
+
+    def get_raw(self, replay_id: str) -> Optional[Tuple[bytes, int]]:
+        pos = self._positions.get(replay_id)
+        if pos is None:
+            return None
+        return self._raw_at(pos)
+
+    def get(self, replay_id: str) -> Optional[Dict]:
+        raw = self.get_raw(replay_id)
+        if raw is None:
+            return None
+        return decode_record(*raw)
+
+    def iter_raw(self) -> Iterator[Tuple[str, bytes, int]]:
+        """Recorre el archivo en orden de escritura (lectura secuencial)."""
+        for replay_id, pos in list(self._positions.items()):
+            payload, codec = self._raw_at(pos)
+            yield replay_id, payload, codec
+
+    def iter_replays(self) -> Iterator[Tuple[str, Dict]]:
+        for replay_id, payload, codec in self.iter_raw():
+            yield replay_id, decode_record(payload, codec)
+
+    # -- escritura -----------------------------------------------------------
+
+    def put(self, replay_id: str, replay_json: Dict) -> bool:
+        """Agrega un replay. Devuelve False si ya estaba archivado."""
+        if replay_id in self._positions:
+            return False
+        key = replay_id.encode()
+        if len(key) > ID_BYTES:
+            raise ValueError(f"replay_id demasiado largo para el índice: {replay_id}")
+        payload = compress(json.dumps(replay_json, separators=(",", ":")).encode(), self.codec)
+        with self.data_path.open("ab") as data_fh, self.index_path.open("ab") as index_fh:
+            if fcntl is not None:
+                # Varios procesos pueden compartir el archivo: el lock serializa
+                # la pareja (datos, entrada de índice).
+                fcntl.flock(data_fh, fcntl.LOCK_EX)
+            try:
+                index_size = index_fh.seek(0, os.SEEK_END)
+                if index_size % INDEX_DTYPE.itemsize:
+                    # Entrada a medio escribir por una caída anterior.
+                    index_size -= index_size % INDEX_DTYPE.itemsize
+                    index_fh.truncate(index_size)
+                offset = data_fh.seek(0, os.SEEK_END)
+                data_fh.write(payload)
+                data_fh.flush()
+                entry = np.array([(key, offset, len(payload), self.codec)], dtype=INDEX_DTYPE)
+                index_fh.write(entry.tobytes())
+                index_fh.flush()
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(data_fh, fcntl.LOCK_UN)
+        self._positions[replay_id] = index_size // INDEX_DTYPE.itemsize
+        return True
+
+    def close(self) -> None:
+        if self._data is not None:
+            self._data.close()
+            self._data = None
+        self._index = np.empty(0, dtype=INDEX_DTYPE)
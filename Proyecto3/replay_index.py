@@ -0,0 +1,101 @@
+"""
+Índice persistente (SQLite) de replays ya procesados.
+
+Permite que `scrape_showdown_replays.py --incremental` descargue solo batallas
+nuevas y retome tras una caída sin repetir trabajo.
+"""
+
+from __future__ import annotations
+
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Iterable, Set, Union
+
+import pandas as pd
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS replays (
+    replay_id TEXT PRIMARY KEY,
+    status    TEXT NOT NULL,
+    added     REAL NOT NULL
+) WITHOUT ROWID
+"""
+
+# SQLite limita la cantidad de parámetros por consulta.
+_BATCH = 500
+
+
+class ReplayIndex:
+    """Conjunto de replay IDs vistos, con el estado con el que se cerraron.
+
+    Estados usados por el scraper: `ok` (filas escritas) y `skipped`
+    (replay sin ganador/equipos o con especies sin stats). Las descargas
+    fallidas y los replays cuyas especies no se pudieron consultar por un
+    error de red no se registran, para reintentarlos en la siguiente ejecución.
+    """
+
+    def __init__(self, path: Union[str, Path]) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # El paginador corre en otro hilo que el consumidor (ver ReplayDownloader).
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(_SCHEMA)
+        self._conn.commit()
+
+    def __contains__(self, replay_id: str) -> bool:
+        with self._lock:
+            row = self._conn.execute("SELECT 1 FROM replays WHERE replay_id = ?", (replay_id,)).fetchone()
+        return row is not None
+
+    def __len__(self) -> int:
+        with self._lock:
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM replays").fetchone()
+        return count
+
+    def known(self, replay_ids: Iterable[str]) -> Set[str]:
+        """Subconjunto de `replay_ids` que ya está en el índice."""
+        ids = list(replay_ids)
+        found: Set[str] = set()
+        for start in range(0, len(ids), _BATCH):
+            chunk = ids[start : start + _BATCH]
+            marks = ",".join("?" * len(chunk))
+            with self._lock:
+                rows = self._conn.execute(
+                    f"SELECT replay_id FROM replays WHERE replay_id IN ({marks})", chunk
+                ).fetchall()
+            found.update(r[0] for r in rows)
+        return found
+
+    def add(self, replay_id: str, status: str = "ok") -> None:
+        self.add_many([replay_id], status)
+
+    def add_many(self, replay_ids: Iterable[str], status: str = "ok") -> None:
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO replays (replay_id, status, added) VALUES (?, ?, ?)",
+                ((rid, status, now) for rid in replay_ids),
+            )
+
+    def sync_with_csv(self, csv_path: Union[str, Path]) -> int:
+        """Registra los replay IDs presentes en un CSV de salida existente.
+
+        Cubre tanto la primera ejecución incremental sobre un dataset previo
+        como una caída entre escribir filas y marcarlas en el índice.
+        Devuelve cuántos IDs nuevos se agregaron.
+        """
+        csv_path = Path(csv_path)
+        if not csv_path.exists() or csv_path.stat().st_size == 0:
+            return 0
+        before = len(self)
+        ids = pd.read_csv(csv_path, usecols=["replay_id"])["replay_id"].dropna().unique()
+        self.add_many(ids.tolist(), "ok")
+        return len(self) - before
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
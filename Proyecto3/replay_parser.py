@@ -0,0 +1,225 @@
+"""
+Parser de logs de replays de Pokémon Showdown en una sola pasada.
+
+Cada línea del protocolo tiene la forma `|tipo|arg1|arg2|...`. En vez de
+encadenar `startswith`, se extrae el tipo una vez y se despacha con una tabla
+`tipo -> handler`. Una única regex precompilada recorre el log completo en C
+y solo devuelve las líneas de tipos con handler; el resto (chat, `|-heal|`,
+etc.) nunca llega a Python ni se parte.
+
+`parse_replay` devuelve exactamente lo mismo que la versión anterior basada
+en `startswith`. Con `events=True` añade `BattleEvents`: switches, movimientos,
+debilitamientos, daño, team preview y leads de cada lado, para poder derivar
+features de la batalla sin volver a recorrer el log.
+"""
+
+from __future__ import annotations
+
+import dataclasses
+import re
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+
+@dataclasses.dataclass
+class BattleEvents:
+    """Eventos compactos de una batalla. `side` es "p1"/"p2".
+
+    - switches: (turno, side, especie) — incluye `|drag|` y `|replace|`
+    - moves:    (turno, side, especie, movimiento)
+    - faints:   (turno, side, especie)
+    - damage:   (turno, side, especie, fracción de HP restante)
+    """
+
+    team_preview: bool = False
+    leads: Dict[str, str] = dataclasses.field(default_factory=dict)
+    switches: List[Tuple[int, str, str]] = dataclasses.field(default_factory=list)
+    moves: List[Tuple[int, str, str, str]] = dataclasses.field(default_factory=list)
+    faints: List[Tuple[int, str, str]] = dataclasses.field(default_factory=list)
+    damage: List[Tuple[int, str, str, float]] = dataclasses.field(default_factory=list)
+
+
+class _State:
+    __slots__ = ("teams", "players", "winner_name", "turns", "events", "nicknames")
+
+    def __init__(self, events: bool) -> None:
+        self.teams: Dict[str, List[str]] = {"p1": [], "p2": []}
+        self.players: Dict[str, Dict[str, Optional[float]]] = {}
+        self.winner_name: Optional[str] = None
+        self.turns = 0
+        self.events = BattleEvents() if events else None
+        # "p1a: Apodo" -> especie, para traducir los eventos que solo traen apodo.
+        # En dobles un `|swap|` puede mover al Pokémon de posición; en ese caso
+        # se usa el apodo tal cual.
+        self.nicknames: Dict[str, str] = {}
+
+
+def _on_player(state: _State, args: List[str]) -> None:
+    if len(args) < 4:
+        args = args + [""] * (4 - len(args))
+    slot, name, rating = args[0], args[1], args[3]
+    rating_value: Optional[float] = None
+    if rating:
+        try:
+            rating_value = float(rating)
+        except ValueError:
+            rating_value = None
+    state.players[slot] = {"name": name, "rating": rating_value}
+
+
+def _on_poke(state: _State, args: List[str]) -> None:
+    if len(args) < 2:
+        return
+    slot = args[0]
+    species = args[1].split(",")[0].strip()
+    if slot in state.teams and species:
+        team = state.teams[slot]
+        if species not in team:
+            team.append(species)
+
+
+def _on_win(state: _State, args: List[str]) -> None:
+    state.winner_name = args[0]
+
+
+def _on_turn(state: _State, args: List[str]) -> None:
+    try:
+        state.turns = int(args[0])
+    except ValueError:
+        pass
+
+
+def _side(ident: str) -> str:
+    return ident[:2]
+
+
+def _species_of(state: _State, ident: str) -> str:
+    species = state.nicknames.get(ident)
+    if species is None:
+        species = ident.partition(":")[2].strip()
+    return species
+
+
+def _on_teampreview(state: _State, args: List[str]) -> None:
+    state.events.team_preview = True
+
+
+def _on_switch(state: _State, args: List[str]) -> None:
+    if len(args) < 2:
+        return
+    ident = args[0]
+    species = args[1].split(",")[0].strip()
+    side = _side(ident)
+    state.nicknames[ident] = species
+    events = state.events
+    events.switches.append((state.turns, side, species))
+    if state.turns == 0 and side not in events.leads:
+        events.leads[side] = species
+
+
+def _on_move(state: _State, args: List[str]) -> None:
+    if len(args) < 2:
+        return
+    ident = args[0]
+    state.events.moves.append((state.turns, _side(ident), _species_of(state, ident), args[1]))
+
+
+def _on_faint(state: _State, args: List[str]) -> None:
+    ident = args[0]
+    state.events.faints.append((state.turns, _side(ident), _species_of(state, ident)))
+
+
+def _on_damage(state: _State, args: List[str]) -> None:
+    if len(args) < 2:
+        return
+    ident = args[0]
+    current, _, maximum = args[1].split(" ", 1)[0].partition("/")
+    try:
+        # "0 fnt" no trae máximo: la fracción es 0.
+        fraction = float(current) / float(maximum) if maximum else float(current)
+    except (ValueError, ZeroDivisionError):
+        return
+    state.events.damage.append((state.turns, _side(ident), _species_of(state, ident), fraction))
+
+
+Handler = Callable[[_State, List[str]], None]
+
+BASE_HANDLERS: Dict[str, Handler] = {
+    "player": _on_player,
+    "poke": _on_poke,
+    "win": _on_win,
+    "turn": _on_turn,
+}
+
+EVENT_HANDLERS: Dict[str, Handler] = {
+    **BASE_HANDLERS,
+    "teampreview": _on_teampreview,
+    "switch": _on_switch,
+    "drag": _on_switch,
+    "replace": _on_switch,
+    "move": _on_move,
+    "faint": _on_faint,
+    "-damage": _on_damage,
+}
+
+# Mensajes que se aceptan también sin argumentos (p. ej. "|teampreview").
+NOARG_KINDS = frozenset({"teampreview"})
+
+
+def _line_pattern(handlers: Dict[str, Handler]) -> "re.Pattern[str]":
+    # Anclar en el "\n" literal permite al motor de regex saltar directo a
+    # los candidatos; el lookahead deja el "\n" para la línea siguiente.
+    kinds = "|".join(re.escape(kind) for kind in sorted(handlers, key=len, reverse=True))
+    return re.compile(r"\n\|(" + kinds + r")(\|[^\n]*)?(?=\n|$)")
+
+
+BASE_PATTERN = _line_pattern(BASE_HANDLERS)
+EVENT_PATTERN = _line_pattern(EVENT_HANDLERS)
+
+# Separadores que `str.splitlines` reconoce además de "\n". Si un log trae
+# alguno, se usa el recorrido línea a línea para conservar su semántica.
+_EXTRA_LINE_BREAKS = "\r\x0b\x0c\x1c\x1d\x1e\x85\u2028\u2029"
+
+
+def _scan(log: str, handlers: Dict[str, Handler], pattern: "re.Pattern[str]") -> Iterable[Tuple[str, str]]:
+    """Pares `(tipo, "|args")` de las líneas con handler; "" si no hay args."""
+    if not any(ch in log for ch in _EXTRA_LINE_BREAKS):
+        return pattern.findall("\n" + log)
+    messages = []
+    for line in log.splitlines():
+        if not line.startswith("|"):
+            continue
+        kind, sep, rest = line[1:].partition("|")
+        if kind in handlers:
+            messages.append((kind, sep + rest))
+    return messages
+
+
+def parse_replay(replay_json: Dict, events: bool = False) -> Optional[Dict]:
+    log = replay_json.get("log", "")
+    if not log:
+        return None
+    state = _State(events)
+    handlers, pattern = (EVENT_HANDLERS, EVENT_PATTERN) if events else (BASE_HANDLERS, BASE_PATTERN)
+    for kind, tail in _scan(log, handlers, pattern):
+        if tail:
+            handlers[kind](state, tail[1:].split("|"))
+        elif kind in NOARG_KINDS:
+            handlers[kind](state, [])
+    teams = state.teams
+    winner_slot: Optional[str] = None
+    if state.winner_name:
+        for slot, info in state.players.items():
+            if info["name"] == state.winner_name:
+                winner_slot = slot
+                break
+    if not teams["p1"] or not teams["p2"] or winner_slot is None:
+        return None
+    parsed = {
+        "teams": teams,
+        "players": state.players,
+        "winner_slot": winner_slot,
+        "turns": state.turns,
+    }
+    if events:
+        parsed["events"] = state.events
+    return parsed
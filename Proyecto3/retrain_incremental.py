@@ -0,0 +1,276 @@
+"""
+Reentrenamiento incremental del modelo con las partidas nuevas del scraper.
+
+En lugar de repetir limpieza, dataset comparativo, CV y búsqueda sobre todo
+el histórico, parte de la versión vigente en `models/` (`model_registry.py`):
+
+1. Lee solo las filas agregadas al CSV después de la marca de datos de esa
+   versión (offset en bytes; el scraper `--incremental` solo agrega al final).
+   Si el archivo se reescribió, avisa y hay que volver a `train_search.py`.
+2. Calcula las features con la lista de Pokémon y las medianas de la spec,
+   así el espacio de features no cambia.
+3. Aparta las partidas más recientes (`--holdout`, por número de battle del
+   `replay_id`) y sigue el boosting del modelo vigente (`init_model`) con
+   `--rounds` árboles más sobre el resto.
+4. Compara en ese tramo reciente el candidato con el modelo vigente: se
+   acepta si su log loss no empeora más de `--tolerance`.
+5. Aceptado: se rehace la continuación con todas las filas nuevas (incluido
+   el tramo apartado), se registra como versión nueva y se publica en
+   `models/booster.txt` + `spec.json`. Rechazado: queda registrado como
+   `rejected` y la marca de datos no avanza, así esas filas vuelven a entrar
+   en la próxima ejecución.
+
+La versión base la da `train_search.py` entrenado sobre el CSV al que
+agrega el scraper (la marca de datos apunta a ese archivo).
+
+Uso (desde Proyecto3):
+    python train_search.py --data data/pokemon_showdown_teams.csv   # una vez
+    python scrape_showdown_replays.py --incremental --pages 120
+    python retrain_incremental.py run
+    python retrain_incremental.py list
+    python retrain_incremental.py promote v0003     # volver a una versión anterior
+"""
+
+from __future__ import annotations
+
+import argparse
+import dataclasses
+import io
+import logging
+import time
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import lightgbm as lgb
+import numpy as np
+import pandas as pd
+from sklearn.metrics import f1_score, log_loss, roc_auc_score
+
+from model_registry import MODELS_DIR, ModelRegistry, StaleWatermarkError, check_watermark, csv_watermark
+from pairwise_features import ID_COL, add_team_features, build_pairwise
+from train_search import DATA_PATH, LGB_BASE_PARAMS, LGB_DATASET_PARAMS
+
+
+def read_appended(path: Path, offset: int) -> Tuple[pd.DataFrame, Dict]:
+    """Filas completas de `path` desde el byte `offset` y la marca nueva."""
+    mark = csv_watermark(path)
+    with open(path, "rb") as f:
+        header = f.readline()
+        f.seek(max(offset, len(header)))
+        chunk = f.read(mark["offset"] - f.tell())
+    if not chunk:
+        return pd.DataFrame(), mark
+    return pd.read_csv(io.BytesIO(header + chunk)), mark
+
+
+def battle_number(replay_ids: pd.Series) -> np.ndarray:
+    """Número de battle de `<formato>-<n>`; crece con el tiempo en el servidor."""
+    return pd.to_numeric(replay_ids.str.rsplit("-", n=1).str[-1], errors="coerce").to_numpy()
+
+
+def pairwise_features(rows: pd.DataFrame, spec: Dict) -> pd.DataFrame:
+    """Dataset comparativo de `rows` con el mismo espacio de features que `spec`."""
+    rows = rows.dropna(subset=["team_pokemon", "sum_hp", "won_battle"])
+    if rows.empty:
+        return pd.DataFrame()
+    teams, base_cols, poke_cols = add_team_features(rows, pokemon=spec["pokemon"], fill_values=spec["fill_values"])
+    pairs = build_pairwise(teams, base_cols, poke_cols)
+    if pairs.empty:
+        return pairs
+    return pairs[[ID_COL, "won_battle", *spec["feature_cols"]]]
+
+
+def time_split(pairs: pd.DataFrame, holdout: float) -> Tuple[np.ndarray, np.ndarray]:
+    """Máscaras (train, hold-out): el hold-out son las partidas más recientes.
+
+    Las dos filas de una partida caen siempre del mismo lado.
+    """
+    order = pd.DataFrame({ID_COL: pairs[ID_COL].to_numpy(), "n": battle_number(pairs[ID_COL])})
+    order["pos"] = np.arange(len(order))
+    # Sin número reconocible, se usa la posición en el archivo.
+    first = order.groupby(ID_COL, sort=False).agg(n=("n", "first"), pos=("pos", "first"))
+    first = first.sort_values(["n", "pos"], na_position="first", kind="stable")
+    n_holdout = int(round(len(first) * holdout))
+    newest = set(first.index[len(first) - n_holdout :])
+    test = order[ID_COL].isin(newest).to_numpy()
+    return ~test, test
+
+
+def evaluate(booster: lgb.Booster, X: np.ndarray, y: np.ndarray, threshold: float = 0.5) -> Dict[str, float]:
+    proba = booster.predict(X)
+    metrics = {
+        "log_loss": float(log_loss(y, proba, labels=[0, 1])),
+        "f1": float(f1_score(y, proba >= threshold, zero_division=0)),
+    }
+    # Un tramo chico puede tener una sola clase; ahí el AUC no está definido.
+    metrics["roc_auc"] = float(roc_auc_score(y, proba)) if len(np.unique(y)) == 2 else float("nan")
+    return metrics
+
+
+def continue_boosting(booster: lgb.Booster, params: Dict, X: np.ndarray, y: np.ndarray, rounds: int) -> lgb.Booster:
+    """`rounds` árboles más sobre (X, y), partiendo de las predicciones de `booster`."""
+    train = lgb.Dataset(X, y, params=LGB_DATASET_PARAMS)
+    return lgb.train(params, train, num_boost_round=rounds, init_model=booster, keep_training_booster=False)
+
+
+@dataclasses.dataclass
+class RetrainResult:
+    parent: str
+    version: Optional[str] = None
+    accepted: bool = False
+    new_rows: int = 0
+    train_rows: int = 0
+    holdout_rows: int = 0
+    current: Dict[str, float] = dataclasses.field(default_factory=dict)
+    candidate: Dict[str, float] = dataclasses.field(default_factory=dict)
+    elapsed: float = 0.0
+
+
+def retrain(
+    registry: ModelRegistry,
+    data_path: Optional[Path] = None,
+    rounds: int = 50,
+    holdout: float = 0.2,
+    tolerance: float = 0.0,
+    min_battles: int = 50,
+    learning_rate: Optional[float] = None,
+    dry_run: bool = False,
+) -> RetrainResult:
+    start = time.perf_counter()
+    parent = registry.current
+    booster, spec = registry.load(parent)
+    result = RetrainResult(parent=parent)
+    mark = spec.get("data")
+    if mark is None:
+        raise StaleWatermarkError(f"{parent} no tiene marca de datos; entrenarlo de nuevo con train_search.py")
+    data_path = Path(data_path or mark["path"])
+    check_watermark(mark, data_path)
+
+    rows, new_mark = read_appended(data_path, mark["offset"])
+    result.new_rows = len(rows)
+    pairs = pairwise_features(rows, spec) if len(rows) else pd.DataFrame()
+    battles = len(pairs) // 2
+    logging.info("%d filas nuevas en %s (%d partidas completas)", len(rows), data_path, battles)
+    min_battles = max(min_battles, 1)
+    if battles < min_battles:
+        logging.info("Menos de %d partidas nuevas: se mantiene %s", min_battles, parent)
+        result.elapsed = time.perf_counter() - start
+        return result
+
+    X = pairs[spec["feature_cols"]].to_numpy(dtype=np.float64)
+    y = pairs["won_battle"].to_numpy()
+    train_mask, test_mask = time_split(pairs, holdout)
+    result.train_rows, result.holdout_rows = int(train_mask.sum()), int(test_mask.sum())
+    params = {**LGB_BASE_PARAMS, **spec["params"]}
+    if learning_rate is not None:
+        params["learning_rate"] = learning_rate
+
+    candidate = continue_boosting(booster, params, X[train_mask], y[train_mask], rounds)
+    result.current = evaluate(booster, X[test_mask], y[test_mask], spec.get("threshold", 0.5))
+    result.candidate = evaluate(candidate, X[test_mask], y[test_mask], spec.get("threshold", 0.5))
+    result.accepted = result.candidate["log_loss"] <= result.current["log_loss"] + tolerance
+    logging.info(
+        "Tramo reciente (%d filas): log loss %.4f -> %.4f, AUC %.4f -> %.4f => %s",
+        result.holdout_rows,
+        result.current["log_loss"],
+        result.candidate["log_loss"],
+        result.current["roc_auc"],
+        result.candidate["roc_auc"],
+        "aceptado" if result.accepted else "rechazado",
+    )
+
+    if result.accepted:
+        # Ya validado: las filas apartadas también entran al modelo publicado.
+        candidate = continue_boosting(booster, params, X, y, rounds)
+    new_spec = {
+        **spec,
+        "params": {key: value for key, value in params.items() if key not in LGB_BASE_PARAMS},
+        "num_iterations": candidate.current_iteration(),
+        "metrics": {
+            **{f"holdout_{key}": value for key, value in result.candidate.items()},
+            **{f"parent_holdout_{key}": value for key, value in result.current.items()},
+        },
+        "data": new_mark,
+        "incremental": {"new_rows": result.new_rows, "battles": battles, "rounds": rounds, "holdout": holdout},
+    }
+    if not dry_run:
+        status = "accepted" if result.accepted else "rejected"
+        result.version = registry.save(candidate, new_spec, status=status, parent=parent)
+        if result.accepted:
+            registry.promote(result.version)
+    result.elapsed = time.perf_counter() - start
+    return result
+
+
+def print_versions(registry: ModelRegistry) -> None:
+    current = registry.current
+    print(f"{'versión':9s} {'estado':9s} {'padre':7s} {'árboles':>8s} {'filas CSV':>10s}  métricas")
+    for entry in registry.entries():
+        metrics = ", ".join(f"{k}={v:.4f}" for k, v in entry["metrics"].items() if not k.startswith("parent_"))
+        offset = (entry.get("data") or {}).get("offset")
+        mark = "*" if entry["version"] == current else " "
+        print(
+            f"{entry['version']}{mark:3s} {entry['status']:9s} {entry['parent'] or '-':7s} "
+            f"{entry['num_iterations'] or 0:8d} {offset if offset is not None else '-':>10} {metrics}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Reentrenamiento incremental del modelo LightGBM")
+    parser.add_argument("--models-dir", type=Path, default=MODELS_DIR)
+    parser.add_argument("--log-level", default="INFO")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run = sub.add_parser("run", help="Sigue el boosting con las filas nuevas y valida en el tramo reciente")
+    run.add_argument("--data", type=Path, help=f"CSV del scraper (por defecto, el de la versión vigente: {DATA_PATH})")
+    run.add_argument("--rounds", type=int, default=50, help="Árboles nuevos por reentrenamiento")
+    run.add_argument("--learning-rate", type=float, help="Tasa para los árboles nuevos (por defecto, la de la spec)")
+    run.add_argument("--holdout", type=float, default=0.2, help="Fracción de partidas nuevas (las más recientes) para validar")
+    run.add_argument("--tolerance", type=float, default=0.0, help="Empeoramiento de log loss admitido")
+    run.add_argument("--min-battles", type=int, default=50, help="Partidas nuevas mínimas para reentrenar")
+    run.add_argument("--dry-run", action="store_true", help="Evalúa sin registrar ni publicar")
+
+    sub.add_parser("list", help="Versiones registradas (* = vigente)")
+    promote = sub.add_parser("promote", help="Publica una versión registrada (rollback)")
+    promote.add_argument("version")
+
+    args = parser.parse_args()
+    logging.basicConfig(level=getattr(logging, args.log_level.upper(), logging.INFO), format="%(levelname)s %(message)s")
+    registry = ModelRegistry(args.models_dir)
+
+    if args.command == "list":
+        print_versions(registry)
+    elif args.command == "promote":
+        try:
+            registry.promote(args.version)
+        except KeyError as exc:
+            parser.error(str(exc))
+        print(f"Publicada {args.version} en {args.models_dir}")
+    else:
+        if not 0 < args.holdout < 1:
+            parser.error("--holdout debe estar entre 0 y 1")
+        try:
+            result = retrain(
+                registry,
+                args.data,
+                rounds=args.rounds,
+                holdout=args.holdout,
+                tolerance=args.tolerance,
+                min_battles=args.min_battles,
+                learning_rate=args.learning_rate,
+                dry_run=args.dry_run,
+            )
+        except (FileNotFoundError, StaleWatermarkError) as exc:
+            parser.exit(1, f"{exc}\n")
+        if result.version is None and not result.candidate:
+            print(f"Sin cambios: sigue {result.parent} ({result.elapsed:.1f}s)")
+            return
+        verdict = "aceptado" if result.accepted else "rechazado"
+        target = result.version or "(dry run)"
+        print(f"Candidato {target} {verdict} frente a {result.parent} en {result.elapsed:.1f}s")
+        for name in ("log_loss", "roc_auc", "f1"):
+            print(f"  {name:9s} {result.current[name]:.4f} -> {result.candidate[name]:.4f}")
+
+
+if __name__ == "__main__":
+    main()
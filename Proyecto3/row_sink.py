@@ -0,0 +1,194 @@
+"""
+Escritura incremental de filas (CSV o Parquet) para el scraper.
+
+En lugar de acumular todas las filas en memoria y volcarlas al final, el
+sink las agrupa en lotes de `batch_size` y los escribe a disco a medida que
+llegan (o cada `flush_interval` segundos). Así la memoria se mantiene plana y
+una caída solo pierde el lote en curso.
+
+Salvo en modo `append`, se escribe sobre `<output>.partial` y el archivo
+final se publica con un `os.replace` atómico en `close()`: un lector nunca ve
+un CSV/Parquet a medio escribir.
+"""
+
+from __future__ import annotations
+
+import csv
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence
+
+import pandas as pd
+
+PARQUET_SUFFIXES = {".parquet", ".pq"}
+
+
+class RowSink:
+    """Base de los sinks: buffer, política de flush y finalización atómica."""
+
+    def __init__(
+        self,
+        path: Path,
+        columns: Optional[Sequence[str]] = None,
+        batch_size: int = 1000,
+        flush_interval: float = 30.0,
+        append: bool = False,
+        on_flush: Optional[Callable[[], None]] = None,
+    ) -> None:
+        self.path = Path(path)
+        self.columns: Optional[List[str]] = list(columns) if columns is not None else None
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.append = append
+        self.on_flush = on_flush
+        self.rows_written = 0
+        self._buffer: List[Dict] = []
+        self._last_flush = time.monotonic()
+        self._closed = False
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.target = self.path if append else self.path.with_name(self.path.name + ".partial")
+
+    def write(self, rows: List[Dict]) -> None:
+        self._buffer.extend(rows)
+        if (
+            len(self._buffer) >= self.batch_size
+            or time.monotonic() - self._last_flush >= self.flush_interval
+        ):
+            self.flush()
+
+    def flush(self) -> None:
+        if self._buffer:
+            if self.columns is None:
+                self.columns = list(self._buffer[0].keys())
+            self._write_batch(self._buffer)
+            self.rows_written += len(self._buffer)
+            self._buffer = []
+        self._last_flush = time.monotonic()
+        if self.on_flush is not None:
+            self.on_flush()
+
+    def close(self) -> None:
+        """Vuelca lo pendiente y publica el archivo final."""
+        if self._closed:
+            return
+        self.flush()
+        self._close_writer()
+        self._closed = True
+        if not self.append and self.target.exists():
+            os.replace(self.target, self.path)
+
+    def abort(self) -> None:
+        """Descarta el archivo temporal (no aplica en modo append)."""
+        if self._closed:
+            return
+        self._buffer = []
+        self._close_writer()
+        self._closed = True
+        if not self.append and self.target.exists():
+            self.target.unlink()
+
+    def __enter__(self) -> "RowSink":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.close()
+            return
+        # Ante un error se conserva lo ya escrito en `.partial` para poder
+        # inspeccionarlo o recuperarlo, pero no se publica como salida final.
+        try:
+            self.flush()
+        finally:
+            self._close_writer()
+            self._closed = True
+        logging.warning("Ejecución interrumpida; %d filas conservadas en %s", self.rows_written, self.target)
+
+    def _write_batch(self, rows: List[Dict]) -> None:
+        raise NotImplementedError
+
+    def _close_writer(self) -> None:
+        raise NotImplementedError
+
+
+class CsvRowSink(RowSink):
+    """CSV escrito por lotes con el mismo formato que `DataFrame.to_csv`."""
+
+    def __init__(self, path: Path, **kwargs) -> None:
+        super().__init__(path, **kwargs)
+        self._fh = None
+        self._writer: Optional[csv.DictWriter] = None
+        if self.append and self.path.exists() and self.path.stat().st_size > 0:
+            with self.path.open(newline="", encoding="utf-8") as fh:
+                header = next(csv.reader(fh), None)
+            if header:
+                # Se respeta el orden de columnas del archivo existente.
+                self.columns = header
+                self._has_header = True
+                return
+        self._has_header = False
+
+    def _write_batch(self, rows: List[Dict]) -> None:
+        if self._writer is None:
+            mode = "a" if self.append else "w"
+            self._fh = self.target.open(mode, newline="", encoding="utf-8")
+            self._writer = csv.DictWriter(self._fh, fieldnames=self.columns, lineterminator="\n")
+            if not self._has_header:
+                self._writer.writeheader()
+                self._has_header = True
+        self._writer.writerows(rows)
+        self._fh.flush()
+
+    def _close_writer(self) -> None:
+        if self._fh is not None:
+            self._fh.close()
+            self._fh = None
+            self._writer = None
+
+
+class ParquetRowSink(RowSink):
+    """Parquet con un row group por lote (requiere `pyarrow`).
+
+    `dtypes` fija el tipo de cada columna (nombres de dtype de pandas) para que
+    todos los row groups compartan esquema aunque un lote tenga columnas
+    completamente vacías.
+    """
+
+    def __init__(self, path: Path, dtypes: Optional[Dict[str, str]] = None, **kwargs) -> None:
+        super().__init__(path, **kwargs)
+        if self.append:
+            raise ValueError("Parquet no admite agregar filas a un archivo existente; usar CSV")
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as exc:  # pragma: no cover - depende del entorno
+            raise ImportError("La salida Parquet requiere instalar pyarrow") from exc
+        self._pa = pa
+        self._pq = pq
+        self.dtypes = dtypes or {}
+        self._writer = None
+
+    def _write_batch(self, rows: List[Dict]) -> None:
+        df = pd.DataFrame(rows, columns=self.columns)
+        dtypes = {col: dtype for col, dtype in self.dtypes.items() if col in df.columns}
+        if dtypes:
+            df = df.astype(dtypes)
+        table = self._pa.Table.from_pandas(df, preserve_index=False)
+        if self._writer is None:
+            self._writer = self._pq.ParquetWriter(str(self.target), table.schema)
+        else:
+            table = table.cast(self._writer.schema)
+        self._writer.write_table(table)
+
+    def _close_writer(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+
+def open_sink(path: Path, dtypes: Optional[Dict[str, str]] = None, **kwargs) -> RowSink:
+    """Elige el backend según la extensión de `path` (.parquet/.pq o CSV)."""
+    if Path(path).suffix.lower() in PARQUET_SUFFIXES:
+        return ParquetRowSink(path, dtypes=dtypes, **kwargs)
+    return CsvRowSink(path, **kwargs)
@@ -0,0 +1,466 @@
+"""
+Servicio de predicción: probabilidad de victoria de un equipo contra otro.
+
+Carga una vez el modelo de `train_search.py` (`models/booster.txt` +
+`models/spec.json`), resuelve las especies sin red con las mismas fuentes
+que el scraper (tabla base, caché de PokéAPI y tabla de alias; ver
+`PokemonStatsResolver.offline`) y arma las features con las mismas funciones
+del entrenamiento (`add_team_features` + `build_pairwise`), usando la lista
+de Pokémon y las medianas guardadas en `spec.json`.
+
+- Cada partido se evalúa desde los dos lados y se promedia
+  `(p(equipo) + 1 - p(rival)) / 2`, así `p(A, B) = 1 - p(B, A)`.
+- `MicroBatcher` junta las peticiones concurrentes que llegan en una ventana
+  de `max_wait` segundos (hasta `max_batch`) en una sola llamada al modelo.
+- Los resultados se memorizan en un LRU cuya clave son los equipos
+  ordenados (el orden dentro del equipo no cambia las features).
+
+Uso (desde Proyecto3):
+    python scoring_service.py predict --team "Great Tusk,Kingambit,..." --rival "Gholdengo,..."
+    python scoring_service.py serve --port 8000
+    python scoring_service.py loadtest --url http://127.0.0.1:8000 --requests 2000 --concurrency 32
+    python scoring_service.py loadtest --requests 2000   # en proceso, sin HTTP
+"""
+
+from __future__ import annotations
+
+import argparse
+import dataclasses
+import json
+import logging
+import queue
+import random
+import threading
+import time
+from collections import Counter, OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from http.server import ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, Hashable, List, Optional, Sequence, Tuple
+
+import lightgbm as lgb
+import numpy as np
+import pandas as pd
+import requests
+
+from http_client import JsonRequestHandler
+from pairwise_features import POST_BATTLE_COLS, add_team_features, build_pairwise
+from scrape_showdown_replays import POKEAPI_CACHE, PokemonStatsResolver
+from species_names import DEFAULT_ALIASES
+from stat_store import STAT_COLS
+
+MODELS_DIR = Path("models")
+BASE_STATS = Path("data/pokemon_base_pokeapi.csv")
+TEAMS_CSV = Path("data/pokemon_showdown_teams_clean.csv")
+
+
+@dataclasses.dataclass(frozen=True)
+class Match:
+    team: Tuple[str, ...]
+    rival: Tuple[str, ...]
+    rating: Optional[float] = None
+    rival_rating: Optional[float] = None
+
+    @classmethod
+    def create(
+        cls,
+        team: Sequence[str],
+        rival: Sequence[str],
+        rating: Optional[float] = None,
+        rival_rating: Optional[float] = None,
+    ) -> "Match":
+        # Como el parser de replays: sin especies repetidas, en orden.
+        return cls(tuple(dict.fromkeys(team)), tuple(dict.fromkeys(rival)), rating, rival_rating)
+
+    @property
+    def key(self) -> Hashable:
+        return tuple(sorted(self.team)), tuple(sorted(self.rival)), self.rating, self.rival_rating
+
+
+class UnknownSpeciesError(ValueError):
+    pass
+
+
+class WinProbabilityScorer:
+    """Modelo + tabla de stats + LRU de resultados."""
+
+    def __init__(
+        self,
+        models_dir: Path = MODELS_DIR,
+        base_stats: Path = BASE_STATS,
+        cache_size: int = 100_000,
+        pokeapi_cache: Optional[Path] = POKEAPI_CACHE,
+        aliases: Optional[Path] = DEFAULT_ALIASES,
+    ) -> None:
+        models_dir = Path(models_dir)
+        self.spec = json.loads((models_dir / "spec.json").read_text(encoding="utf-8"))
+        self.booster = lgb.Booster(model_file=str(models_dir / "booster.txt"))
+        self.feature_cols: List[str] = self.spec["feature_cols"]
+        post_battle = [col for col in self.feature_cols if col.rsplit("_", 1)[0] in POST_BATTLE_COLS]
+        if post_battle:
+            logging.warning(
+                "El modelo usa %s, que no se conocen antes de la partida (llegan como NaN); "
+                "conviene reentrenarlo con train_search.py",
+                ", ".join(post_battle),
+            )
+        self.resolver = PokemonStatsResolver.offline(base_stats, pokeapi_cache, aliases)
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[Hashable, float]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    # -- LRU -------------------------------------------------------------------
+
+    def cached(self, match: Match) -> Optional[float]:
+        with self._lock:
+            value = self._cache.get(match.key)
+            if value is not None:
+                self._cache.move_to_end(match.key)
+                self.hits += 1
+            return value
+
+    def _remember(self, match: Match, value: float) -> None:
+        with self._lock:
+            self._cache[match.key] = value
+            self._cache.move_to_end(match.key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    # -- features ----------------------------------------------------------------
+
+    def _team_frame(self, matches: Sequence[Match]) -> pd.DataFrame:
+        """Dos filas por partido con el formato del CSV del scraper."""
+        teams = [side for match in matches for side in (match.team, match.rival)]
+        sums, means, valid = self.resolver.team_stats_batch(teams)
+        if not valid.all():
+            bad = [team for team, ok in zip(teams, valid) if not ok]
+            unknown = sorted({name for team in bad for name in team if self.resolver.resolve_id(name) is None})
+            raise UnknownSpeciesError(f"Especies sin stats: {', '.join(unknown)}")
+        ratings = [r for match in matches for r in (match.rating, match.rival_rating)]
+        opp_ratings = [r for match in matches for r in (match.rival_rating, match.rating)]
+        n_rows = len(teams)
+        columns: Dict[str, object] = {
+            # IDs correlativos: `build_pairwise` conserva el orden de entrada.
+            "replay_id": np.repeat([f"q{i:010d}" for i in range(len(matches))], 2),
+            "player_slot": np.tile(["p1", "p2"], len(matches)),
+            "player_rating": np.array(ratings, dtype=float),
+            "opponent_rating": np.array(opp_ratings, dtype=float),
+            # `build_pairwise` la necesita, pero el modelo no la usa (POST_BATTLE_COLS).
+            "turns": np.full(n_rows, np.nan),
+            "team_size": np.array([len(team) for team in teams], dtype=float),
+            "team_pokemon": [",".join(team) for team in teams],
+            "won_battle": np.zeros(n_rows, dtype=int),
+        }
+        columns["rating_diff"] = columns["player_rating"] - columns["opponent_rating"]
+        for j, col in enumerate(STAT_COLS):
+            columns[f"sum_{col}"] = sums[:, j]
+            columns[f"mean_{col}"] = means[:, j]
+        return pd.DataFrame(columns)
+
+    def features(self, matches: Sequence[Match]) -> pd.DataFrame:
+        frame = self._team_frame(matches)
+        teams, base_cols, poke_cols = add_team_features(
+            frame, pokemon=self.spec["pokemon"], fill_values=self.spec["fill_values"]
+        )
+        return build_pairwise(teams, base_cols, poke_cols)[self.feature_cols]
+
+    # -- predicción ----------------------------------------------------------------
+
+    def score_batch(self, matches: Sequence[Match]) -> List[float]:
+        """Probabilidad de que `team` gane, para cada partido (una llamada al modelo)."""
+        results: List[Optional[float]] = [self.cached(match) for match in matches]
+        pending: Dict[Hashable, Match] = {}
+        for match, value in zip(matches, results):
+            if value is None:
+                pending.setdefault(match.key, match)
+        if pending:
+            unique = list(pending.values())
+            with self._lock:
+                self.misses += len(unique)
+            proba = self.booster.predict(self.features(unique).to_numpy(dtype=np.float64))
+            symmetric = (proba[0::2] + 1.0 - proba[1::2]) / 2.0
+            for match, value in zip(unique, symmetric):
+                self._remember(match, float(value))
+            scored = {match.key: float(value) for match, value in zip(unique, symmetric)}
+            results = [value if value is not None else scored[match.key] for match, value in zip(matches, results)]
+        return results  # type: ignore[return-value]
+
+    def score(self, match: Match) -> float:
+        return self.score_batch([match])[0]
+
+
+@dataclasses.dataclass
+class _Pending:
+    match: Match
+    future: Future
+
+
+class MicroBatcher:
+    """Agrupa peticiones concurrentes en una sola llamada a `score_batch`."""
+
+    def __init__(self, scorer: WinProbabilityScorer, max_batch: int = 256, max_wait: float = 0.002) -> None:
+        self.scorer = scorer
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.batches = 0
+        self._queue: "queue.Queue[Optional[_Pending]]" = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, match: Match) -> Future:
+        future: Future = Future()
+        value = self.scorer.cached(match)
+        if value is not None:
+            future.set_result(value)
+        else:
+            self._queue.put(_Pending(match, future))
+        return future
+
+    def score(self, match: Match, timeout: Optional[float] = 10.0) -> float:
+        return self.submit(match).result(timeout=timeout)
+
+    def _collect(self, first: _Pending) -> List[_Pending]:
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                self._queue.put(None)
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            batch = self._collect(first)
+            self.batches += 1
+            try:
+                results = self.scorer.score_batch([item.match for item in batch])
+            except UnknownSpeciesError:
+                # Se reintenta uno a uno para que solo fallen los partidos inválidos.
+                for item in batch:
+                    try:
+                        item.future.set_result(self.scorer.score(item.match))
+                    except Exception as exc:
+                        item.future.set_exception(exc)
+                continue
+            except Exception as exc:
+                for item in batch:
+                    item.future.set_exception(exc)
+                continue
+            for item, value in zip(batch, results):
+                item.future.set_result(value)
+
+    def close(self) -> None:
+        self._queue.put(None)
+        self._thread.join()
+
+
+# -- HTTP --------------------------------------------------------------------------
+
+
+def _match_from_payload(payload: Dict) -> Match:
+    return Match.create(payload["team"], payload["rival"], payload.get("rating"), payload.get("rival_rating"))
+
+
+def make_handler(batcher: MicroBatcher):
+    class Handler(JsonRequestHandler):
+        def do_GET(self) -> None:
+            if self.path != "/health":
+                self._reply(404, {"error": "no encontrado"})
+                return
+            scorer = batcher.scorer
+            self._reply(200, {
+                "status": "ok",
+                "cache_hits": scorer.hits,
+                "cache_misses": scorer.misses,
+                "batches": batcher.batches,
+            })
+
+        def do_POST(self) -> None:
+            if self.path != "/predict":
+                self._reply(404, {"error": "no encontrado"})
+                return
+            try:
+                payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+                if "matches" in payload:
+                    futures = [batcher.submit(_match_from_payload(item)) for item in payload["matches"]]
+                    self._reply(200, {"win_probability": [f.result(timeout=10) for f in futures]})
+                else:
+                    self._reply(200, {"win_probability": batcher.score(_match_from_payload(payload))})
+            except UnknownSpeciesError as exc:
+                self._reply(422, {"error": str(exc)})
+            except FutureTimeoutError:
+                self._reply(504, {"error": "el modelo no respondió a tiempo"})
+            except (KeyError, TypeError, ValueError) as exc:
+                self._reply(400, {"error": f"petición inválida: {exc}"})
+            except Exception as exc:  # noqa: BLE001 - siempre se responde, no se corta la conexión
+                logging.exception("Error al predecir")
+                self._reply(500, {"error": f"error interno: {type(exc).__name__}"})
+
+    return Handler
+
+
+def serve(batcher: MicroBatcher, host: str = "127.0.0.1", port: int = 8000) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer((host, port), make_handler(batcher))
+    server.daemon_threads = True
+    return server
+
+
+# -- prueba de carga -----------------------------------------------------------------
+
+
+def sample_matches(
+    n: int, resolver: PokemonStatsResolver, teams_csv: Path = TEAMS_CSV, seed: int = 42, distinct: int = 500
+) -> List[Match]:
+    """`n` partidos sorteados entre `distinct` combinaciones de equipos reales.
+
+    Se usan todos los equipos, también los que tienen especies sin stats: así
+    la prueba ve la misma mezcla que el servicio, incluidas las respuestas 422.
+    """
+    rng = random.Random(seed)
+    teams = pd.read_csv(teams_csv, usecols=["team_pokemon"])["team_pokemon"].dropna().str.split(",").tolist()
+    unresolved = [team for team in teams if resolver.team_ids(team) is None]
+    if unresolved:
+        unknown = Counter(name for team in unresolved for name in team if resolver.resolve_id(name) is None)
+        logging.warning(
+            "%d de %d equipos (%.0f%%) tienen especies sin stats y fallarán; las más frecuentes: %s",
+            len(unresolved),
+            len(teams),
+            100 * len(unresolved) / len(teams),
+            ", ".join(f"{name} ({count})" for name, count in unknown.most_common(5)),
+        )
+    pool = [Match.create(*rng.sample(teams, 2)) for _ in range(distinct)]
+    return [rng.choice(pool) for _ in range(n)]
+
+
+def load_test(call, matches: Sequence[Match], concurrency: int) -> Dict[str, float]:
+    """Latencias de `call` sobre `matches`; p50/p99 incluyen las peticiones fallidas."""
+    latencies: List[float] = []
+    errors = 0
+    lock = threading.Lock()
+
+    def one(match: Match) -> None:
+        nonlocal errors
+        start = time.perf_counter()
+        failed = False
+        try:
+            call(match)
+        except Exception as exc:
+            logging.debug("Error en la prueba de carga: %s", exc)
+            failed = True
+        elapsed = time.perf_counter() - start
+        with lock:
+            latencies.append(elapsed)
+            errors += failed
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, matches))
+    wall = time.perf_counter() - start
+    ms = np.array(latencies) * 1e3
+    return {
+        "requests": len(matches),
+        "errors": errors,
+        "error_rate": errors / len(matches) if matches else 0.0,
+        "throughput_rps": len(latencies) / wall,
+        "p50_ms": float(np.percentile(ms, 50)) if len(ms) else float("nan"),
+        "p99_ms": float(np.percentile(ms, 99)) if len(ms) else float("nan"),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Probabilidad de victoria equipo vs equipo")
+    parser.add_argument("--models-dir", type=Path, default=MODELS_DIR)
+    parser.add_argument("--base-stats", type=Path, default=BASE_STATS)
+    parser.add_argument("--pokeapi-cache", type=Path, default=POKEAPI_CACHE, help="Caché del scraper (solo lectura)")
+    parser.add_argument("--aliases", type=Path, default=DEFAULT_ALIASES, help="Tabla de alias de especies")
+    parser.add_argument("--cache-size", type=int, default=100_000, help="Entradas del LRU de resultados")
+    parser.add_argument("--max-batch", type=int, default=256)
+    parser.add_argument("--max-wait-ms", type=float, default=2.0, help="Ventana del micro-batching")
+    parser.add_argument("--log-level", default="INFO")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    predict = sub.add_parser("predict", help="Una predicción por línea de comandos")
+    predict.add_argument("--team", required=True, help="Especies separadas por coma")
+    predict.add_argument("--rival", required=True, help="Especies separadas por coma")
+    predict.add_argument("--rating", type=float)
+    predict.add_argument("--rival-rating", type=float)
+
+    server = sub.add_parser("serve", help="Servicio HTTP local (POST /predict, GET /health)")
+    server.add_argument("--host", default="127.0.0.1")
+    server.add_argument("--port", type=int, default=8000)
+
+    load = sub.add_parser("loadtest", help="Prueba de carga con latencias p50/p99")
+    load.add_argument("--url", help="Servicio HTTP a probar; si se omite, se prueba en proceso")
+    load.add_argument("--requests", type=int, default=2000)
+    load.add_argument("--concurrency", type=int, default=32)
+    load.add_argument("--distinct", type=int, default=500, help="Partidos distintos (el resto repite -> LRU)")
+    load.add_argument("--teams", type=Path, default=TEAMS_CSV)
+
+    args = parser.parse_args()
+    logging.basicConfig(level=getattr(logging, args.log_level.upper(), logging.INFO), format="%(levelname)s %(message)s")
+
+    if args.command == "loadtest" and args.url:
+        session = requests.Session()
+        session.mount("http://", requests.adapters.HTTPAdapter(pool_maxsize=args.concurrency))
+        url = args.url.rstrip("/") + "/predict"
+
+        def call(match: Match) -> float:
+            resp = session.post(url, json={"team": list(match.team), "rival": list(match.rival)}, timeout=10)
+            resp.raise_for_status()
+            return resp.json()["win_probability"]
+
+        resolver = PokemonStatsResolver.offline(args.base_stats, args.pokeapi_cache, args.aliases)
+        matches = sample_matches(args.requests, resolver, args.teams, distinct=args.distinct)
+        print(json.dumps(load_test(call, matches, args.concurrency), indent=2))
+        return
+
+    scorer = WinProbabilityScorer(
+        args.models_dir,
+        args.base_stats,
+        cache_size=args.cache_size,
+        pokeapi_cache=args.pokeapi_cache,
+        aliases=args.aliases,
+    )
+    if args.command == "predict":
+        match = Match.create(args.team.split(","), args.rival.split(","), args.rating, args.rival_rating)
+        try:
+            print(f"P(victoria) = {scorer.score(match):.4f}")
+        except UnknownSpeciesError as exc:
+            parser.exit(1, f"{exc}\n")
+        return
+
+    batcher = MicroBatcher(scorer, max_batch=args.max_batch, max_wait=args.max_wait_ms / 1e3)
+    try:
+        if args.command == "serve":
+            httpd = serve(batcher, args.host, args.port)
+            logging.info("Escuchando en http://%s:%d (POST /predict)", args.host, args.port)
+            try:
+                httpd.serve_forever()
+            except KeyboardInterrupt:
+                pass
+            finally:
+                httpd.server_close()
+        else:
+            matches = sample_matches(args.requests, scorer.resolver, args.teams, distinct=args.distinct)
+            result = load_test(batcher.score, matches, args.concurrency)
+            result.update({"batches": batcher.batches, "cache_hits": scorer.hits, "cache_misses": scorer.misses})
+            print(json.dumps(result, indent=2))
+    finally:
+        batcher.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,311 @@
+"""
+Scraping de muchos formatos (o formato x rango de fechas) con varios procesos.
+
+Los shards se encolan en una cola SQLite (`work_queue.py`) y los consumen
+`--workers` procesos. Cada worker carga una sola vez la tabla de stats y su
+sesión HTTP y procesa un shard tras otro con `scrape_showdown_replays.run`.
+Todos comparten la caché de PokéAPI (`--cache`), la tabla de alias y, con
+`--archive`, el archivo de replays de cada formato.
+
+La salida queda particionada por formato, un archivo por shard:
+    data/shards/queue.sqlite
+    data/shards/<formato>/<shard>.csv
+    data/shards/<formato>/replays/       (con --archive)
+
+Un shard fallido se reintenta hasta `--max-attempts` veces; después queda
+`failed` y se vuelve a encolar a mano con `retry`. Reejecutar `run` retoma
+los pendientes: los shards `done` no se repiten.
+
+Uso (desde Proyecto3):
+    python scrape_sharded.py enqueue --formats gen9ou,gen9uu,gen9vgc2025regg --max-replays 2000 --pages 100
+    python scrape_sharded.py enqueue --formats gen9ou --since 2025-01-01 --until 2025-03-01 --split-days 7
+    python scrape_sharded.py run --workers 4
+    python scrape_sharded.py status
+    python scrape_sharded.py retry                # todos los failed (o IDs concretos)
+    python scrape_sharded.py merge                # data/shards/<formato>.csv por formato
+"""
+
+from __future__ import annotations
+
+import argparse
+import copy
+import datetime
+import logging
+import multiprocessing
+import re
+from pathlib import Path
+from typing import List, Optional
+
+import pandas as pd
+
+import scrape_showdown_replays as scraper
+from work_queue import STATUSES, Shard, WorkQueue, worker_id
+
+OUTPUT_DIR = Path("data/shards")
+DAY_FORMAT = "%Y-%m-%d"
+
+
+def shard_id(format_id: str, since: Optional[str], until: Optional[str]) -> str:
+    if since is None and until is None:
+        return format_id
+    return f"{format_id}@{since or ''}_{until or ''}"
+
+
+def make_shards(
+    formats: List[str],
+    max_replays: int,
+    pages: int,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    split_days: Optional[int] = None,
+) -> List[Shard]:
+    """Un shard por formato, o por formato y ventana de `split_days` días."""
+    windows = [(since, until)]
+    if split_days:
+        if since is None or until is None:
+            raise ValueError("--split-days requiere --since y --until")
+        start = datetime.datetime.strptime(since, DAY_FORMAT)
+        end = datetime.datetime.strptime(until, DAY_FORMAT)
+        windows = []
+        while start < end:
+            stop = min(start + datetime.timedelta(days=split_days), end)
+            windows.append((start.strftime(DAY_FORMAT), stop.strftime(DAY_FORMAT)))
+            start = stop
+    return [
+        Shard(
+            shard_id(format_id, lo, hi),
+            format_id,
+            {"max_replays": max_replays, "pages": pages, "since": lo, "until": hi},
+        )
+        for format_id in formats
+        for lo, hi in windows
+    ]
+
+
+def shard_output(output_dir: Path, shard: Shard, suffix: str) -> Path:
+    name = re.sub(r"[^A-Za-z0-9_.-]", "_", shard.shard_id)
+    return output_dir / shard.format_id / f"{name}{suffix}"
+
+
+def worker_loop(
+    queue_path: Path,
+    base: "argparse.Namespace",
+    output_dir: Path,
+    suffix: str,
+    archive: bool,
+    max_attempts: int,
+    name: str,
+) -> int:
+    """Procesa shards hasta vaciar la cola; devuelve cuántos completó."""
+    # Con fork el handler del proceso padre ya está configurado: force lo reemplaza.
+    logging.basicConfig(
+        level=getattr(logging, base.log_level.upper()), format=f"%(levelname)s [{name}] %(message)s", force=True
+    )
+    queue = WorkQueue(queue_path, max_attempts=max_attempts)
+    session = scraper.make_run_session(base)
+    resolver = scraper.make_resolver(base, session)
+    completed = 0
+    while True:
+        shard = queue.claim(worker_id(name))
+        if shard is None:
+            break
+        args = copy.copy(base)
+        args.format = shard.format_id
+        args.max_replays = shard.params["max_replays"]
+        args.pages = shard.params["pages"]
+        args.since = shard.params.get("since")
+        args.until = shard.params.get("until")
+        args.output = shard_output(output_dir, shard, suffix)
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        if archive:
+            args.archive = output_dir / shard.format_id / "replays"
+        logging.info("Shard %s (intento %d) -> %s", shard.shard_id, shard.attempts, args.output)
+        try:
+            result = scraper.run(args, session=session, resolver=resolver)
+        except Exception as exc:  # noqa: BLE001 - el shard se reintenta, el worker sigue
+            logging.exception("Falló el shard %s", shard.shard_id)
+            queue.fail(shard.shard_id, f"{type(exc).__name__}: {exc}")
+            continue
+        if result.rows == 0:
+            logging.warning(
+                "El shard %s no produjo filas (¿ventana vacía o más allá de %d páginas?)",
+                shard.shard_id,
+                args.pages,
+            )
+        queue.complete(shard.shard_id, result.replays, result.rows)
+        completed += 1
+    queue.close()
+    return completed
+
+
+def _worker_main(*args) -> None:
+    worker_loop(*args)
+
+
+def base_namespace(args: argparse.Namespace) -> argparse.Namespace:
+    """Opciones del scraper comunes a todos los shards."""
+    base = scraper.build_parser().parse_args([])
+    base.base_stats = args.base_stats
+    base.cache = args.cache
+    base.no_cache = args.no_cache
+    base.aliases = args.aliases
+    base.replay_server = args.replay_server
+    base.concurrency = args.concurrency
+    # El límite es por proceso: se reparte el total entre los workers.
+    base.rate = args.rate / args.workers
+    base.log_level = args.log_level
+    return base
+
+
+def print_status(queue: WorkQueue, verbose: bool = False) -> None:
+    counts = queue.counts()
+    print(" | ".join(f"{status}: {counts[status]}" for status in STATUSES))
+    shards = queue.shards()
+    frame = pd.DataFrame(
+        [{"formato": s.format_id, "status": s.status, "replays": s.replays or 0, "filas": s.rows or 0} for s in shards]
+    )
+    if not frame.empty:
+        summary = frame.groupby(["formato", "status"]).size().unstack(fill_value=0)
+        summary[["replays", "filas"]] = frame.groupby("formato")[["replays", "filas"]].sum()
+        print(summary.to_string())
+    for s in shards:
+        if verbose or s.status == "failed":
+            print(f"{s.shard_id:40s} {s.status:8s} intentos={s.attempts} filas={s.rows} {s.error or ''}")
+
+
+def merge_outputs(output_dir: Path, suffix: str) -> List[Path]:
+    """Concatena los shards de cada formato en `<output_dir>/<formato><suffix>`.
+
+    Si dos ventanas se solapan, un replay puede aparecer dos veces: se deja
+    la primera aparición de cada `(replay_id, player_slot)`.
+    """
+    merged = []
+    for directory in sorted(p for p in output_dir.iterdir() if p.is_dir()):
+        parts = sorted(directory.glob(f"*{suffix}"))
+        if not parts:
+            continue
+        read = pd.read_parquet if suffix in scraper.PARQUET_SUFFIXES else pd.read_csv
+        df = pd.concat([read(part) for part in parts], ignore_index=True)
+        df = df.drop_duplicates(["replay_id", "player_slot"])
+        target = output_dir / f"{directory.name}{suffix}"
+        if suffix in scraper.PARQUET_SUFFIXES:
+            df.to_parquet(target, index=False)
+        else:
+            df.to_csv(target, index=False)
+        logging.info("%s: %d shards, %d filas -> %s", directory.name, len(parts), len(df), target)
+        merged.append(target)
+    return merged
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Scraping por shards con cola de trabajo y varios procesos")
+    parser.add_argument("--queue", type=Path, default=OUTPUT_DIR / "queue.sqlite", help="Cola SQLite de shards")
+    parser.add_argument("--output-dir", type=Path, default=OUTPUT_DIR)
+    parser.add_argument("--suffix", default=".csv", help="Extensión de salida por shard (.csv o .parquet)")
+    parser.add_argument("--log-level", default="INFO")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    enqueue = sub.add_parser("enqueue", help="Agrega shards a la cola")
+    enqueue.add_argument("--formats", required=True, help="Formatos separados por coma (ej. gen9ou,gen9uu)")
+    enqueue.add_argument("--max-replays", type=int, default=400, help="Máximo de replays por shard")
+    enqueue.add_argument("--pages", type=int, default=25, help="Páginas del feed por shard")
+    enqueue.add_argument("--since", help="Inicio de la ventana (AAAA-MM-DD, UTC)")
+    enqueue.add_argument("--until", help="Fin de la ventana, excluido (AAAA-MM-DD, UTC)")
+    enqueue.add_argument("--split-days", type=int, help="Parte la ventana en shards de N días")
+
+    runner = sub.add_parser("run", help="Consume la cola con varios procesos")
+    runner.add_argument("--workers", type=int, default=4)
+    runner.add_argument("--max-attempts", type=int, default=3, help="Intentos por shard antes de marcarlo failed")
+    runner.add_argument("--base-stats", type=Path, default=Path("data/pokemon_base_pokeapi.csv"))
+    runner.add_argument("--cache", type=Path, default=Path("data/pokeapi_cache.sqlite"))
+    runner.add_argument("--no-cache", action="store_true")
+    runner.add_argument("--aliases", type=Path, default=scraper.DEFAULT_ALIASES)
+    runner.add_argument("--concurrency", type=int, default=4, help="Descargas simultáneas por worker")
+    runner.add_argument(
+        "--rate",
+        type=float,
+        default=scraper.DEFAULT_RATES["replay.pokemonshowdown.com"],
+        help="Peticiones por segundo al servidor de replays, en total",
+    )
+    runner.add_argument("--replay-server", default=scraper.REPLAY_SERVER)
+    runner.add_argument("--archive", action="store_true", help="Archiva los replays crudos por formato")
+    runner.add_argument(
+        "--stale-after",
+        type=float,
+        default=360,
+        help="Minutos tras los que un shard running de otra máquina se da por abandonado (0 = nunca)",
+    )
+
+    status = sub.add_parser("status", help="Estado de la cola por formato")
+    status.add_argument("-v", "--verbose", action="store_true", help="Lista todos los shards")
+
+    retry = sub.add_parser("retry", help="Vuelve a encolar shards fallidos")
+    retry.add_argument("shard_ids", nargs="*", help="IDs concretos (por defecto, todos los failed)")
+
+    sub.add_parser("merge", help="Une los shards de cada formato en un solo archivo")
+
+    args = parser.parse_args()
+    logging.basicConfig(level=getattr(logging, args.log_level.upper()), format="%(levelname)s %(message)s")
+    queue = WorkQueue(args.queue)
+
+    if args.command == "enqueue":
+        for day in (args.since, args.until):
+            if day is not None:
+                try:
+                    datetime.datetime.strptime(day, DAY_FORMAT)
+                except ValueError:
+                    parser.error(f"fecha inválida: {day} (formato AAAA-MM-DD)")
+        try:
+            shards = make_shards(
+                [f.strip() for f in args.formats.split(",") if f.strip()],
+                args.max_replays,
+                args.pages,
+                args.since,
+                args.until,
+                args.split_days,
+            )
+        except ValueError as exc:
+            parser.error(str(exc))
+        added = queue.add(shards)
+        print(f"{added} shards nuevos ({len(shards) - added} ya estaban en la cola)")
+    elif args.command == "run":
+        if not args.base_stats.exists():
+            parser.error(f"no existe --base-stats {args.base_stats}")
+        requeued = queue.requeue_running(args.stale_after * 60 if args.stale_after else None)
+        if requeued:
+            logging.info("%d shards de una ejecución anterior vuelven a pendiente", requeued)
+        queue.max_attempts = args.max_attempts
+        pending = queue.counts()["pending"]
+        workers = max(1, min(args.workers, pending))
+        logging.info("%d shards pendientes, %d workers", pending, workers)
+        base = base_namespace(argparse.Namespace(**{**vars(args), "workers": workers}))
+        worker_args = (args.queue, base, args.output_dir, args.suffix, args.archive, args.max_attempts)
+        processes = [
+            multiprocessing.Process(target=_worker_main, args=(*worker_args, f"w{i}"), name=f"shard-worker-{i}")
+            for i in range(workers)
+        ]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+        crashed = [p.name for p in processes if p.exitcode != 0]
+        if crashed:
+            logging.error("Workers terminados con error: %s (sus shards siguen en la cola)", ", ".join(crashed))
+        print_status(queue)
+    elif args.command == "status":
+        print_status(queue, args.verbose)
+    elif args.command == "retry":
+        requeued = queue.retry(args.shard_ids)
+        print(f"{len(requeued)} shards vuelven a pendiente")
+        skipped = [shard_id for shard_id in args.shard_ids if shard_id not in requeued]
+        if skipped:
+            logging.warning(
+                "Sin cambios (en curso con su worker vivo, done o inexistentes): %s", ", ".join(skipped)
+            )
+    elif args.command == "merge":
+        merge_outputs(args.output_dir, args.suffix)
+    queue.close()
+
+
+if __name__ == "__main__":
+    main()
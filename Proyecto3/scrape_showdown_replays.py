@@ -4,73 +4,83 @@ con información de cada equipo (p1/p2) y etiquetado real de victoria.
 
 Uso rápido:
     python scrape_showdown_replays.py --format gen9ou --pages 30 \
-        --output showdown_teams.csv
+        --concurrency 8 --output showdown_teams.csv
+
+Las descargas de replays se hacen en paralelo (`--concurrency`) sobre una
+sesión HTTP compartida, solapadas con el paginado del feed de búsqueda. El
+ritmo lo marca un limitador token bucket por host (`--rate`) con reintentos
+y backoff ante 429/5xx, en lugar de pausas fijas.
+
+Las filas se escriben a disco por lotes (`--batch-size`) a medida que se
+generan; la salida puede ser CSV o Parquet según la extensión de `--output`.
+
+Con `--archive DIR` se guarda además el JSON crudo de cada replay; más tarde
+`--from-archive` reconstruye el dataset desde ese archivo sin usar la red,
+repartiendo el parseo en `--workers` procesos:
+    python scrape_showdown_replays.py --archive data/replays --from-archive --workers 8
+
+Con `--incremental` solo se descargan replays que no estén en el índice
+(`--index`) y las filas se agregan a `--output` en lugar de reescribirlo:
+    python scrape_showdown_replays.py --incremental --pages 200
+
+`--since`/`--until` (AAAA-MM-DD, UTC) limitan el scrape a una ventana de
+fechas de subida; para repartir muchos formatos o ventanas entre varios
+procesos está `scrape_sharded.py`.
+
+Con `--metrics` se miden los tiempos por etapa (paginado, descarga, parseo,
+filas, escritura), la latencia por endpoint HTTP y contadores del resolver
+(caché, 404, variantes); el resumen sale al final y puede guardarse en JSON
+(`--metrics-json`) o en formato Prometheus (`--metrics-prom`). `--profile`
+perfila la ejecución con cProfile o pyinstrument.
 
 Requiere que exista "pokemon_base_pokeapi.csv" (descargado vía PokéAPI).
 Para especies que no estén en ese archivo, se consulta PokéAPI on-demand
-para obtener sus estadísticas base.
+para obtener sus estadísticas base. Esas respuestas (incluidos los 404) se
+guardan en una caché SQLite (`--cache`) compartida entre ejecuciones.
 """
 
 from __future__ import annotations
 
 import argparse
 import dataclasses
+import datetime
 import logging
-import re
-import time
+import math
+import multiprocessing
+import queue
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, Iterable, List, Optional
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+from urllib.parse import urlsplit
 
-import pandas as pd
+import numpy as np
 import requests
 
-SEARCH_URL = "https://replay.pokemonshowdown.com/search.json"
-REPLAY_URL = "https://replay.pokemonshowdown.com/{replay_id}.json"
+import instrumentation
+from http_client import DEFAULT_RATES, RateLimiter, make_session
+from pokeapi_cache import DAY, MISSING, PokeApiCache
+from replay_archive import ReplayArchive, decode_record
+from replay_index import ReplayIndex
+from replay_parser import parse_replay
+from row_sink import PARQUET_SUFFIXES, open_sink
+from species_names import (  # noqa: F401 - reexportados para los scripts existentes
+    DEFAULT_ALIASES,
+    FALLBACK_SLUGS,
+    SPECIAL_TOKEN_MAP,
+    canonical_slug,
+    load_aliases,
+    save_aliases,
+    showdown_name_to_slug,
+)
+from stat_store import STAT_COLS, StatStore
+
+REPLAY_SERVER = "https://replay.pokemonshowdown.com"
+SEARCH_URL = REPLAY_SERVER + "/search.json"
+REPLAY_URL = REPLAY_SERVER + "/{replay_id}.json"
 POKEAPI_URL = "https://pokeapi.co/api/v2/pokemon/{slug}"
 SPECIES_URL = "https://pokeapi.co/api/v2/pokemon-species/{slug}"
-
-STAT_COLS = ["hp", "attack", "defense", "sp_attack", "sp_defense", "speed"]
-
-# Formas como Ogerpon-Wellspring o Samurott-Hisui aparecen tal cual en los
-# replays; estas reglas ayudan a mapear a los slugs que usa PokéAPI.
-SPECIAL_TOKEN_MAP = {
-    "é": "e",
-    "É": "e",
-    "’": "",
-    "'": "",
-    ".": "",
-}
-
-FALLBACK_SLUGS = {
-    "mimikyu": "mimikyu-disguised",
-    "mimikyu-busted": "mimikyu-busted",
-    "enamorus": "enamorus-incarnate",
-    "landorus": "landorus-incarnate",
-    "tornadus": "tornadus-incarnate",
-    "thundurus": "thundurus-incarnate",
-    "urshifu": "urshifu-single-strike",
-    "maushold": "maushold-family-of-four",
-    "maushold-family-of-three": "maushold-family-of-three",
-    "greninja": "greninja",
-    "ogerpon": "ogerpon",
-    "ogerpon-wellspring": "ogerpon-wellspring-mask",
-    "ogerpon-hearthflame": "ogerpon-hearthflame-mask",
-    "ogerpon-cornerstone": "ogerpon-cornerstone-mask",
-    "ogerpon-teal": "ogerpon-teal-mask",
-    "zamazenta": "zamazenta",
-    "zamazenta-crowned": "zamazenta-crowned",
-}
-
-
-def showdown_name_to_slug(name: str) -> str:
-    slug = name.strip().lower().replace(" ", "-")
-    for src, dst in SPECIAL_TOKEN_MAP.items():
-        slug = slug.replace(src, dst)
-    slug = slug.replace("%", "percent")
-    slug = re.sub(r"[^a-z0-9\-]", "", slug)
-    slug = re.sub(r"-\*$", "", slug)
-    slug = slug.rstrip("-")
-    return slug
+POKEAPI_CACHE = Path("data/pokeapi_cache.sqlite")
 
 
 @dataclasses.dataclass
@@ -85,35 +95,96 @@ class PokemonStats:
     sp_defense: float
     speed: float
 
-    @classmethod
-    def from_row(cls, row: pd.Series) -> "PokemonStats":
-        return cls(
-            name=row["name"],
-            type1=row.get("type1"),
-            type2=row.get("type2"),
-            hp=float(row["hp"]),
-            attack=float(row["attack"]),
-            defense=float(row["defense"]),
-            sp_attack=float(row["sp_attack"]),
-            sp_defense=float(row["sp_defense"]),
-            speed=float(row["speed"]),
-        )
+
+# (tabla de stats, alias de slugs) que se comparte con los procesos worker.
+ResolverSnapshot = Tuple[StatStore, Dict[str, int]]
 
 
 class PokemonStatsResolver:
-    def __init__(self, base_csv: Path, sleep: float = 0.3) -> None:
-        df = pd.read_csv(base_csv)
-        df["name"] = df["name"].str.lower()
-        self._stats: Dict[str, PokemonStats] = {
-            row["name"]: PokemonStats.from_row(row) for _, row in df.iterrows()
-        }
-        self._sleep = sleep
-        self._fetched: Dict[str, PokemonStats] = {}
+    def __init__(
+        self,
+        base_csv: Path,
+        session: Optional[requests.Session] = None,
+        cache: Optional[PokeApiCache] = None,
+    ) -> None:
+        # `base_csv` puede ser el CSV de PokéAPI o una tabla guardada con
+        # `python stat_store.py` (se abre con memory-map).
+        self._store = StatStore.open(base_csv)
+        self._http = session or make_session()
+        self._cache = cache
+        self._offline = False
+        # Slug de Showdown -> ID cuando PokéAPI lo conoce con otro nombre
+        # (variantes resueltas tras un 404).
+        self._aliases: Dict[str, int] = {}
+        # Token crudo de Showdown -> ID, para los nombres ya resueltos.
+        self._names: Dict[str, int] = {}
+        # Sin red (`_offline`) la respuesta no cambia: los nombres que no se
+        # resolvieron no se vuelven a buscar.
+        self._unresolved: Set[str] = set()
         self._species_cache: Dict[str, Dict] = {}
+        # Consultas que fallaron por red/5xx (no por 404): la especie puede
+        # resolverse más adelante, así que el replay no se da por perdido.
+        self.network_errors = 0
+
+    @property
+    def store(self) -> StatStore:
+        return self._store
+
+    def snapshot(self) -> ResolverSnapshot:
+        """Todo lo conocido hasta ahora (base + consultas), para otros procesos."""
+        return self._store, dict(self._aliases)
+
+    @classmethod
+    def from_snapshot(cls, snapshot: ResolverSnapshot) -> "PokemonStatsResolver":
+        """Resolver de solo lectura: no consulta la red ni la caché.
+
+        Lo usan los procesos worker; las especies fuera del snapshot devuelven
+        None y el proceso principal las resuelve por la vía normal.
+        """
+        store, aliases = snapshot
+        resolver = cls.__new__(cls)
+        resolver._store = store
+        resolver._http = None
+        resolver._cache = None
+        resolver._offline = True
+        resolver._aliases = dict(aliases)
+        resolver._names = {}
+        resolver._unresolved = set()
+        resolver._species_cache = {}
+        resolver.network_errors = 0
+        return resolver
+
+    @classmethod
+    def offline(
+        cls,
+        base_csv: Path,
+        cache_path: Optional[Path] = POKEAPI_CACHE,
+        aliases_path: Optional[Path] = DEFAULT_ALIASES,
+    ) -> "PokemonStatsResolver":
+        """Resolver sin red con las mismas fuentes que el scraper.
+
+        Además de `base_csv` consulta la caché de PokéAPI (llenada por el
+        scraper o por `descargar_pokeapi.py --with-species`), sin vencimiento,
+        y precarga la tabla de alias. Así resuelve formas como
+        Ogerpon-Wellspring o Slowking-Galar que no están en la tabla base.
+        """
+        resolver = cls.from_snapshot((StatStore.open(base_csv), {}))
+        if cache_path is not None and Path(cache_path).exists():
+            resolver._cache = PokeApiCache(cache_path, ttl=math.inf, negative_ttl=math.inf)
+        else:
+            logging.warning(
+                "Sin caché de PokéAPI (%s): solo se resuelven las especies de %s "
+                "(descargar_pokeapi.py --with-species la genera)",
+                cache_path,
+                base_csv,
+            )
+        if aliases_path is not None:
+            resolver.preload_aliases(load_aliases(aliases_path))
+        return resolver
 
     def _download_stats(self, slug: str) -> PokemonStats:
         logging.debug("Consultando PokéAPI para %s", slug)
-        resp = requests.get(POKEAPI_URL.format(slug=slug), timeout=20)
+        resp = self._http.get(POKEAPI_URL.format(slug=slug), timeout=20)
         resp.raise_for_status()
         data = resp.json()
         stats_map = {s["stat"]["name"]: s["base_stat"] for s in data["stats"]}
@@ -130,17 +201,58 @@ class PokemonStatsResolver:
         )
         return entry
 
+    def _fetch_stats(self, slug: str) -> Optional[PokemonStats]:
+        """Stats de `slug` vía caché o PokéAPI; None si PokéAPI responde 404."""
+        if self._cache is not None:
+            cached = self._cache.get("pokemon", slug)
+            if cached is not MISSING:
+                instrumentation.incr("resolver.cache_hits")
+                return PokemonStats(**cached) if cached is not None else None
+            instrumentation.incr("resolver.cache_misses")
+        if self._offline:
+            return None
+        try:
+            entry = self._download_stats(slug)
+        except requests.HTTPError as exc:
+            if exc.response is not None and exc.response.status_code == 404:
+                instrumentation.incr("resolver.pokeapi_404")
+                if self._cache is not None:
+                    self._cache.put("pokemon", slug, None)
+                return None
+            raise
+        if self._cache is not None:
+            self._cache.put("pokemon", slug, dataclasses.asdict(entry))
+        return entry
+
     def _load_species(self, slug: str) -> Optional[Dict]:
         if slug in self._species_cache:
             return self._species_cache[slug]
+        if self._cache is not None:
+            cached = self._cache.get("species", slug)
+            if cached is not MISSING:
+                if cached is not None:
+                    self._species_cache[slug] = cached
+                return cached
+        if self._offline:
+            return None
         try:
-            resp = requests.get(SPECIES_URL.format(slug=slug), timeout=20)
+            resp = self._http.get(SPECIES_URL.format(slug=slug), timeout=20)
             resp.raise_for_status()
+        except requests.HTTPError as exc:
+            if exc.response is not None and exc.response.status_code == 404:
+                if self._cache is not None:
+                    self._cache.put("species", slug, None)
+            else:
+                self.network_errors += 1
+            return None
         except requests.RequestException:
+            self.network_errors += 1
             return None
-        data = resp.json()
+        # Solo se usan las variedades; el resto del payload no se guarda.
+        data = {"varieties": resp.json().get("varieties", [])}
         self._species_cache[slug] = data
-        time.sleep(self._sleep)
+        if self._cache is not None:
+            self._cache.put("species", slug, data)
         return data
 
     def _resolve_variant_slug(self, slug: str) -> Optional[str]:
@@ -164,124 +276,281 @@ class PokemonStatsResolver:
         return None
 
     def get(self, showdown_name: str) -> Optional[PokemonStats]:
-        slug = showdown_name_to_slug(showdown_name)
-        slug = FALLBACK_SLUGS.get(slug, slug)
-        if slug in self._stats:
-            return self._stats[slug]
-        if slug in self._fetched:
-            return self._fetched[slug]
-        entry: Optional[PokemonStats] = None
+        species_id = self.resolve_id(showdown_name)
+        if species_id is None:
+            return None
+        stats, (type1, type2) = self._store.row(species_id)
+        return PokemonStats(self._store.slugs[species_id], type1, type2, *map(float, stats))
+
+    def alias_table(self) -> Dict[str, str]:
+        """Tokens de Showdown resueltos -> slug en `store` (para `save_aliases`)."""
+        slugs = self._store.slugs
+        return {name: slugs[species_id] for name, species_id in self._names.items()}
+
+    def preload_aliases(self, aliases: Dict[str, str]) -> int:
+        """Carga una tabla de `load_aliases`; devuelve cuántos alias se usaron.
+
+        Se omiten los slugs que no están en `store` (p. ej. especies que en
+        otra ejecución se agregaron desde PokéAPI): se resuelven por la vía
+        normal, normalmente desde la caché.
+        """
+        loaded = 0
+        for name, slug in aliases.items():
+            species_id = self._store.id_of(slug)
+            if species_id is not None:
+                self._names[name] = species_id
+                loaded += 1
+        return loaded
+
+    def resolve_id(self, showdown_name: str) -> Optional[int]:
+        """ID de la especie en `store`, consultando PokéAPI si hace falta."""
+        species_id = self._names.get(showdown_name)
+        if species_id is None and showdown_name not in self._unresolved:
+            species_id = self._resolve_name(showdown_name)
+            if species_id is not None:
+                self._names[showdown_name] = species_id
+            elif self._offline:
+                self._unresolved.add(showdown_name)
+        return species_id
+
+    def _resolve_name(self, showdown_name: str) -> Optional[int]:
+        slug = canonical_slug(showdown_name)
+        species_id = self._store.id_of(slug)
+        if species_id is None:
+            species_id = self._aliases.get(slug)
+        if species_id is not None or (self._offline and self._cache is None):
+            return species_id
+        instrumentation.incr("resolver.misses")
         try:
-            entry = self._download_stats(slug)
+            entry = self._fetch_stats(slug)
         except requests.HTTPError as exc:
-            if exc.response is not None and exc.response.status_code == 404:
-                variant_slug = self._resolve_variant_slug(slug)
-                if variant_slug and variant_slug != slug:
-                    logging.debug("Reintentando con variante %s para %s", variant_slug, showdown_name)
-                    try:
-                        entry = self._download_stats(variant_slug)
-                        slug = variant_slug
-                    except requests.RequestException as inner_exc:
-                        logging.warning("Variante %s también falló (%s)", variant_slug, inner_exc)
-                        return None
-                else:
-                    logging.warning("No se encontró variante para %s", showdown_name)
-                    return None
-            else:
-                logging.warning("Error HTTP para %s (%s)", showdown_name, exc)
-                return None
+            # `_fetch_stats` ya resolvió los 404: lo que llega aquí es transitorio.
+            logging.warning("Error HTTP para %s (%s)", showdown_name, exc)
+            self.network_errors += 1
+            return None
         except requests.RequestException as exc:
             logging.warning("Error de red al consultar %s (%s)", showdown_name, exc)
+            self.network_errors += 1
             return None
         if entry is None:
+            variant_slug = self._resolve_variant_slug(slug)
+            if not variant_slug or variant_slug == slug:
+                logging.warning("No se encontró variante para %s", showdown_name)
+                return None
+            logging.debug("Reintentando con variante %s para %s", variant_slug, showdown_name)
+            instrumentation.incr("resolver.variant_fallbacks")
+            try:
+                entry = self._fetch_stats(variant_slug)
+            except requests.RequestException as inner_exc:
+                logging.warning("Variante %s también falló (%s)", variant_slug, inner_exc)
+                self.network_errors += 1
+                return None
+            if entry is None:
+                logging.warning("Variante %s también falló (404)", variant_slug)
+                return None
+        species_id = self._store.add(
+            entry.name,
+            [getattr(entry, col) for col in STAT_COLS],
+            entry.type1,
+            entry.type2,
+        )
+        if entry.name != slug:
+            # Se memoriza también bajo el slug original para no repetir el 404.
+            self._aliases[slug] = species_id
+        return species_id
+
+    def team_ids(self, names: Iterable[str]) -> Optional[List[int]]:
+        # Camino rápido: los nombres ya vistos cuestan un acceso al diccionario.
+        known = self._names.get
+        ids = [species_id if (species_id := known(name)) is not None else self.resolve_id(name) for name in names]
+        instrumentation.incr("resolver.lookups", len(ids))
+        if any(species_id is None for species_id in ids):
+            instrumentation.incr("resolver.incomplete_teams")
             return None
-        self._fetched[slug] = entry
-        time.sleep(self._sleep)
-        return entry
+        return ids
 
     def team_stats(self, names: Iterable[str]) -> Optional[Dict[str, float]]:
-        stats = [self.get(name) for name in names]
-        if any(s is None for s in stats):
+        ids = self.team_ids(names)
+        if ids is None:
             return None
+        sums = self._store.stats[ids].sum(axis=0)
+        means = sums / len(ids)
         agg: Dict[str, float] = {}
-        for col in STAT_COLS:
-            values = [getattr(s, col) for s in stats if s is not None]
-            agg[f"sum_{col}"] = float(sum(values))
-            agg[f"mean_{col}"] = float(sum(values) / len(values))
+        for j, col in enumerate(STAT_COLS):
+            agg[f"sum_{col}"] = float(sums[j])
+            agg[f"mean_{col}"] = float(means[j])
         return agg
 
+    def team_stats_batch(self, teams: Sequence[Sequence[str]]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Sumas y medias `(n_equipos, 6)` de un lote de equipos en una sola pasada.
 
-def fetch_replay_ids(format_id: str, max_replays: int, pages: int) -> List[str]:
-    replay_ids: List[str] = []
+        El tercer array marca los equipos con todas sus especies resueltas;
+        las filas de los demás no son válidas.
+        """
+        width = max((len(team) for team in teams), default=0)
+        id_matrix = np.full((len(teams), width), -1, dtype=np.intp)
+        valid = np.ones(len(teams), dtype=bool)
+        for i, team in enumerate(teams):
+            ids = self.team_ids(team)
+            if ids is None:
+                valid[i] = False
+                continue
+            id_matrix[i, : len(ids)] = ids
+        sums, means = self._store.aggregate(id_matrix)
+        return sums, means, valid
+
+
+def iter_replay_ids(
+    format_id: str,
+    max_replays: int,
+    pages: int,
+    session: Optional[requests.Session] = None,
+    search_url: str = SEARCH_URL,
+    index: Optional[ReplayIndex] = None,
+    stop_at_known: bool = True,
+    since: Optional[float] = None,
+    until: Optional[float] = None,
+) -> Iterator[str]:
+    """Recorre el feed de búsqueda página a página y emite IDs a medida que llegan.
+
+    Con `index`, omite los replays ya procesados y deja de paginar en cuanto
+    una página completa es conocida: el feed va de más reciente a más antiguo,
+    así que todo lo que sigue ya se descargó en ejecuciones anteriores.
+    `stop_at_known=False` recorre todas las páginas para rellenar huecos
+    (p. ej. tras una ejecución interrumpida a mitad del paginado).
+
+    `since`/`until` (epoch, `uploadtime`) limitan la ventana `[since, until)`:
+    se saltan los replays más nuevos y se deja de paginar con la primera
+    página completamente anterior a `since`. Las páginas enteras más nuevas
+    que `until` no cuentan para `pages`: así una ventana antigua recorre
+    `pages` páginas dentro de la ventana y no se queda sin presupuesto antes
+    de llegar a ella.
+    """
+    # Sin sesión explícita también se pasa por el limitador y los reintentos.
+    http = session or make_session()
+    emitted = 0
     page = 1
-    while len(replay_ids) < max_replays and page <= pages:
+    counted = 0
+    newer = 0
+    while emitted < max_replays and counted < pages:
         params = {"format": format_id, "page": page}
         logging.debug("Descargando página %s ...", page)
-        resp = requests.get(SEARCH_URL, params=params, timeout=15)
+        with instrumentation.timer("stage.search"):
+            resp = http.get(search_url, params=params, timeout=15)
         resp.raise_for_status()
         payload = resp.json()
         if not payload:
             break
-        for item in payload:
-            if item.get("private"):
+        if since is not None and all(item.get("uploadtime", 0) < since for item in payload):
+            break
+        if until is not None and all(item.get("uploadtime", 0) >= until for item in payload):
+            newer += 1
+            page += 1
+            continue
+        if newer and not counted:
+            logging.info("%d páginas más nuevas que la ventana omitidas; empieza en la página %d", newer, page)
+        counted += 1
+        public_ids = [
+            item["id"]
+            for item in payload
+            if not item.get("private") and _in_window(item.get("uploadtime"), since, until)
+        ]
+        known = index.known(public_ids) if index is not None else set()
+        if stop_at_known and public_ids and len(known) == len(public_ids):
+            logging.info("Página %d ya procesada por completo; fin del paginado incremental", page)
+            break
+        for replay_id in public_ids:
+            if replay_id in known:
                 continue
-            replay_ids.append(item["id"])
-            if len(replay_ids) >= max_replays:
+            yield replay_id
+            emitted += 1
+            if emitted >= max_replays:
                 break
         page += 1
-        time.sleep(0.5)
-    return replay_ids
 
 
-def parse_replay(replay_json: Dict) -> Optional[Dict]:
-    log = replay_json.get("log", "")
-    if not log:
-        return None
-    teams = {"p1": [], "p2": []}
-    players: Dict[str, Dict[str, Optional[float]]] = {}
-    winner_slot: Optional[str] = None
-    winner_name: Optional[str] = None
-    turns = 0
-    for raw_line in log.splitlines():
-        if raw_line.startswith("|player|"):
-            _, _, slot, name, _, rating, *_ = (raw_line + "||||").split("|")
-            rating_value: Optional[float] = None
-            if rating:
-                try:
-                    rating_value = float(rating)
-                except ValueError:
-                    rating_value = None
-            players[slot] = {"name": name, "rating": rating_value}
-        elif raw_line.startswith("|poke|"):
-            parts = raw_line.split("|")
-            if len(parts) < 4:
-                continue
-            slot = parts[2]
-            species_token = parts[3]
-            species = species_token.split(",")[0].strip()
-            if slot in teams and species:
-                if species not in teams[slot]:
-                    teams[slot].append(species)
-        elif raw_line.startswith("|win|"):
-            winner_name = raw_line.split("|")[2]
-        elif raw_line.startswith("|turn|"):
+def _in_window(uploadtime: Optional[float], since: Optional[float], until: Optional[float]) -> bool:
+    if uploadtime is None:
+        return since is None and until is None
+    return (since is None or uploadtime >= since) and (until is None or uploadtime < until)
+
+
+_DONE = object()
+
+
+class ReplayDownloader:
+    """Descarga replays en paralelo con un pool de hilos y una sesión compartida.
+
+    `iter_replays` consume un iterable (posiblemente perezoso) de IDs, de modo
+    que el paginado del feed de búsqueda se solapa con las descargas. Como
+    máximo hay `2 * concurrency` replays en vuelo o esperando a ser consumidos,
+    así la memoria no crece aunque el consumidor sea más lento que la red.
+    """
+
+    def __init__(
+        self,
+        session: requests.Session,
+        concurrency: int = 8,
+        replay_url: str = REPLAY_URL,
+        timeout: float = 15,
+    ) -> None:
+        if concurrency < 1:
+            raise ValueError("concurrency debe ser >= 1")
+        self.session = session
+        self.concurrency = concurrency
+        self.replay_url = replay_url
+        self.timeout = timeout
+
+    def download(self, replay_id: str) -> Optional[Dict]:
+        try:
+            with instrumentation.timer("stage.download"):
+                resp = self.session.get(self.replay_url.format(replay_id=replay_id), timeout=self.timeout)
+                resp.raise_for_status()
+                return resp.json()
+        except (requests.RequestException, ValueError) as exc:
+            logging.warning("No se pudo descargar replay %s: %s", replay_id, exc)
+            instrumentation.incr("replays.download_failed")
+            return None
+
+    def iter_replays(self, replay_ids: Iterable[str]) -> Iterator[Tuple[str, Optional[Dict]]]:
+        """Emite `(replay_id, json)` en orden de llegada (`json` es None si falló)."""
+        results: "queue.Queue" = queue.Queue()
+        slots = threading.Semaphore(2 * self.concurrency)
+        stop = threading.Event()
+        errors: List[BaseException] = []
+
+        def on_done(replay_id: str, future: Future) -> None:
+            results.put((replay_id, future.result()))
+
+        def feeder() -> None:
             try:
-                turns = int(raw_line.split("|")[2])
-            except ValueError:
-                continue
-    if winner_name:
-        for slot, info in players.items():
-            if info["name"] == winner_name:
-                winner_slot = slot
-                break
-    if not teams["p1"] or not teams["p2"] or winner_slot is None:
-        return None
-    return {
-        "teams": teams,
-        "players": players,
-        "winner_slot": winner_slot,
-        "turns": turns,
-    }
+                with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+                    for replay_id in replay_ids:
+                        slots.acquire()
+                        if stop.is_set():
+                            break
+                        future = pool.submit(self.download, replay_id)
+                        future.add_done_callback(lambda f, rid=replay_id: on_done(rid, f))
+            except BaseException as exc:  # noqa: BLE001 - se relanza en el consumidor
+                errors.append(exc)
+            finally:
+                results.put(_DONE)
+
+        thread = threading.Thread(target=feeder, name="replay-feeder", daemon=True)
+        thread.start()
+        try:
+            while True:
+                item = results.get()
+                if item is _DONE:
+                    break
+                slots.release()
+                yield item
+        finally:
+            stop.set()
+            slots.release()
+        thread.join()
+        if errors:
+            raise errors[0]
 
 
 def build_rows(
@@ -328,56 +597,432 @@ def build_rows(
     return rows
 
 
-def main() -> None:
+# Tipos de las columnas de `build_rows`, para backends con esquema (Parquet).
+ROW_DTYPES: Dict[str, str] = {
+    "replay_id": "string",
+    "format_id": "string",
+    "player_slot": "string",
+    "player_name": "string",
+    "opponent_name": "string",
+    "player_rating": "float64",
+    "opponent_rating": "float64",
+    "rating_diff": "float64",
+    "turns": "int64",
+    "team_size": "int64",
+    "team_pokemon": "string",
+    "won_battle": "int64",
+    **{f"{agg}_{col}": "float64" for col in STAT_COLS for agg in ("sum", "mean")},
+}
+
+
+def iter_rows(
+    replays: Iterable[Tuple[str, Optional[Dict]]],
+    resolver: PokemonStatsResolver,
+    archive: Optional[ReplayArchive] = None,
+) -> Iterator[Tuple[str, List[Dict]]]:
+    """Parsea y agrega cada replay en este proceso; emite `(replay_id, filas)`."""
+    for replay_id, replay_json in replays:
+        if replay_json is None:
+            continue
+        if archive is not None:
+            with instrumentation.timer("stage.archive"):
+                archive.put(replay_id, replay_json)
+        with instrumentation.timer("stage.parse"):
+            parsed = parse_replay(replay_json)
+        with instrumentation.timer("stage.build_rows"):
+            rows = build_rows(replay_id, replay_json, parsed, resolver) if parsed else []
+        yield replay_id, rows
+
+
+_worker_resolver: Optional[PokemonStatsResolver] = None
+
+
+def _init_worker(snapshot: ResolverSnapshot) -> None:
+    global _worker_resolver
+    _worker_resolver = PokemonStatsResolver.from_snapshot(snapshot)
+
+
+def _process_record(record: Tuple[str, bytes, int]) -> Tuple[str, List[Dict], bool]:
+    """Worker: decodifica, parsea y agrega un replay archivado.
+
+    Devuelve `(replay_id, filas, faltan_stats)`; `faltan_stats` indica que el
+    replay es válido pero incluye especies fuera de la tabla del worker.
+    """
+    replay_id, payload, codec = record
+    replay_json = decode_record(payload, codec)
+    parsed = parse_replay(replay_json)
+    if not parsed:
+        return replay_id, [], False
+    rows = build_rows(replay_id, replay_json, parsed, _worker_resolver)
+    return replay_id, rows, not rows
+
+
+def _blocks(items: Iterable, size: int) -> Iterator[List]:
+    block: List = []
+    for item in items:
+        block.append(item)
+        if len(block) >= size:
+            yield block
+            block = []
+    if block:
+        yield block
+
+
+def iter_rows_parallel(
+    archive: ReplayArchive,
+    resolver: PokemonStatsResolver,
+    workers: int,
+    chunksize: int = 64,
+) -> Iterator[Tuple[str, List[Dict]]]:
+    """Igual que `iter_rows` sobre un archivo de replays, repartido en procesos.
+
+    Cada worker recibe una copia de solo lectura de la tabla de stats del
+    resolver y los registros comprimidos tal como están en disco, de modo que
+    la descompresión y el JSON también se hacen en paralelo. Los resultados
+    salen en el mismo orden del archivo. Se procesan bloques de
+    `workers * chunksize * 4` replays y solo hay dos en vuelo, así la memoria
+    no depende del tamaño del archivo.
+    """
+    block_size = workers * chunksize * 4
+    with multiprocessing.Pool(workers, initializer=_init_worker, initargs=(resolver.snapshot(),)) as pool:
+        in_flight = None
+        for block in _blocks(archive.iter_raw(), block_size):
+            job = pool.map_async(_process_record, block, chunksize)
+            if in_flight is not None:
+                yield from _finish_block(in_flight.get(), archive, resolver)
+            in_flight = job
+        if in_flight is not None:
+            yield from _finish_block(in_flight.get(), archive, resolver)
+
+
+def _finish_block(
+    results: List[Tuple[str, List[Dict], bool]],
+    archive: ReplayArchive,
+    resolver: PokemonStatsResolver,
+) -> Iterator[Tuple[str, List[Dict]]]:
+    for replay_id, rows, missing_stats in results:
+        if missing_stats:
+            # Especie no vista por los workers: se resuelve aquí (caché/PokéAPI).
+            instrumentation.incr("replays.resolved_in_parent")
+            replay_json = archive.get(replay_id)
+            rows = build_rows(replay_id, replay_json, parse_replay(replay_json), resolver)
+        yield replay_id, rows
+
+
+def _epoch(day: Optional[str]) -> Optional[float]:
+    """`AAAA-MM-DD` (UTC) a epoch; None se mantiene."""
+    if day is None:
+        return None
+    return datetime.datetime.strptime(day, "%Y-%m-%d").replace(tzinfo=datetime.timezone.utc).timestamp()
+
+
+def download_replays(
+    args: argparse.Namespace,
+    session: requests.Session,
+    server: str,
+    index: Optional[ReplayIndex],
+) -> Iterator[Tuple[str, Optional[Dict]]]:
+    """Pagina el feed de búsqueda y descarga los replays en paralelo."""
+    replay_ids = iter_replay_ids(
+        args.format,
+        args.max_replays,
+        args.pages,
+        session=session,
+        search_url=server + "/search.json",
+        index=index,
+        stop_at_known=not args.backfill,
+        since=_epoch(args.since),
+        until=_epoch(args.until),
+    )
+    downloader = ReplayDownloader(
+        session,
+        concurrency=args.concurrency,
+        replay_url=server + "/{replay_id}.json",
+    )
+    logging.info(
+        "Se intentará procesar hasta %d replays del formato %s (%d descargas simultáneas)",
+        args.max_replays,
+        args.format,
+        args.concurrency,
+    )
+    return downloader.iter_replays(replay_ids)
+
+
+def build_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(description="Scraper de replays de Showdown")
     parser.add_argument("--format", default="gen9ou", help="Formato (ej. gen9ou)")
     parser.add_argument("--pages", type=int, default=25, help="Páginas del feed search a recorrer")
     parser.add_argument("--max-replays", type=int, default=400, help="Máximo de replays a descargar")
+    parser.add_argument("--since", help="Solo replays subidos desde esta fecha (AAAA-MM-DD, UTC)")
+    parser.add_argument("--until", help="Solo replays subidos antes de esta fecha (AAAA-MM-DD, UTC)")
     parser.add_argument(
         "--base-stats",
         type=Path,
         default=Path("data/pokemon_base_pokeapi.csv"),
-        help="CSV con stats base descargados de PokéAPI",
+        help="CSV con stats base de PokéAPI o directorio generado con stat_store.py",
     )
     parser.add_argument(
         "--output",
         type=Path,
         default=Path("data/pokemon_showdown_teams.csv"),
-        help="Archivo de salida con features agregadas",
+        help="Archivo de salida con features agregadas (.csv o .parquet)",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=1000,
+        help="Filas por lote escrito a disco (row group en Parquet)",
+    )
+    parser.add_argument(
+        "--flush-interval",
+        type=float,
+        default=30.0,
+        help="Segundos máximos entre escrituras a disco",
+    )
+    parser.add_argument(
+        "--aliases",
+        type=Path,
+        default=DEFAULT_ALIASES,
+        help="Tabla de alias de nombres de especie (se precarga y se actualiza al terminar)",
+    )
+    parser.add_argument(
+        "--cache",
+        type=Path,
+        default=POKEAPI_CACHE,
+        help="Caché SQLite persistente para consultas a PokéAPI",
     )
+    parser.add_argument("--no-cache", action="store_true", help="Desactiva la caché de PokéAPI")
+    parser.add_argument(
+        "--cache-ttl-days",
+        type=float,
+        default=30,
+        help="Días de validez de las entradas de la caché",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=8,
+        help="Descargas de replays simultáneas",
+    )
+    parser.add_argument(
+        "--rate",
+        type=float,
+        default=DEFAULT_RATES["replay.pokemonshowdown.com"],
+        help="Peticiones por segundo máximas al servidor de replays",
+    )
+    parser.add_argument(
+        "--replay-server",
+        default=REPLAY_SERVER,
+        help="URL base del servidor de replays (útil para pruebas con un servidor local)",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Agrega solo replays nuevos a --output usando el índice de replays vistos",
+    )
+    parser.add_argument(
+        "--index",
+        type=Path,
+        default=Path("data/replay_index.sqlite"),
+        help="Índice SQLite de replays ya procesados (modo --incremental)",
+    )
+    parser.add_argument(
+        "--backfill",
+        action="store_true",
+        help="En modo incremental, no cortar el paginado en la primera página ya conocida",
+    )
+    parser.add_argument(
+        "--archive",
+        type=Path,
+        help="Directorio donde archivar el JSON crudo de cada replay descargado",
+    )
+    parser.add_argument(
+        "--from-archive",
+        action="store_true",
+        help="Reconstruye el dataset desde --archive sin descargar replays",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Procesos para parsear y agregar replays en --from-archive",
+    )
+    parser.add_argument(
+        "--metrics",
+        action="store_true",
+        help="Mide tiempos por etapa, latencias HTTP y contadores; resumen al final",
+    )
+    parser.add_argument("--metrics-json", type=Path, help="Guarda las métricas en JSON (implica --metrics)")
+    parser.add_argument(
+        "--metrics-prom",
+        type=Path,
+        help="Guarda las métricas en formato de texto de Prometheus (implica --metrics)",
+    )
+    parser.add_argument(
+        "--profile",
+        choices=instrumentation.PROFILERS,
+        help="Perfila la ejecución con cProfile o pyinstrument",
+    )
+    parser.add_argument("--profile-output", type=Path, help="Archivo del perfil (profile.prof / profile.html)")
     parser.add_argument("--log-level", default="INFO")
+    return parser
+
+
+def check_args(parser: argparse.ArgumentParser, args: argparse.Namespace) -> None:
+    """Combinaciones de opciones inválidas (termina con `parser.error`)."""
+    if args.incremental and args.output.suffix.lower() in PARQUET_SUFFIXES:
+        parser.error("--incremental requiere salida CSV (Parquet no admite agregar filas)")
+    if args.from_archive and (args.archive is None or args.incremental):
+        parser.error("--from-archive requiere --archive y no se combina con --incremental")
+    for day in (args.since, args.until):
+        try:
+            _epoch(day)
+        except ValueError:
+            parser.error(f"fecha inválida: {day} (formato AAAA-MM-DD)")
+
+
+def main() -> None:
+    parser = build_parser()
     args = parser.parse_args()
 
     logging.basicConfig(level=getattr(logging, args.log_level.upper()))
-    resolver = PokemonStatsResolver(args.base_stats)
-    replay_ids = fetch_replay_ids(args.format, args.max_replays, args.pages)
-    logging.info("Se intentará procesar %d replays del formato %s", len(replay_ids), args.format)
+    check_args(parser, args)
 
-    all_rows: List[Dict] = []
-    for idx, replay_id in enumerate(replay_ids, start=1):
-        try:
-            resp = requests.get(REPLAY_URL.format(replay_id=replay_id), timeout=15)
-            resp.raise_for_status()
-        except Exception as exc:  # noqa: BLE001
-            logging.warning("No se pudo descargar replay %s: %s", replay_id, exc)
-            continue
-        replay_json = resp.json()
-        parsed = parse_replay(replay_json)
-        if not parsed:
-            continue
-        rows = build_rows(replay_id, replay_json, parsed, resolver)
-        all_rows.extend(rows)
-        if idx % 25 == 0:
-            logging.info("Procesados %d/%d replays", idx, len(replay_ids))
-        time.sleep(0.2)
-
-    if not all_rows:
-        logging.error("No se generaron filas; revisar filtros o formato.")
-        return
-    df = pd.DataFrame(all_rows)
-    args.output.parent.mkdir(parents=True, exist_ok=True)
-    df.to_csv(args.output, index=False)
-    logging.info("Dataset guardado en %s (%d filas)", args.output, len(df))
+    recorder = None
+    if args.metrics or args.metrics_json or args.metrics_prom:
+        recorder = instrumentation.enable()
+    try:
+        with instrumentation.profiling(args.profile, args.profile_output):
+            run(args)
+    finally:
+        if recorder is not None:
+            logging.info("%s", recorder.format_summary())
+            if args.metrics_json:
+                recorder.to_json(args.metrics_json)
+            if args.metrics_prom:
+                args.metrics_prom.write_text(recorder.to_prometheus(), encoding="utf-8")
+
+
+@dataclasses.dataclass
+class RunResult:
+    replays: int = 0
+    rows: int = 0
+
+
+def make_run_session(args: argparse.Namespace) -> requests.Session:
+    server = args.replay_server.rstrip("/")
+    limiter = RateLimiter({**DEFAULT_RATES, urlsplit(server).hostname or "": args.rate})
+    return make_session(pool_size=args.concurrency + 1, limiter=limiter)
+
+
+def make_resolver(args: argparse.Namespace, session: Optional[requests.Session] = None) -> PokemonStatsResolver:
+    cache = None
+    if not args.no_cache:
+        cache = PokeApiCache(args.cache, ttl=args.cache_ttl_days * DAY)
+    return PokemonStatsResolver(args.base_stats, session=session, cache=cache)
+
+
+def run(
+    args: argparse.Namespace,
+    session: Optional[requests.Session] = None,
+    resolver: Optional[PokemonStatsResolver] = None,
+) -> RunResult:
+    """Descarga (o reconstruye desde el archivo) y escribe el dataset.
+
+    `session` y `resolver` permiten reutilizarlos entre ejecuciones del mismo
+    proceso (p. ej. los workers de `scrape_sharded.py`, un shard tras otro).
+    """
+    server = args.replay_server.rstrip("/")
+    session = session or make_run_session(args)
+    resolver = resolver or make_resolver(args, session)
+    known_aliases = load_aliases(args.aliases)
+    if known_aliases:
+        logging.info("Alias de especies precargados: %d", resolver.preload_aliases(known_aliases))
+    archive = ReplayArchive(args.archive) if args.archive is not None else None
+    index = None
+    if args.incremental:
+        index = ReplayIndex(args.index)
+        synced = index.sync_with_csv(args.output)
+        if synced:
+            logging.info("Índice sincronizado con %s (%d replays nuevos)", args.output, synced)
+        logging.info("Modo incremental: %d replays ya conocidos", len(index))
+    if args.from_archive:
+        logging.info(
+            "Reconstruyendo desde %s (%d replays archivados, %d procesos)",
+            args.archive,
+            len(archive),
+            args.workers,
+        )
+        if args.workers > 1:
+            results = iter_rows_parallel(archive, resolver, args.workers)
+        else:
+            results = iter_rows(archive.iter_replays(), resolver)
+    else:
+        results = iter_rows(download_replays(args, session, server, index), resolver, archive)
+
+    # En modo incremental los replays se marcan en el índice solo después de
+    # que sus filas llegan a disco; si el proceso cae antes, sync_with_csv los
+    # recupera al reiniciar. Los que quedaron sin filas por un error de red
+    # al resolver especies no se marcan: se reintentan en la próxima ejecución.
+    pending: Dict[str, List[str]] = {"ok": [], "skipped": []}
+
+    def mark_flushed() -> None:
+        if index is None:
+            return
+        for status, ids in pending.items():
+            if ids:
+                index.add_many(ids, status)
+                ids.clear()
+
+    sink = open_sink(
+        args.output,
+        dtypes=ROW_DTYPES,
+        batch_size=args.batch_size,
+        flush_interval=args.flush_interval,
+        append=args.incremental,
+        on_flush=mark_flushed,
+    )
+    result = RunResult()
+    # Las filas se generan en este hilo, una replay a la vez: si el contador
+    # cambió entre dos replays, el último tuvo algún fallo de red.
+    network_errors = resolver.network_errors
+    with sink:
+        for idx, (replay_id, rows) in enumerate(results, start=1):
+            if idx % 25 == 0:
+                logging.info("Procesados %d replays (%d filas escritas)", idx, sink.rows_written)
+            instrumentation.incr("replays.processed")
+            if rows:
+                pending["ok"].append(replay_id)
+            elif resolver.network_errors != network_errors:
+                instrumentation.incr("replays.network_skipped")
+                logging.info("Sin filas para %s por errores de red; se reintentará", replay_id)
+            else:
+                pending["skipped"].append(replay_id)
+                instrumentation.incr("replays.skipped")
+            network_errors = resolver.network_errors
+            with instrumentation.timer("stage.write"):
+                sink.write(rows)
+            result.replays = idx
+        sink.flush()
+        result.rows = sink.rows_written
+        aliases = {**known_aliases, **resolver.alias_table()}
+        if aliases != known_aliases:
+            # La tabla es solo un atajo: si no se puede guardar, las filas
+            # ya escritas siguen valiendo.
+            try:
+                save_aliases(args.aliases, aliases)
+            except OSError as exc:
+                logging.warning("No se pudo guardar la tabla de alias en %s (%s)", args.aliases, exc)
+        if sink.rows_written == 0 and not args.incremental:
+            logging.error("No se generaron filas; revisar filtros o formato.")
+            sink.abort()
+            return result
+
+    if args.incremental:
+        logging.info("Agregadas %d filas nuevas a %s", sink.rows_written, args.output)
+    else:
+        logging.info("Dataset guardado en %s (%d filas)", args.output, sink.rows_written)
+    return result
 
 
 if __name__ == "__main__":
@@ -0,0 +1,162 @@
+"""
+Normalización de nombres de especie de Showdown a slugs de PokéAPI.
+
+`showdown_name_to_slug` aplica en una sola pasada una tabla de traducción
+precompilada (`str.translate`) y una regex compilada, con memo acotado
+(`lru_cache`): en un scrape los nombres se repiten miles de veces.
+`canonical_slug` agrega las correcciones de `FALLBACK_SLUGS`.
+
+La tabla de alias (`data/species_aliases.json`) guarda, para cada token
+crudo de Showdown ya resuelto, el slug de la tabla de stats al que
+corresponde (incluidas las formas resueltas por variedad tras un 404). El
+resolver del scraper la precarga al arrancar (`--aliases`), así esos nombres
+se resuelven con un acceso a diccionario desde la primera vez, y la guarda
+al terminar con lo aprendido en la ejecución. Varios procesos pueden
+guardarla a la vez (p. ej. los workers de `scrape_sharded.py`): cada
+escritura relee el archivo bajo un lock y agrega lo suyo.
+
+Para resolver de antemano todos los nombres de un dataset (usa la caché de
+PokéAPI y, si falta algo, la red):
+    python species_names.py data/pokemon_showdown_teams_clean.csv --output data/species_aliases.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import functools
+import json
+import logging
+import os
+import re
+import tempfile
+from pathlib import Path
+from typing import Dict, Iterator
+
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows: sin lock entre procesos
+    fcntl = None
+
+DEFAULT_ALIASES = Path("data/species_aliases.json")
+
+# Formas como Ogerpon-Wellspring o Samurott-Hisui aparecen tal cual en los
+# replays; estas reglas ayudan a mapear a los slugs que usa PokéAPI.
+SPECIAL_TOKEN_MAP = {
+    "é": "e",
+    "É": "e",
+    "’": "",
+    "'": "",
+    ".": "",
+}
+
+FALLBACK_SLUGS = {
+    "mimikyu": "mimikyu-disguised",
+    "mimikyu-busted": "mimikyu-busted",
+    "enamorus": "enamorus-incarnate",
+    "landorus": "landorus-incarnate",
+    "tornadus": "tornadus-incarnate",
+    "thundurus": "thundurus-incarnate",
+    "urshifu": "urshifu-single-strike",
+    "maushold": "maushold-family-of-four",
+    "maushold-family-of-three": "maushold-family-of-three",
+    "greninja": "greninja",
+    "ogerpon": "ogerpon",
+    "ogerpon-wellspring": "ogerpon-wellspring-mask",
+    "ogerpon-hearthflame": "ogerpon-hearthflame-mask",
+    "ogerpon-cornerstone": "ogerpon-cornerstone-mask",
+    "ogerpon-teal": "ogerpon-teal-mask",
+    "zamazenta": "zamazenta",
+    "zamazenta-crowned": "zamazenta-crowned",
+}
+
+# Ningún reemplazo produce un carácter que otro reemplace, así que una sola
+# pasada equivale a los `str.replace` encadenados (espacios, SPECIAL_TOKEN_MAP, %).
+_TRANSLATION = str.maketrans({" ": "-", **SPECIAL_TOKEN_MAP, "%": "percent"})
+# Elimina también `*`, así que un `-*` final queda como `-` y lo quita rstrip.
+_INVALID_CHARS = re.compile(r"[^a-z0-9\-]")
+
+SLUG_CACHE_SIZE = 8192
+
+
+@functools.lru_cache(maxsize=SLUG_CACHE_SIZE)
+def showdown_name_to_slug(name: str) -> str:
+    slug = name.strip().lower().translate(_TRANSLATION)
+    return _INVALID_CHARS.sub("", slug).rstrip("-")
+
+
+def canonical_slug(name: str) -> str:
+    """Slug de PokéAPI para un nombre de Showdown, con `FALLBACK_SLUGS` aplicado."""
+    slug = showdown_name_to_slug(name)
+    return FALLBACK_SLUGS.get(slug, slug)
+
+
+def load_aliases(path: Path) -> Dict[str, str]:
+    """Token de Showdown -> slug de la tabla de stats; vacío si no existe."""
+    path = Path(path)
+    if not path.exists():
+        return {}
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+@contextlib.contextmanager
+def _locked(path: Path) -> Iterator[None]:
+    """Lock exclusivo entre procesos sobre `<path>.lock` (no-op sin `fcntl`)."""
+    if fcntl is None:
+        yield
+        return
+    with open(path.with_name(path.name + ".lock"), "a") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def save_aliases(path: Path, aliases: Dict[str, str]) -> None:
+    """Agrega `aliases` a la tabla de `path` y la reescribe de forma atómica.
+
+    Se relee el archivo bajo el lock, así no se pierde lo que otro proceso
+    guardó entre medio; el temporal tiene nombre único en el mismo directorio.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with _locked(path):
+        merged = {**load_aliases(path), **aliases}
+        with tempfile.NamedTemporaryFile(
+            "w", encoding="utf-8", dir=path.parent, prefix=path.name + ".", suffix=".tmp", delete=False
+        ) as tmp:
+            json.dump(dict(sorted(merged.items())), tmp, indent=2, ensure_ascii=False)
+        try:
+            os.replace(tmp.name, path)
+        except BaseException:
+            os.unlink(tmp.name)
+            raise
+
+
+def main() -> None:
+    from pokeapi_cache import DAY, PokeApiCache
+    from scrape_showdown_replays import PokemonStatsResolver
+
+    parser = argparse.ArgumentParser(description="Resuelve de antemano los nombres de especie de un dataset")
+    parser.add_argument("teams", type=Path, help="CSV con la columna team_pokemon")
+    parser.add_argument("--base-stats", type=Path, default=Path("data/pokemon_base_pokeapi.csv"))
+    parser.add_argument("--cache", type=Path, default=Path("data/pokeapi_cache.sqlite"))
+    parser.add_argument("--cache-ttl-days", type=float, default=30)
+    parser.add_argument("--output", type=Path, default=DEFAULT_ALIASES)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(message)s")
+
+    names = pd.read_csv(args.teams, usecols=["team_pokemon"])["team_pokemon"].dropna().str.split(",").explode()
+    resolver = PokemonStatsResolver(args.base_stats, cache=PokeApiCache(args.cache, ttl=args.cache_ttl_days * DAY))
+    resolver.preload_aliases(load_aliases(args.output))
+    unresolved = sorted(name for name in names.unique() if resolver.resolve_id(name) is None)
+    aliases = resolver.alias_table()
+    save_aliases(args.output, aliases)
+    print(f"{len(aliases)} alias guardados en {args.output}; sin resolver: {', '.join(unresolved) or 'ninguno'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+"""
+Tabla compacta de stats base por especie, respaldada por arrays de NumPy.
+
+Cada especie (slug de PokéAPI) recibe un ID entero; sus seis stats base viven
+en una matriz contigua `(n_especies, 6)` y sus tipos en `(n_especies, 2)` como
+códigos de `TYPE_NAMES` (-1 = sin tipo). Así, sumar o promediar las stats de
+un lote entero de equipos es un único gather + reducción sobre una matriz de
+IDs, sin objetos por especie.
+
+La tabla se puede guardar en un directorio (`stats.npy`, `types.npy`,
+`slugs.json`) y reabrir con memory-map:
+    python stat_store.py data/pokemon_base_pokeapi.csv data/stat_store
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+STAT_COLS = ["hp", "attack", "defense", "sp_attack", "sp_defense", "speed"]
+
+TYPE_NAMES = (
+    "normal", "fire", "water", "electric", "grass", "ice",
+    "fighting", "poison", "ground", "flying", "psychic", "bug",
+    "rock", "ghost", "dragon", "dark", "steel", "fairy",
+)
+TYPE_CODES: Dict[str, int] = {name: code for code, name in enumerate(TYPE_NAMES)}
+NO_TYPE = -1
+
+
+def type_code(name: Optional[str]) -> int:
+    if not isinstance(name, str):
+        return NO_TYPE
+    return TYPE_CODES.get(name.lower(), NO_TYPE)
+
+
+def type_name(code: int) -> Optional[str]:
+    return TYPE_NAMES[code] if code >= 0 else None
+
+
+class StatStore:
+    """Índice slug -> ID más las matrices de stats y tipos."""
+
+    def __init__(self, slugs: Sequence[str], stats: np.ndarray, types: np.ndarray) -> None:
+        if len(slugs) != len(stats) or len(slugs) != len(types):
+            raise ValueError("slugs, stats y types deben tener el mismo largo")
+        self.slugs: List[str] = list(slugs)
+        # Ante slugs repetidos gana la última aparición, como con un dict.
+        self.ids: Dict[str, int] = {slug: i for i, slug in enumerate(self.slugs)}
+        self._stats = np.asarray(stats, dtype=np.float64)
+        self._types = np.asarray(types, dtype=np.int8)
+        self._size = len(self.slugs)
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> "StatStore":
+        slugs = df["name"].str.lower().tolist()
+        stats = df[STAT_COLS].to_numpy(dtype=np.float64)
+        types = np.full((len(df), 2), NO_TYPE, dtype=np.int8)
+        for j, col in enumerate(("type1", "type2")):
+            if col in df:
+                types[:, j] = df[col].map(type_code).to_numpy(dtype=np.int8)
+        return cls(slugs, stats, types)
+
+    @classmethod
+    def from_csv(cls, path: Union[str, Path]) -> "StatStore":
+        return cls.from_frame(pd.read_csv(path))
+
+    @classmethod
+    def open(cls, path: Union[str, Path], mmap: bool = True) -> "StatStore":
+        """Abre un CSV de PokéAPI o un directorio guardado con `save`."""
+        path = Path(path)
+        if path.is_dir():
+            return cls.load(path, mmap=mmap)
+        return cls.from_csv(path)
+
+    # -- consultas -----------------------------------------------------------
+
+    @property
+    def stats(self) -> np.ndarray:
+        return self._stats[: self._size]
+
+    @property
+    def types(self) -> np.ndarray:
+        return self._types[: self._size]
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __contains__(self, slug: str) -> bool:
+        return slug in self.ids
+
+    def id_of(self, slug: str) -> Optional[int]:
+        return self.ids.get(slug)
+
+    def row(self, species_id: int) -> Tuple[np.ndarray, Tuple[Optional[str], Optional[str]]]:
+        t1, t2 = self._types[species_id]
+        return self._stats[species_id], (type_name(int(t1)), type_name(int(t2)))
+
+    def aggregate(self, id_matrix: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Suma y media de stats por equipo.
+
+        `id_matrix` es `(n_equipos, k)`; los huecos (equipos con menos de `k`
+        miembros) se rellenan con -1 y no cuentan. Devuelve dos arrays
+        `(n_equipos, 6)` en el orden de `STAT_COLS`.
+        """
+        ids = np.asarray(id_matrix, dtype=np.intp)
+        mask = ids >= 0
+        gathered = self.stats[np.where(mask, ids, 0)]
+        gathered[~mask] = 0.0
+        sums = gathered.sum(axis=1)
+        counts = mask.sum(axis=1, keepdims=True)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            means = sums / counts
+        return sums, means
+
+    # -- altas ---------------------------------------------------------------
+
+    def add(self, slug: str, stats: Sequence[float], type1: Optional[str], type2: Optional[str]) -> int:
+        """Agrega (o reemplaza) una especie y devuelve su ID."""
+        if not self._stats.flags.writeable:
+            # Tabla abierta con memory-map de solo lectura: se copia a memoria.
+            self._stats = np.array(self._stats)
+            self._types = np.array(self._types)
+        existing = self.ids.get(slug)
+        if existing is not None:
+            species_id = existing
+        else:
+            if self._size == len(self._stats):
+                capacity = max(16, 2 * len(self._stats))
+                self._stats = np.concatenate([self.stats, np.zeros((capacity - self._size, len(STAT_COLS)))])
+                self._types = np.concatenate([self.types, np.full((capacity - self._size, 2), NO_TYPE, np.int8)])
+            species_id = self._size
+            self._size += 1
+            self.slugs.append(slug)
+            self.ids[slug] = species_id
+        self._stats[species_id] = stats
+        self._types[species_id] = (type_code(type1), type_code(type2))
+        return species_id
+
+    # -- persistencia --------------------------------------------------------
+
+    def save(self, directory: Union[str, Path]) -> None:
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        np.save(directory / "stats.npy", np.ascontiguousarray(self.stats))
+        np.save(directory / "types.npy", np.ascontiguousarray(self.types))
+        (directory / "slugs.json").write_text(json.dumps(self.slugs), encoding="utf-8")
+
+    @classmethod
+    def load(cls, directory: Union[str, Path], mmap: bool = True) -> "StatStore":
+        directory = Path(directory)
+        mode = "r" if mmap else None
+        stats = np.load(directory / "stats.npy", mmap_mode=mode)
+        types = np.load(directory / "types.npy", mmap_mode=mode)
+        slugs = json.loads((directory / "slugs.json").read_text(encoding="utf-8"))
+        store = cls.__new__(cls)
+        store.slugs = slugs
+        store.ids = {slug: i for i, slug in enumerate(slugs)}
+        store._stats = stats
+        store._types = types
+        store._size = len(slugs)
+        return store
+
+    def __getstate__(self) -> Dict:
+        # Al enviarse a otros procesos solo viajan las filas usadas.
+        return {"slugs": self.slugs, "stats": np.array(self.stats), "types": np.array(self.types)}
+
+    def __setstate__(self, state: Dict) -> None:
+        self.__init__(state["slugs"], state["stats"], state["types"])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Convierte el CSV de PokéAPI en una tabla .npy")
+    parser.add_argument("base_csv", type=Path)
+    parser.add_argument("output_dir", type=Path)
+    args = parser.parse_args()
+    store = StatStore.from_csv(args.base_csv)
+    store.save(args.output_dir)
+    print(f"Guardadas {len(store)} especies en {args.output_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,265 @@
+"""
+Composición de equipos como matrices dispersas (CSR).
+
+En lugar de un one-hot denso de los N Pokémon más usados (triplicado luego en
+`_self`/`_opp`/`_diff`), cada equipo es una fila CSR con un 1 en la columna
+de cada especie. Las columnas son los IDs de `StatStore` que asigna el
+resolver del scraper (columna = ID); el resolver es el mismo, sin red, que
+usa `scoring_service.py` (tabla base + caché de PokéAPI + alias), así que
+las variedades descargadas tienen ID propio. La memoria crece con el tamaño
+de los equipos (≤ 6 valores por fila), no con la cantidad de especies.
+
+Las columnas se fijan con `TeamEncoder.fit`: cada especie que no se pudo
+resolver tiene su propia columna (`pk_unknown_<slug>`, ordenadas por slug),
+así dos desconocidas no se confunden ni se cancelan en el modo `diff`, y
+las que aparezcan después del ajuste van a `pk_unknown_other`. Con
+`TeamEncoder.vocabulary` se guarda el mapeo para repetirlo al predecir.
+
+Para el dataset comparativo hay dos modos para el bloque de equipos:
+- `diff`:     equipo propio - equipo rival (+1 propio, -1 rival, 0 si ambos)
+- `self_opp`: ambos equipos lado a lado (doble de columnas, sin expandir)
+
+LightGBM y LogisticRegression aceptan la matriz CSR resultante tal cual.
+
+Uso (desde Proyecto3):
+    python team_encoding.py --mode diff
+"""
+
+from __future__ import annotations
+
+import argparse
+import dataclasses
+import logging
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+from pairwise_features import ID_COL, META_COLS, build_pairwise, paired_rows
+from scrape_showdown_replays import POKEAPI_CACHE, PokemonStatsResolver
+from species_names import DEFAULT_ALIASES, canonical_slug
+
+PAIR_MODES = ("diff", "self_opp")
+
+
+class TeamEncoder:
+    """Traduce equipos (nombres de Showdown) a filas CSR por ID de especie.
+
+    Columnas tras `fit`: los IDs que había en la tabla, una por especie sin ID
+    vista en el ajuste y una última para las desconocidas nuevas. No cambian
+    aunque la tabla crezca después (resolver con red) ni con el orden de filas.
+    """
+
+    def __init__(self, resolver: PokemonStatsResolver, vocabulary: Optional[Dict] = None) -> None:
+        self.resolver = resolver
+        self._ids: Dict[str, Optional[int]] = {}
+        self._columns: Dict[str, int] = {}
+        self._n_species: Optional[int] = None
+        # Slug sin ID -> posición en el bloque de especies desconocidas.
+        self._unknown: Dict[str, int] = {}
+        if vocabulary is not None:
+            self._freeze(vocabulary["n_species"], vocabulary["unknown"])
+
+    @classmethod
+    def from_base_stats(
+        cls,
+        base_stats: Path,
+        pokeapi_cache: Optional[Path] = POKEAPI_CACHE,
+        aliases: Optional[Path] = DEFAULT_ALIASES,
+    ) -> "TeamEncoder":
+        """Encoder sin red (ver `PokemonStatsResolver.offline`)."""
+        return cls(PokemonStatsResolver.offline(base_stats, pokeapi_cache, aliases))
+
+    @property
+    def fitted(self) -> bool:
+        return self._n_species is not None
+
+    @property
+    def vocabulary(self) -> Dict:
+        """Lo necesario para reconstruir las mismas columnas (serializable a JSON)."""
+        self._check_fitted()
+        return {"n_species": self._n_species, "unknown": list(self._unknown)}
+
+    @property
+    def n_columns(self) -> int:
+        self._check_fitted()
+        return self._n_species + len(self._unknown) + 1
+
+    def _check_fitted(self) -> None:
+        if self._n_species is None:
+            raise RuntimeError("TeamEncoder sin ajustar: llamar antes a fit()")
+
+    def _freeze(self, n_species: int, unknown: Sequence[str]) -> None:
+        self._n_species = n_species
+        self._unknown = {slug: k for k, slug in enumerate(unknown)}
+        self._columns = {}
+
+    def _species_id(self, name: str) -> Optional[int]:
+        if name not in self._ids:
+            self._ids[name] = self.resolver.resolve_id(name)
+        return self._ids[name]
+
+    def fit(self, teams: Iterable[Sequence[str]]) -> "TeamEncoder":
+        """Fija las columnas con las especies de `teams`."""
+        unknown = {canonical_slug(name) for team in teams for name in team if self._species_id(name) is None}
+        self._freeze(len(self.resolver.store), sorted(unknown))
+        return self
+
+    def species_column(self, name: str) -> int:
+        column = self._columns.get(name)
+        if column is None:
+            self._check_fitted()
+            species_id = self._species_id(name)
+            if species_id is not None and species_id < self._n_species:
+                column = species_id
+            else:
+                # Sin ID al ajustar: su columna propia o, si es nueva, la última.
+                column = self._n_species + self._unknown.get(canonical_slug(name), len(self._unknown))
+            self._columns[name] = column
+        return column
+
+    def unknown_species(self) -> List[str]:
+        """Nombres vistos hasta ahora que no tienen ID en la tabla."""
+        return sorted(name for name, species_id in self._ids.items() if species_id is None)
+
+    def transform(self, teams: Iterable[Sequence[str]]) -> sp.csr_matrix:
+        """Matriz `(n_equipos, n_columns)` de pertenencia (0/1)."""
+        self._check_fitted()
+        indptr = [0]
+        indices: List[int] = []
+        for team in teams:
+            indices.extend(sorted({self.species_column(name) for name in team}))
+            indptr.append(len(indices))
+        data = np.ones(len(indices), dtype=np.float32)
+        return sp.csr_matrix(
+            (data, np.asarray(indices, dtype=np.int32), np.asarray(indptr, dtype=np.int64)),
+            shape=(len(indptr) - 1, self.n_columns),
+        )
+
+    def fit_transform(self, teams: Sequence[Sequence[str]]) -> sp.csr_matrix:
+        return self.fit(teams).transform(teams)
+
+    def feature_names(self, suffix: str = "") -> List[str]:
+        self._check_fitted()
+        slugs = (
+            self.resolver.store.slugs[: self._n_species]
+            + [f"unknown_{slug}" for slug in self._unknown]
+            + ["unknown_other"]
+        )
+        return [f"pk_{slug.replace('-', '_')}{suffix}" for slug in slugs]
+
+
+def pair_team_block(team_matrix: sp.csr_matrix, mode: str = "diff") -> sp.csr_matrix:
+    """Bloque de equipos del dataset comparativo.
+
+    `team_matrix` debe venir en el orden de `paired_rows`: el rival de la fila
+    `i` es la fila `i ^ 1`.
+    """
+    if mode not in PAIR_MODES:
+        raise ValueError(f"Modo desconocido: {mode} (opciones: {', '.join(PAIR_MODES)})")
+    opponent = np.arange(team_matrix.shape[0]) ^ 1
+    opp_matrix = team_matrix[opponent]
+    if mode == "self_opp":
+        return sp.hstack([team_matrix, opp_matrix], format="csr")
+    block = (team_matrix - opp_matrix).tocsr()
+    block.eliminate_zeros()
+    return block
+
+
+@dataclasses.dataclass
+class SparseDataset:
+    X: sp.csr_matrix
+    y: np.ndarray
+    feature_names: List[str]
+    replay_ids: np.ndarray
+
+
+def build_sparse_pairwise(
+    df: pd.DataFrame,
+    base_cols: Sequence[str],
+    encoder: TeamEncoder,
+    mode: str = "diff",
+    team_col: str = "team_pokemon",
+    target_col: str = "won_battle",
+) -> SparseDataset:
+    """Dataset comparativo con `base_cols` densas (self/opp/diff) + equipos CSR.
+
+    Las filas salen en el mismo orden que `build_pairwise`. Si `encoder` no
+    está ajustado se ajusta con `df`; para otro dataset (validación,
+    predicción) hay que pasar el mismo encoder para tener las mismas columnas.
+    """
+    dense = build_pairwise(df, base_cols)
+    dense_cols = [col for col in dense.columns if col != ID_COL and col not in META_COLS]
+    teams = paired_rows(df)[team_col].str.split(",")
+    team_matrix = encoder.transform(teams) if encoder.fitted else encoder.fit_transform(teams)
+    block = pair_team_block(team_matrix, mode)
+    unknown = encoder.unknown_species()
+    if unknown:
+        logging.warning(
+            "%d especies sin ID en la tabla de stats (columnas pk_unknown_*): %s",
+            len(unknown),
+            ", ".join(unknown[:10]) + (" ..." if len(unknown) > 10 else ""),
+        )
+    if mode == "self_opp":
+        team_names = encoder.feature_names("_self") + encoder.feature_names("_opp")
+    else:
+        team_names = encoder.feature_names("_diff")
+    X = sp.hstack([sp.csr_matrix(dense[dense_cols].to_numpy(dtype=np.float64)), block], format="csr")
+    return SparseDataset(
+        X=X,
+        y=dense[target_col].to_numpy(),
+        feature_names=dense_cols + team_names,
+        replay_ids=dense[ID_COL].to_numpy(),
+    )
+
+
+def csr_nbytes(matrix: sp.csr_matrix) -> int:
+    return matrix.data.nbytes + matrix.indices.nbytes + matrix.indptr.nbytes
+
+
+def main() -> None:
+    from lightgbm import LGBMClassifier
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.model_selection import StratifiedKFold, cross_validate
+    from sklearn.pipeline import Pipeline
+    from sklearn.preprocessing import MaxAbsScaler
+
+    parser = argparse.ArgumentParser(description="Evalúa el encoding disperso de equipos")
+    parser.add_argument("--teams", type=Path, default=Path("data/pokemon_showdown_teams_clean.csv"))
+    parser.add_argument("--base-stats", type=Path, default=Path("data/pokemon_base_pokeapi.csv"))
+    parser.add_argument("--pokeapi-cache", type=Path, default=POKEAPI_CACHE)
+    parser.add_argument("--mode", choices=PAIR_MODES, default="diff")
+    args = parser.parse_args()
+
+    df = pd.read_csv(args.teams)
+    df["rating_diff"] = df["rating_diff"].fillna(0)
+    base_cols = [c for c in df.columns if c.startswith("sum_") or c.startswith("mean_")] + ["rating_diff"]
+    encoder = TeamEncoder.from_base_stats(args.base_stats, args.pokeapi_cache)
+    data = build_sparse_pairwise(df, base_cols, encoder, mode=args.mode)
+
+    n_rows, n_cols = data.X.shape
+    unknown = encoder.unknown_species()
+    print(f"X: {n_rows} x {n_cols} | nnz={data.X.nnz} | {csr_nbytes(data.X) / 1e6:.2f} MB "
+          f"(denso: {n_rows * n_cols * 8 / 1e6:.1f} MB)")
+    if unknown:
+        print(f"{len(unknown)} especies sin ID, cada una con su columna pk_unknown_* "
+              "(descargar_pokeapi.py --with-species agrega las variedades)")
+
+    models = {
+        # MaxAbsScaler escala sin centrar, así que la matriz sigue dispersa.
+        "LogisticRegression": Pipeline([
+            ("scale", MaxAbsScaler()),
+            ("model", LogisticRegression(max_iter=2000, random_state=42)),
+        ]),
+        "LightGBM": LGBMClassifier(objective="binary", n_estimators=400, learning_rate=0.05, random_state=42, verbose=-1),
+    }
+    cv = StratifiedKFold(n_splits=5, shuffle=True, random_state=42)
+    for name, model in models.items():
+        scores = cross_validate(model, data.X, data.y, cv=cv, scoring=["f1", "roc_auc"])
+        print(f"{name:20s} f1={scores['test_f1'].mean():.3f}  roc_auc={scores['test_roc_auc'].mean():.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,309 @@
+"""
+Búsqueda de hiperparámetros por successive halving (en lugar de GridSearchCV).
+
+- Random Forest: `HalvingRandomSearchCV` con `n_estimators` como recurso:
+  todos los candidatos empiezan con pocos árboles y solo el mejor tercio de
+  cada ronda pasa a la siguiente con el triple.
+- LightGBM: halving propio sobre los folds de CV con early stopping. En cada
+  ronda los candidatos se evalúan en más folds (1 -> 3 -> 5) y el número de
+  árboles lo decide el early stopping, así que los candidatos flojos se
+  descartan tras uno o pocos folds. El early stopping mira una parte
+  apartada del train de cada fold (`EARLY_STOP_FRACTION`), no el fold de
+  validación: así el F1/AUC de CV no queda sesgado hacia arriba.
+
+Los splits de CV se calculan una sola vez y se comparten entre todos los
+candidatos. Para LightGBM se construye un único `lgb.Dataset` (el binning
+de features se hace una vez) y los folds son `subset`s de ese Dataset.
+
+Al terminar se reentrena el mejor LightGBM sobre todo el train, se evalúa en
+el hold-out y se registra como versión nueva en `--models-dir`
+(`model_registry.py`), que queda publicada como:
+    booster.txt   modelo LightGBM
+    spec.json     columnas, lista pk_*, medianas de imputación, parámetros,
+                  métricas y marca de datos del CSV, para recalcular las
+                  features al predecir y para `retrain_incremental.py`
+
+El modelo no usa las columnas que solo se conocen al terminar la partida
+(`POST_BATTLE_COLS`, p. ej. la duración en turnos), porque se sirve antes.
+
+Uso (desde Proyecto3):
+    python train_search.py
+    python train_search.py --compare-grid   # también corre las grillas del notebook
+"""
+
+from __future__ import annotations
+
+import argparse
+import dataclasses
+import logging
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import lightgbm as lgb
+import numpy as np
+from scipy.stats import randint
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.experimental import enable_halving_search_cv  # noqa: F401
+from sklearn.metrics import f1_score, roc_auc_score
+from sklearn.model_selection import (
+    HalvingRandomSearchCV,
+    ParameterSampler,
+    StratifiedKFold,
+    train_test_split,
+)
+
+from feature_store import FeatureSet, FeatureStore
+from model_registry import ModelRegistry, csv_watermark
+from pairwise_features import POST_BATTLE_COLS, SUFFIXES
+
+DATA_PATH = Path("data/pokemon_showdown_teams_clean.csv")
+MODELS_DIR = Path("models")
+SEED = 42
+
+# Espacio de búsqueda: el de las grillas del notebook, algo ampliado.
+RF_SPACE = {
+    "max_depth": [10, 15, 20, 25, None],
+    "min_samples_split": randint(2, 8),
+    "max_features": ["sqrt", "log2"],
+}
+LGB_SPACE = {
+    "num_leaves": [15, 31, 63, 127],
+    "learning_rate": [0.03, 0.05, 0.1],
+    "feature_fraction": [0.8, 0.9, 1.0],
+    "bagging_fraction": [0.8, 0.9, 1.0],
+    "min_child_samples": [5, 10, 20, 40],
+    "lambda_l2": [0.0, 1.0, 5.0],
+}
+LGB_BASE_PARAMS = {"objective": "binary", "metric": "auc", "bagging_freq": 1, "verbosity": -1, "seed": SEED}
+# `feature_pre_filter=False` permite variar min_child_samples sin rehacer el binning.
+LGB_DATASET_PARAMS = {"max_bin": 255, "feature_pre_filter": False, "verbosity": -1}
+EARLY_STOP_FRACTION = 0.1
+
+
+def cached_folds(y: np.ndarray, n_splits: int = 5, seed: int = SEED) -> List[Tuple[np.ndarray, np.ndarray]]:
+    cv = StratifiedKFold(n_splits=n_splits, shuffle=True, random_state=seed)
+    return list(cv.split(np.zeros(len(y)), y))
+
+
+class LgbFoldCache:
+    """Un `lgb.Dataset` binneado una vez y sus subsets por fold.
+
+    `fold(k)` devuelve `(ajuste, early stopping)`: el train del fold partido
+    de forma estratificada. El fold de validación queda solo para puntuar.
+    """
+
+    def __init__(self, X: np.ndarray, y: np.ndarray, folds: Sequence[Tuple[np.ndarray, np.ndarray]]) -> None:
+        self.X = X
+        self.y = y
+        self.folds = list(folds)
+        self.full = lgb.Dataset(X, y, params=LGB_DATASET_PARAMS, free_raw_data=False).construct()
+        self._subsets: Dict[int, Tuple[lgb.Dataset, lgb.Dataset]] = {}
+
+    def fold(self, k: int) -> Tuple[lgb.Dataset, lgb.Dataset]:
+        if k not in self._subsets:
+            train_idx, _ = self.folds[k]
+            fit_idx, stop_idx = train_test_split(
+                train_idx, test_size=EARLY_STOP_FRACTION, stratify=self.y[train_idx], random_state=SEED + k
+            )
+            self._subsets[k] = (
+                self.full.subset(np.sort(fit_idx)).construct(),
+                self.full.subset(np.sort(stop_idx)).construct(),
+            )
+        return self._subsets[k]
+
+
+@dataclasses.dataclass
+class Candidate:
+    params: Dict
+    f1: List[float] = dataclasses.field(default_factory=list)
+    auc: List[float] = dataclasses.field(default_factory=list)
+    best_iterations: List[int] = dataclasses.field(default_factory=list)
+
+    @property
+    def score(self) -> Tuple[float, float]:
+        return float(np.mean(self.f1)), float(np.mean(self.auc))
+
+
+def evaluate_fold(
+    cache: LgbFoldCache, params: Dict, k: int, max_rounds: int, early_stopping: int
+) -> Tuple[float, float, int]:
+    train, stop = cache.fold(k)
+    booster = lgb.train(
+        {**LGB_BASE_PARAMS, **params},
+        train,
+        num_boost_round=max_rounds,
+        valid_sets=[stop],
+        callbacks=[lgb.early_stopping(early_stopping, verbose=False)],
+    )
+    val_idx = cache.folds[k][1]
+    proba = booster.predict(cache.X[val_idx], num_iteration=booster.best_iteration)
+    y_val = cache.y[val_idx]
+    return f1_score(y_val, proba >= 0.5), roc_auc_score(y_val, proba), booster.best_iteration
+
+
+def halving_lgb_search(
+    cache: LgbFoldCache,
+    n_candidates: int = 27,
+    factor: int = 3,
+    fold_schedule: Sequence[int] = (1, 3, 5),
+    max_rounds: int = 800,
+    early_stopping: int = 50,
+    seed: int = SEED,
+) -> Tuple[Candidate, int]:
+    """Mejor candidato (por F1 medio, ROC-AUC de desempate) y fits realizados."""
+    candidates = [Candidate(p) for p in ParameterSampler(LGB_SPACE, n_candidates, random_state=seed)]
+    fits = 0
+    for rung, n_folds in enumerate(fold_schedule):
+        n_folds = min(n_folds, len(cache.folds))
+        for candidate in candidates:
+            for k in range(len(candidate.f1), n_folds):
+                f1, auc, best_iteration = evaluate_fold(cache, candidate.params, k, max_rounds, early_stopping)
+                candidate.f1.append(f1)
+                candidate.auc.append(auc)
+                candidate.best_iterations.append(best_iteration)
+                fits += 1
+        candidates.sort(key=lambda c: c.score, reverse=True)
+        f1, auc = candidates[0].score
+        logging.info("Ronda %d: %d candidatos x %d folds | mejor F1 %.4f AUC %.4f", rung, len(candidates), n_folds, f1, auc)
+        if rung < len(fold_schedule) - 1:
+            candidates = candidates[: max(1, len(candidates) // factor)]
+    return candidates[0], fits
+
+
+def halving_rf_search(X: np.ndarray, y: np.ndarray, folds, seed: int = SEED) -> HalvingRandomSearchCV:
+    search = HalvingRandomSearchCV(
+        RandomForestClassifier(random_state=seed),
+        RF_SPACE,
+        resource="n_estimators",
+        min_resources=50,
+        max_resources=500,
+        factor=3,
+        cv=folds,
+        scoring="f1",
+        random_state=seed,
+        n_jobs=-1,
+    )
+    return search.fit(X, y)
+
+
+def grid_baselines(X: np.ndarray, y: np.ndarray, folds) -> Dict[str, Tuple[float, float, object]]:
+    """Las grillas exhaustivas del notebook, para comparar tiempo y score."""
+    from lightgbm import LGBMClassifier
+    from sklearn.model_selection import GridSearchCV
+
+    grids = {
+        "RF GridSearchCV": (RandomForestClassifier(random_state=SEED), {
+            "n_estimators": [300, 500],
+            "max_depth": [15, 25],
+            "min_samples_split": [2, 5],
+        }),
+        "LGBM GridSearchCV": (LGBMClassifier(objective="binary", random_state=SEED, verbose=-1), {
+            "n_estimators": [600, 800],
+            "learning_rate": [0.03, 0.05],
+            "num_leaves": [63, 127],
+            "subsample": [0.9],
+            "colsample_bytree": [0.8, 0.9],
+        }),
+    }
+    results = {}
+    for name, (model, grid) in grids.items():
+        start = time.perf_counter()
+        search = GridSearchCV(model, grid, cv=folds, scoring="f1", n_jobs=-1).fit(X, y)
+        results[name] = (time.perf_counter() - start, search.best_score_, search.best_estimator_)
+    return results
+
+
+def save_model(
+    models_dir: Path,
+    booster: lgb.Booster,
+    features: FeatureSet,
+    feature_cols: List[str],
+    params: Dict,
+    metrics: Dict[str, float],
+    data: Optional[Dict] = None,
+) -> str:
+    """Registra el modelo como versión nueva y la publica; devuelve la versión."""
+    spec = {
+        "feature_cols": feature_cols,
+        "base_cols": features.base_cols,
+        "poke_cols": features.poke_cols,
+        "pokemon": features.pokemon,
+        "fill_values": features.fill_values,
+        "feature_key": features.key,
+        "params": params,
+        "num_iterations": booster.current_iteration(),
+        "threshold": 0.5,
+        "metrics": metrics,
+        "data": data,
+    }
+    registry = ModelRegistry(models_dir)
+    version = registry.save(booster, spec)
+    registry.promote(version)
+    return version
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Búsqueda de hiperparámetros por successive halving")
+    parser.add_argument("--data", type=Path, default=DATA_PATH, help="CSV de equipos del scraper")
+    parser.add_argument("--features-root", type=Path, default=Path("data/features"), help="Directorio del feature store")
+    parser.add_argument("--models-dir", type=Path, default=MODELS_DIR, help="Dónde guardar booster.txt y spec.json")
+    parser.add_argument("--candidates", type=int, default=27, help="Candidatos LightGBM en la primera ronda")
+    parser.add_argument("--max-rounds", type=int, default=800, help="Tope de árboles por fit (con early stopping)")
+    parser.add_argument("--skip-rf", action="store_true", help="No buscar Random Forest")
+    parser.add_argument("--compare-grid", action="store_true", help="Correr también las grillas del notebook")
+    parser.add_argument("--log-level", default="INFO", help="Nivel de logging")
+    args = parser.parse_args()
+    logging.basicConfig(level=getattr(logging, args.log_level.upper(), logging.INFO), format="%(levelname)s %(message)s")
+
+    # La marca se toma antes de leer: si el scraper agrega filas mientras
+    # tanto, quedan para el próximo `retrain_incremental.py`.
+    watermark = csv_watermark(args.data)
+    features = FeatureStore(args.features_root).load_or_build(args.data)
+    # El modelo se usa antes de la partida (scoring_service.py): sin `turns_*`.
+    post_battle = {f"{col}{suffix}" for col in POST_BATTLE_COLS for suffix in SUFFIXES}
+    feature_cols = [col for col in features.feature_cols if col not in post_battle]
+    X = features.pairwise[feature_cols].to_numpy(dtype=np.float64)
+    y = features.pairwise["won_battle"].to_numpy()
+    # Mismo split que el notebook.
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, stratify=y, random_state=SEED)
+    folds = cached_folds(y_train)
+
+    report = []
+    if not args.skip_rf:
+        start = time.perf_counter()
+        rf = halving_rf_search(X_train, y_train, folds)
+        rf_time = time.perf_counter() - start
+        rf_proba = rf.best_estimator_.predict_proba(X_test)[:, 1]
+        report.append(("RF halving", rf_time, rf.best_score_, rf_proba, rf.best_params_))
+
+    start = time.perf_counter()
+    cache = LgbFoldCache(X_train, y_train, folds)
+    best, fits = halving_lgb_search(cache, n_candidates=args.candidates, max_rounds=args.max_rounds)
+    num_rounds = max(1, int(np.mean(best.best_iterations)))
+    booster = lgb.train({**LGB_BASE_PARAMS, **best.params}, cache.full, num_boost_round=num_rounds)
+    lgb_time = time.perf_counter() - start
+    lgb_proba = booster.predict(X_test)
+    report.append(("LGBM halving", lgb_time, best.score[0], lgb_proba, {**best.params, "num_boost_round": num_rounds}))
+    logging.info("LightGBM: %d fits de fold en total", fits)
+
+    if args.compare_grid:
+        for name, (elapsed, cv_f1, model) in grid_baselines(X_train, y_train, folds).items():
+            report.append((name, elapsed, cv_f1, model.predict_proba(X_test)[:, 1], model.get_params()))
+
+    print(f"\n{'búsqueda':20s} {'tiempo':>9s} {'F1 CV':>7s} {'F1 test':>8s} {'AUC test':>9s}")
+    for name, elapsed, cv_f1, proba, _ in report:
+        print(f"{name:20s} {elapsed:8.1f}s {cv_f1:7.4f} {f1_score(y_test, proba >= 0.5):8.4f} {roc_auc_score(y_test, proba):9.4f}")
+
+    metrics = {
+        "cv_f1": best.score[0],
+        "cv_roc_auc": best.score[1],
+        "test_f1": float(f1_score(y_test, lgb_proba >= 0.5)),
+        "test_roc_auc": float(roc_auc_score(y_test, lgb_proba)),
+    }
+    version = save_model(args.models_dir, booster, features, feature_cols, best.params, metrics, watermark)
+    print(f"\nModelo guardado en {args.models_dir} (versión {version})")
+
+
+if __name__ == "__main__":
+    main()
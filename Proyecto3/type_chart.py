@@ -0,0 +1,222 @@
+"""
+Tabla de tipos y features de matchup equipo vs equipo.
+
+Todo se precalcula como arrays de NumPy indexados por el ID de especie de
+`StatStore` (tipos en el orden de `TYPE_NAMES`):
+
+- `CHART[a, d]`: multiplicador de un ataque de tipo `a` contra el tipo `d`
+  (tabla de Gen 6+, 18x18).
+- `defense[s, a]`: multiplicador que recibe la especie `s` de un ataque de
+  tipo `a` (producto sobre sus dos tipos).
+- `offense[s, d]`: mejor multiplicador STAB de `s` contra el tipo puro `d`.
+- `best_stab[s, t]`: mejor multiplicador STAB de `s` contra la especie `t`.
+
+Con eso, las features de un lote de enfrentamientos salen de gathers y
+reducciones sobre matrices de IDs `(n_pares, 6)` (relleno -1), por bloques,
+sin bucles de Python por par:
+
+- `coverage`: fracción de rivales a los que algún miembro pega súper eficaz
+  con STAB.
+- `shared_weak`: tipos a los que son débiles al menos 3 miembros del equipo.
+- `speed_adv`: promedio de sign(velocidad propia - rival) sobre todos los
+  pares de miembros (ventaja de speed tier).
+
+Uso (desde Proyecto3):
+    python type_chart.py --pairs 1000000
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+from pathlib import Path
+from typing import Dict, Iterable, Sequence
+
+import numpy as np
+import pandas as pd
+
+from stat_store import NO_TYPE, STAT_COLS, TYPE_CODES, TYPE_NAMES, StatStore
+
+# Multiplicadores distintos de 1 por tipo atacante.
+_EFFECTIVENESS = {
+    "normal": {"rock": 0.5, "ghost": 0, "steel": 0.5},
+    "fire": {"fire": 0.5, "water": 0.5, "grass": 2, "ice": 2, "bug": 2, "rock": 0.5, "dragon": 0.5, "steel": 2},
+    "water": {"fire": 2, "water": 0.5, "grass": 0.5, "ground": 2, "rock": 2, "dragon": 0.5},
+    "electric": {"water": 2, "electric": 0.5, "grass": 0.5, "ground": 0, "flying": 2, "dragon": 0.5},
+    "grass": {
+        "fire": 0.5, "water": 2, "grass": 0.5, "poison": 0.5, "ground": 2,
+        "flying": 0.5, "bug": 0.5, "rock": 2, "dragon": 0.5, "steel": 0.5,
+    },
+    "ice": {"fire": 0.5, "water": 0.5, "grass": 2, "ice": 0.5, "ground": 2, "flying": 2, "dragon": 2, "steel": 0.5},
+    "fighting": {
+        "normal": 2, "ice": 2, "poison": 0.5, "flying": 0.5, "psychic": 0.5, "bug": 0.5,
+        "rock": 2, "ghost": 0, "dark": 2, "steel": 2, "fairy": 0.5,
+    },
+    "poison": {"grass": 2, "poison": 0.5, "ground": 0.5, "rock": 0.5, "ghost": 0.5, "steel": 0, "fairy": 2},
+    "ground": {"fire": 2, "electric": 2, "grass": 0.5, "poison": 2, "flying": 0, "bug": 0.5, "rock": 2, "steel": 2},
+    "flying": {"electric": 0.5, "grass": 2, "fighting": 2, "bug": 2, "rock": 0.5, "steel": 0.5},
+    "psychic": {"fighting": 2, "poison": 2, "psychic": 0.5, "dark": 0, "steel": 0.5},
+    "bug": {
+        "fire": 0.5, "grass": 2, "fighting": 0.5, "poison": 0.5, "flying": 0.5,
+        "psychic": 2, "ghost": 0.5, "dark": 2, "steel": 0.5, "fairy": 0.5,
+    },
+    "rock": {"fire": 2, "ice": 2, "fighting": 0.5, "ground": 0.5, "flying": 2, "bug": 2, "steel": 0.5},
+    "ghost": {"normal": 0, "psychic": 2, "ghost": 2, "dark": 0.5},
+    "dragon": {"dragon": 2, "steel": 0.5, "fairy": 0},
+    "dark": {"fighting": 0.5, "psychic": 2, "ghost": 2, "dark": 0.5, "fairy": 0.5},
+    "steel": {"fire": 0.5, "water": 0.5, "electric": 0.5, "ice": 2, "rock": 2, "steel": 0.5, "fairy": 2},
+    "fairy": {"fire": 0.5, "fighting": 2, "poison": 0.5, "dragon": 2, "dark": 2, "steel": 0.5},
+}
+
+
+def _build_chart() -> np.ndarray:
+    chart = np.ones((len(TYPE_NAMES), len(TYPE_NAMES)), dtype=np.float32)
+    for attacker, row in _EFFECTIVENESS.items():
+        for defender, multiplier in row.items():
+            chart[TYPE_CODES[attacker], TYPE_CODES[defender]] = multiplier
+    chart.setflags(write=False)
+    return chart
+
+
+CHART = _build_chart()
+
+SHARED_WEAK_MIN = 3
+MATCHUP_FEATURES = ("coverage", "shared_weak", "speed_adv")
+
+
+class TypeMatchups:
+    """Matrices de efectividad por especie para una tabla `StatStore`."""
+
+    def __init__(self, store: StatStore) -> None:
+        types = np.asarray(store.types, dtype=np.intp)
+        t1, t2 = types[:, 0], types[:, 1]
+        has_t1, has_t2 = t1 != NO_TYPE, t2 != NO_TYPE
+        # Para los huecos se usa la columna 0 y luego se neutraliza con where.
+        c1, c2 = np.where(has_t1, t1, 0), np.where(has_t2, t2, 0)
+
+        chart_t = CHART.T  # [defensor, atacante]
+        self.defense = (
+            np.where(has_t1[:, None], chart_t[c1], 1.0) * np.where(has_t2[:, None], chart_t[c2], 1.0)
+        ).astype(np.float32)
+        # Un tipo ausente no aporta STAB: se reemplaza por el otro.
+        s1 = np.where(has_t1, c1, c2)
+        s2 = np.where(has_t2, c2, s1)
+        has_stab = has_t1 | has_t2
+        self.offense = np.where(has_stab[:, None], np.maximum(CHART[s1], CHART[s2]), 1.0).astype(np.float32)
+        # best_stab[s, t] = max(defense[t, s1(s)], defense[t, s2(s)])
+        self.best_stab = np.where(
+            has_stab[:, None],
+            np.maximum(self.defense[:, s1].T, self.defense[:, s2].T),
+            1.0,
+        ).astype(np.float32)
+        self.speed = np.asarray(store.stats[:, STAT_COLS.index("speed")], dtype=np.float32)
+
+    def team_features(self, own: np.ndarray, rival: np.ndarray) -> Dict[str, np.ndarray]:
+        """Features de `own` contra `rival` para un bloque de pares.
+
+        `own` y `rival` son matrices de IDs `(n, k)` con -1 en los huecos.
+        """
+        own_mask, rival_mask = own >= 0, rival >= 0
+        own_ids, rival_ids = np.where(own_mask, own, 0), np.where(rival_mask, rival, 0)
+        pair_mask = own_mask[:, :, None] & rival_mask[:, None, :]
+        n_rival = np.maximum(rival_mask.sum(axis=1), 1)
+
+        # (n, k, k): ¿el miembro i de own pega súper eficaz al miembro j del rival?
+        hits = (self.best_stab[own_ids[:, :, None], rival_ids[:, None, :]] >= 2) & pair_mask
+        coverage = hits.any(axis=1).sum(axis=1) / n_rival
+
+        # (n, k, 18): debilidades por miembro -> miembros débiles por tipo.
+        weak = (self.defense[own_ids] >= 2) & own_mask[:, :, None]
+        shared_weak = (weak.sum(axis=1) >= SHARED_WEAK_MIN).sum(axis=1)
+
+        speed_sign = np.sign(self.speed[own_ids][:, :, None] - self.speed[rival_ids][:, None, :])
+        n_pairs = np.maximum(pair_mask.sum(axis=(1, 2)), 1)
+        speed_adv = np.where(pair_mask, speed_sign, 0.0).sum(axis=(1, 2)) / n_pairs
+        return {
+            "coverage": coverage.astype(np.float32),
+            "shared_weak": shared_weak.astype(np.int16),
+            "speed_adv": speed_adv.astype(np.float32),
+        }
+
+    def matchup_features(self, own: np.ndarray, rival: np.ndarray, chunk_size: int = 100_000) -> pd.DataFrame:
+        """`<feature>_self`, `<feature>_opp` y `<feature>_diff` por par.
+
+        Se procesa por bloques de `chunk_size` pares para acotar la memoria de
+        los tensores `(n, k, k)` y `(n, k, 18)`.
+        """
+        own, rival = np.asarray(own, dtype=np.intp), np.asarray(rival, dtype=np.intp)
+        blocks = []
+        for start in range(0, len(own), chunk_size):
+            a, b = own[start:start + chunk_size], rival[start:start + chunk_size]
+            mine, theirs = self.team_features(a, b), self.team_features(b, a)
+            block = {}
+            for name in MATCHUP_FEATURES:
+                block[f"{name}_self"] = mine[name]
+                block[f"{name}_opp"] = theirs[name]
+                block[f"{name}_diff"] = mine[name] - theirs[name]
+            blocks.append(pd.DataFrame(block))
+        if not blocks:
+            return pd.DataFrame(columns=[f"{n}{s}" for n in MATCHUP_FEATURES for s in ("_self", "_opp", "_diff")])
+        return pd.concat(blocks, ignore_index=True)
+
+
+def team_id_matrix(teams: Iterable[Sequence[str]], resolve_id, width: int = 6) -> np.ndarray:
+    """Matriz `(n, width)` de IDs a partir de nombres; -1 si no hay ID."""
+    teams = list(teams)
+    ids = np.full((len(teams), width), -1, dtype=np.intp)
+    for i, team in enumerate(teams):
+        for j, name in enumerate(team[:width]):
+            species_id = resolve_id(name)
+            if species_id is not None:
+                ids[i, j] = species_id
+    return ids
+
+
+def build_matchup_features(
+    df: pd.DataFrame, matchups: TypeMatchups, resolve_id, team_col: str = "team_pokemon"
+) -> pd.DataFrame:
+    """Features de matchup alineadas con `pairwise_features.build_pairwise`.
+
+    Cada equipo se evalúa una sola vez contra su rival; la columna `_opp` de
+    una fila es la `_self` de la fila pareja (`i ^ 1`).
+    """
+    from pairwise_features import paired_rows
+
+    teams = paired_rows(df)[team_col].str.split(",")
+    ids = team_id_matrix(teams, resolve_id)
+    opponent = np.arange(len(ids)) ^ 1
+    features = matchups.team_features(ids, ids[opponent])
+    columns = {}
+    for name in MATCHUP_FEATURES:
+        values = features[name]
+        columns[f"{name}_self"] = values
+        columns[f"{name}_opp"] = values[opponent]
+        columns[f"{name}_diff"] = values - values[opponent]
+    return pd.DataFrame(columns)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark de features de matchup por tipos")
+    parser.add_argument("--base-stats", type=Path, default=Path("data/pokemon_base_pokeapi.csv"))
+    parser.add_argument("--pairs", type=int, default=1_000_000, help="Pares de equipos aleatorios")
+    parser.add_argument("--chunk-size", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    store = StatStore.open(args.base_stats)
+    start = time.perf_counter()
+    matchups = TypeMatchups(store)
+    print(f"Matrices para {len(store)} especies en {time.perf_counter() - start:.3f}s")
+
+    rng = np.random.default_rng(args.seed)
+    own = rng.integers(0, len(store), size=(args.pairs, 6))
+    rival = rng.integers(0, len(store), size=(args.pairs, 6))
+    start = time.perf_counter()
+    features = matchups.matchup_features(own, rival, chunk_size=args.chunk_size)
+    elapsed = time.perf_counter() - start
+    print(f"{args.pairs} pares en {elapsed:.2f}s ({args.pairs / elapsed:,.0f} pares/s)")
+    print(features.describe().T[["mean", "std", "min", "max"]])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,239 @@
+"""
+Cola de trabajo persistente (SQLite) para scrapes por shards.
+
+Cada shard es un formato, o un formato en una ventana de fechas, con sus
+parámetros de scraping. Los workers lo reclaman de forma atómica
+(`claim`), y al terminar lo marcan `done` o `failed`:
+
+    pending -> running -> done
+                       -> pending   (falló y quedan intentos)
+                       -> failed    (agotó `max_attempts`)
+
+Un shard `running` cuyo worker murió vuelve a `pending` con
+`requeue_running` (lo hace `scrape_sharded.py run` al arrancar). El worker
+se guarda como `host:pid/etiqueta`: en la misma máquina se comprueba si el
+proceso sigue vivo, así una segunda ejecución no le quita los shards a una
+que sigue trabajando. Si no se puede comprobar (otra máquina, Windows), el
+shard se recupera solo cuando lleva más de `stale_after` segundos en curso.
+Los fallidos se reintentan por separado con `retry`.
+
+Varios procesos comparten el archivo: modo WAL y `busy_timeout`, como
+`pokeapi_cache.py` y `replay_index.py`.
+"""
+
+from __future__ import annotations
+
+import dataclasses
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Union
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS shards (
+    shard_id  TEXT PRIMARY KEY,
+    format_id TEXT NOT NULL,
+    params    TEXT NOT NULL,
+    status    TEXT NOT NULL DEFAULT 'pending',
+    attempts  INTEGER NOT NULL DEFAULT 0,
+    worker    TEXT,
+    started   REAL,
+    finished  REAL,
+    replays   INTEGER,
+    rows      INTEGER,
+    error     TEXT
+)
+"""
+
+STATUSES = ("pending", "running", "done", "failed")
+
+
+def worker_id(label: Optional[str] = None) -> str:
+    """`host:pid` del proceso actual, con `label` opcional (`host:pid/label`)."""
+    base = f"{socket.gethostname()}:{os.getpid()}"
+    return f"{base}/{label}" if label else base
+
+
+def owner_alive(worker: Optional[str]) -> Optional[bool]:
+    """¿Sigue vivo el proceso de `worker_id`? None si no se puede saber."""
+    host, _, pid = (worker or "").split("/", 1)[0].rpartition(":")
+    if host != socket.gethostname() or not pid.isdigit() or os.name != "posix":
+        # En Windows os.kill(pid, 0) no consulta: termina el proceso.
+        return None
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+@dataclasses.dataclass
+class Shard:
+    shard_id: str
+    format_id: str
+    params: Dict = dataclasses.field(default_factory=dict)
+    status: str = "pending"
+    attempts: int = 0
+    worker: Optional[str] = None
+    started: Optional[float] = None
+    finished: Optional[float] = None
+    replays: Optional[int] = None
+    rows: Optional[int] = None
+    error: Optional[str] = None
+
+    @classmethod
+    def from_row(cls, row: sqlite3.Row) -> "Shard":
+        data = dict(row)
+        data["params"] = json.loads(data["params"])
+        return cls(**data)
+
+
+class WorkQueue:
+    """Shards de scraping en una tabla SQLite compartida entre procesos."""
+
+    def __init__(self, path: Union[str, Path], max_attempts: int = 3) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        # isolation_level=None: las transacciones se abren explícitamente.
+        self._conn = sqlite3.connect(str(self.path), timeout=30, isolation_level=None, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(_SCHEMA)
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def add(self, shards: Iterable[Shard]) -> int:
+        """Encola shards nuevos; los IDs ya existentes se ignoran. Devuelve los agregados."""
+        rows = [(s.shard_id, s.format_id, json.dumps(s.params, sort_keys=True)) for s in shards]
+        with self._lock:
+            before = self._conn.total_changes
+            self._conn.execute("BEGIN IMMEDIATE")
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO shards (shard_id, format_id, params) VALUES (?, ?, ?)", rows
+            )
+            self._conn.execute("COMMIT")
+            return self._conn.total_changes - before
+
+    def claim(self, worker: Optional[str] = None) -> Optional[Shard]:
+        """Toma el siguiente shard pendiente (en orden de alta) o None si no hay."""
+        worker = worker or worker_id()
+        with self._lock:
+            # BEGIN IMMEDIATE toma el lock de escritura: dos workers no pueden
+            # leer el mismo shard pendiente y marcarlo a la vez.
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT * FROM shards WHERE status = 'pending' ORDER BY rowid LIMIT 1"
+                ).fetchone()
+                if row is None:
+                    self._conn.execute("COMMIT")
+                    return None
+                self._conn.execute(
+                    "UPDATE shards SET status = 'running', attempts = attempts + 1, worker = ?, "
+                    "started = ?, finished = NULL, error = NULL WHERE shard_id = ?",
+                    (worker, time.time(), row["shard_id"]),
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        shard = Shard.from_row(row)
+        shard.status, shard.worker, shard.attempts = "running", worker, shard.attempts + 1
+        return shard
+
+    def complete(self, shard_id: str, replays: int, rows: int) -> None:
+        self._update(
+            "UPDATE shards SET status = 'done', finished = ?, replays = ?, rows = ? WHERE shard_id = ?",
+            (time.time(), replays, rows, shard_id),
+        )
+
+    def fail(self, shard_id: str, error: str) -> None:
+        """Vuelve a `pending` si quedan intentos; si no, queda `failed`."""
+        self._update(
+            "UPDATE shards SET status = CASE WHEN attempts < ? THEN 'pending' ELSE 'failed' END, "
+            "finished = ?, error = ? WHERE shard_id = ?",
+            (self.max_attempts, time.time(), error[:2000], shard_id),
+        )
+
+    def requeue_running(self, stale_after: Optional[float] = None) -> int:
+        """Devuelve a `pending` los shards `running` cuyo worker ya no existe.
+
+        Sin forma de comprobarlo, se usan los que llevan más de `stale_after`
+        segundos en curso (con `stale_after=None` se dejan como están).
+        """
+        now = time.time()
+        stale = []
+        for shard in self.shards("running"):
+            alive = owner_alive(shard.worker)
+            if alive is None:
+                alive = stale_after is None or now - (shard.started or 0) < stale_after
+            if not alive:
+                stale.append(shard.shard_id)
+        if not stale:
+            return 0
+        marks = ",".join("?" * len(stale))
+        return self._update(
+            f"UPDATE shards SET status = 'pending', worker = NULL WHERE status = 'running' AND shard_id IN ({marks})",
+            tuple(stale),
+        )
+
+    def retry(self, shard_ids: Sequence[str] = (), status: str = "failed") -> List[str]:
+        """Vuelve a encolar `shard_ids` (o todos los de `status`) con intentos a cero.
+
+        De `shard_ids` solo se toman los `failed`/`pending` y los `running`
+        cuyo worker ya no existe: un shard en curso o `done` no se repite.
+        Devuelve los IDs que volvieron a `pending`.
+        """
+        if shard_ids:
+            wanted = set(shard_ids)
+            targets = [
+                shard
+                for shard in self.shards()
+                if shard.shard_id in wanted
+                and (
+                    shard.status in ("failed", "pending")
+                    or (shard.status == "running" and owner_alive(shard.worker) is False)
+                )
+            ]
+        else:
+            targets = self.shards(status)
+        requeued = []
+        for shard in targets:
+            # El estado se vuelve a comprobar: otro proceso pudo reclamarlo.
+            if self._update(
+                "UPDATE shards SET status = 'pending', attempts = 0, error = NULL, "
+                "worker = CASE WHEN status = 'running' THEN NULL ELSE worker END "
+                "WHERE shard_id = ? AND status = ?",
+                (shard.shard_id, shard.status),
+            ):
+                requeued.append(shard.shard_id)
+        return requeued
+
+    def _update(self, sql: str, params: tuple) -> int:
+        with self._lock:
+            return self._conn.execute(sql, params).rowcount
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM shards GROUP BY status").fetchall()
+        found = {status: count for status, count in rows}
+        return {status: found.get(status, 0) for status in STATUSES}
+
+    def shards(self, status: Optional[str] = None) -> List[Shard]:
+        with self._lock:
+            if status is None:
+                rows = self._conn.execute("SELECT * FROM shards ORDER BY rowid").fetchall()
+            else:
+                rows = self._conn.execute(
+                    "SELECT * FROM shards WHERE status = ? ORDER BY rowid", (status,)
+                ).fetchall()
+        return [Shard.from_row(row) for row in rows]